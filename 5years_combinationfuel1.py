@@ -7,6 +7,8 @@ Created on Thu Oct 26 11:19:59 2023
 
 import pulp
 
+from solver_backend import options_from_argv, solve
+
 # Constants
 years = list(range(2025, 2046, 5))
 units = ['power_plant', 'hydrogen_plant', 'gas_plant']
@@ -25,6 +27,7 @@ CF = 20
 
 best_objective = float('inf')
 best_fuel_combination = []
+solver_options = options_from_argv()
 
 for y in years:
     electricity_contribution = (y - 2025) // 5 * 0.20
@@ -60,7 +63,7 @@ for y in years:
         prb += pulp.lpSum([F[f] for f in fuels if f != 'electricity']) == 100 * other_fuel_contribution / COP[other_fuel]
         prb += F['electricity'] == 100 * electricity_contribution / COP['electricity']
 
-        prb.solve(pulp.GUROBI())
+        solve(prb, **solver_options)
 
         if pulp.value(prb.objective) < best_objective:
             best_objective = pulp.value(prb.objective)
@@ -0,0 +1,244 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+
+import pulp
+
+import solver_backend
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import MatrixModel, solve_matrix
+from model_builder import build_combination_model, build_q1_model, build_q3_new_model
+from pulp_compat import constraint_map
+from persistent_model import to_highs_lp
+
+# ============================= Benchmark Suite ====================================================
+# Times the stages of a solve separately on synthetic instances of the model families, scaled in
+# years, units, fuels and (hourly family) hours per planning year:
+#   build   - building the PuLP expressions / the sparse matrix
+#   write   - writing the model as MPS, read - reading it back (PuLP or HiGHS)
+#   solve   - the solver call including its start-up
+#   extract - reading the values back, prb.variables() for PuLP models
+# Every case runs in a fresh process, so peak_rss_mb is the peak memory of that case alone. The results
+# go to a JSON file; compared with a stored baseline, a stage slower by more than the tolerance (and by
+# at least MIN_SECONDS) or a higher peak memory is reported as a regression.
+FAMILIES = ['q1', 'q3_new', 'combination', 'hourly']
+STAGES = ['build', 'write', 'read', 'solve', 'extract']
+MIN_SECONDS = 0.005
+
+
+def synthetic_params(n_years=5, n_units=3, n_fuels=None, seed=0):
+    # Parameters in the ranges of the shipped data, fuel i is burnt in unit i % n_units. Every unit can
+    # add 2 / n_units of the peak demand, so the combination and hourly models stay feasible.
+    rng = random.Random(seed)
+    n_fuels = n_units if n_fuels is None else n_fuels
+    units = [f"unit_{u}" for u in range(n_units)]
+    fuels = [f"fuel_{f}" for f in range(n_fuels)]
+    D = [rng.uniform(8e6, 12e6) for _ in range(n_years)]
+    X = {u: rng.uniform(4e4, 1e6) for u in units}
+    return {
+        'years': list(range(2025, 2025 + 5 * n_years, 5)),
+        'units': units,
+        'fuels': fuels,
+        'unit_fuels': {f: units[i % n_units] for i, f in enumerate(fuels)},
+        'COP': {f: rng.uniform(0.85, 2.5) for f in fuels},
+        'C_op': {u: rng.uniform(3, 10) for u in units},
+        'C_inv': {u: rng.uniform(15, 18) for u in units},
+        'C_f': {f: rng.uniform(98, 200) for f in fuels},
+        'X': X,
+        'X_max': {u: X[u] + 2 * max(D) / n_units for u in units},
+        'x': {u: 1.5 * X[u] for u in units},
+        'D': D,
+    }
+
+
+def build(family, params, hours=1):
+    if family == 'q1':
+        return build_q1_model(params)
+    if family == 'q3_new':
+        return build_q3_new_model(params, tuple(params['fuels'][:2]))
+    if family == 'combination':
+        return build_combination_model(params, params['fuels'])
+    if family == 'hourly':
+        if hours == 1:
+            return build_time_resolved_matrix(params, 'year')
+        return build_time_resolved_matrix(params, 'hour', heat_profile(hours))
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def model_size(model):
+    if isinstance(model, MatrixModel):
+        return model.n_rows, model.n_cols, model.A.nnz
+    constraints = constraint_map(model.prb)
+    return len(constraints), len(model.prb.variables()), sum(len(c) for c in constraints.values())
+
+
+def _write_read(model, directory):
+    # Returns (write time, read time) of an MPS round trip
+    path = os.path.join(directory, 'model.mps')
+    if isinstance(model, MatrixModel):
+        import highspy
+
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', False)
+        highs.passModel(to_highs_lp(model))
+        start = time.perf_counter()
+        highs.writeModel(path)
+        written = time.perf_counter()
+        reader = highspy.Highs()
+        reader.setOptionValue('output_flag', False)
+        reader.readModel(path)
+    else:
+        start = time.perf_counter()
+        model.prb.writeMPS(path)
+        written = time.perf_counter()
+        pulp.LpProblem.fromMPS(path)
+    return written - start, time.perf_counter() - written
+
+
+def _solve(model, solver_options):
+    if isinstance(model, MatrixModel):
+        options = {k: solver_options[k] for k in ('time_limit', 'mip_gap', 'presolve') if k in solver_options}
+        return solve_matrix(model, **options)
+    return model.solve(**solver_options)
+
+
+def _extract(model):
+    if isinstance(model, MatrixModel):
+        return {family: model.values(model.x, family) for family in model.columns} if model.x is not None else {}
+    return {v.name: v.varValue for v in model.prb.variables()}
+
+
+def run_case(case, repeat=1, solver_options=None):
+    # case = (family, years, units, fuels, hours), every stage keeps the fastest of repeat runs
+    family, n_years, n_units, n_fuels, hours = case
+    params = synthetic_params(n_years, n_units, n_fuels)
+    times = dict.fromkeys(STAGES, float('inf'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model = build(family, params, hours)
+            times['build'] = min(times['build'], time.perf_counter() - start)
+
+            write, read = _write_read(model, directory)
+            times['write'], times['read'] = min(times['write'], write), min(times['read'], read)
+
+            start = time.perf_counter()
+            result = _solve(model, solver_options or {})
+            times['solve'] = min(times['solve'], time.perf_counter() - start)
+
+            start = time.perf_counter()
+            _extract(model)
+            times['extract'] = min(times['extract'], time.perf_counter() - start)
+
+    rows, cols, nonzeros = model_size(model)
+    return {'family': family, 'years': n_years, 'units': n_units, 'fuels': n_fuels, 'hours': hours,
+            'rows': rows, 'cols': cols, 'nonzeros': nonzeros, **times,
+            'status': result.status, 'objective': result.objective,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def cases(families, years, units, hours, fuels=None):
+    # fuels None gives as many fuels as units, otherwise every fuel count is combined with every unit count
+    for family, n_years, n_units in product(families, years, units):
+        for n_fuels in (fuels or [n_units]):
+            for h in (hours if family == 'hourly' else [1]):
+                yield family, n_years, n_units, n_fuels, h
+
+
+def run_benchmark(case_list, repeat=1, **solver_options):
+    results = []
+    for case in case_list:
+        # A fresh interpreter per case, ru_maxrss of a forked process would start at the parent's peak
+        with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+            results.append(pool.submit(run_case, case, repeat, solver_options).result())
+    return results
+
+
+# ============================== Baseline ==========================================================
+def _case_key(result):
+    return tuple(result[k] for k in ('family', 'years', 'units', 'fuels', 'hours'))
+
+
+def regressions(results, baseline, tolerance=0.25):
+    # (case, measure, baseline value, new value) for every stage or peak memory worse than the baseline
+    previous = {_case_key(r): r for r in baseline['cases']}
+    found = []
+    for result in results:
+        base = previous.get(_case_key(result))
+        if base is None:
+            continue
+        for stage in STAGES:
+            if result[stage] > base[stage] * (1 + tolerance) and result[stage] - base[stage] > MIN_SECONDS:
+                found.append((_case_key(result), stage, base[stage], result[stage]))
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            found.append((_case_key(result), 'peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb']))
+    return found
+
+
+def machine():
+    highs = None
+    if importlib.util.find_spec('highspy') is not None:
+        import highspy
+
+        highs = highspy.Highs().version()
+    return {'platform': platform.platform(), 'python': platform.python_version(), 'cpu_count': os.cpu_count(),
+            'pulp': pulp.__version__, 'highs': highs}
+
+
+# ============================== Command line ======================================================
+def _ints(text):
+    return [int(v) for v in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time build, write/read, solve and extraction on synthetic instances")
+    parser.add_argument('--family', action='append', dest='families', choices=FAMILIES,
+                        help="model family to benchmark, repeat for several (default: all)")
+    parser.add_argument('--years', type=_ints, default=[5, 10], help="planning years, e.g. 5,10,20")
+    parser.add_argument('--units', type=_ints, default=[3, 6], help="units, e.g. 3,6,12")
+    parser.add_argument('--fuels', type=_ints, default=None,
+                        help="fuels, e.g. 2,6,12, combined with every unit count (default: as many as units)")
+    parser.add_argument('--hours', type=_ints, default=[1, 24, 168], help="hours per planning year, hourly family")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--out', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    if args.fuels and min(args.fuels) < 2:
+        parser.error("--fuels must be at least 2, q3_new selects two fuels")
+    results = run_benchmark(cases(args.families or FAMILIES, args.years, args.units, args.hours, args.fuels),
+                            args.repeat, **options)
+    with open(args.out, 'w') as file:
+        json.dump({'machine': machine(), 'options': options, 'cases': results}, file, indent=1)
+
+    print(f"{'Case':<32}{'Rows':>9}{'Cols':>9}" + ''.join(f"{s:>9}" for s in STAGES) + f"{'MB':>8}")
+    for r in results:
+        print(f"{str(_case_key(r)):<32}{r['rows']:>9}{r['cols']:>9}"
+              + ''.join(f"{r[s]:>9.3f}" for s in STAGES) + f"{r['peak_rss_mb']:>8.0f}")
+    print(f"Results in {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file), args.tolerance)
+        for key, measure, before, after in found:
+            print(f"REGRESSION {key} {measure}: {before:.3f} -> {after:.3f}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
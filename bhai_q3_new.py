@@ -1,6 +1,10 @@
 import pulp
 from itertools import combinations
 
+from model_builder import build_q3_new_model
+from results import format_solution, solution_arrays
+from solver_backend import options_from_argv
+
 # ============================= Constants ==========================================================
 # Considering the years from 2025 to 2045 with 5 years leap
 years = list(range(2025, 2046, 5))
@@ -87,108 +91,53 @@ D = [
     8880000
 ]
 
-a = 0
 best_objective = float('inf')
 objective_values = None
 best_fuels = None
+best_model = None
+solver_calls = 0
+solver_options = options_from_argv()
 
-# ============================== Decision Variables - value will start from 0 ===============================
-# G represents the amount of energy (heat) produced by each unit u
-G = pulp.LpVariable.dicts("Generation",
-                          [(t, u, f) for t in years for u in units for f in fuels],
-                          lowBound=0,
-                          cat='Continuous')
-
-# CAP represents the installed capacity (how much heat is already produced by each unit u)
-CAP = pulp.LpVariable.dicts("Installed_Capacity", [(t, u) for t in years for u in units],
-                            lowBound=0,
-                            cat='Continuous')
-
-# F represents amount of fuel needed (given as input to each unit u)to operate
-F = pulp.LpVariable.dicts("Fuel_Consumption", [(t, f) for t in years for f in fuels],
-                          lowBound=0,
-                          cat='Continuous')
-
-# Plant selection variable
-FUEL_SEL = pulp.LpVariable.dicts("Fuel_Selection", fuels, cat='Binary')
-
+params = {'years': years, 'units': units, 'fuels': fuels, 'unit_fuels': unit_fuels, 'COP': COP,
+          'C_op': C_op, 'C_inv': C_inv, 'C_f': C_f, 'X': X, 'X_max': X_max, 'x': x, 'D': D}
 
-# Linear programming
+# Linear programming - every combination is built completely and solved once
 for fuel_combination in combinations(fuels, 2):
+    model = build_q3_new_model(params, fuel_combination)
+    model.presolve()
+    model.solve(**solver_options)
+    solver_calls += model.solver_calls
 
-    # Lp Problem for Cost Optimization
-    prb = pulp.LpProblem(f"Optimization_for_{fuel_combination}", pulp.LpMinimize)
-
-    # Objective Function - minimize the total system cost
-    prb += pulp.lpSum([C_op[u] * G[t, u, f] for t in years for u in units for f in fuels]
-                      + [C_inv[u] * CAP[t, u] for t in years for u in units]
-                      + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
-
-    # Constraint: Choose exactly two power fuels
-    prb += pulp.lpSum(FUEL_SEL[fuel] for fuel in fuel_combination) == 2
-
-    for year in years:
-        a = 0.2+a
-        # Constraint 1 - Balance Equation: Total generation of heat by each unit is equal to 20% of demand
-        for f1, u1 in unit_fuels.items():
-            for f2, u2 in unit_fuels.items():
-                if f1 != f2:
-                    prb += pulp.lpSum(G[year, u1, f1] + G[year, u2, f2]) >= a * D[years.index(year)]
-
-        # prb += pulp.lpSum(G[i, j, f] for i in years for f, j in unit_fuels.items()) >= a * D[years.index(year)] + D[years.index(year)]
-
-        for unit in units:
-            # Constraint 3 - Capacity Boundary Constraint: Increment of X[u] by x[u] every 5 years
-            if year % 5 == 0:
-                prb += CAP[year, unit] <= CAP[year, unit] + x[unit]
-                prb += CAP[year, unit] + x[unit] * (year - 2025) <= X_max[unit]
+    if model.is_optimal():
+        if model.objective() < best_objective:
+            best_objective = model.objective()
+            best_fuels = fuel_combination
+            best_model = model
 
-            # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
-            prb += F[year, 'electricity'] == pulp.LpAffineExpression([(G[year, 'power_plant', 'electricity'], 1 / COP['electricity'])])
-            prb += F[year, 'green_hydrogen'] == pulp.LpAffineExpression([(G[year, 'hydrogen_plant', 'green_hydrogen'], 1 / COP['green_hydrogen'])])
-            prb += F[year, 'synthetic_gas'] == pulp.LpAffineExpression([(G[year, 'gas_plant', 'synthetic_gas'], 1 / COP['synthetic_gas'])])
-
-            # Non-negative Constraint - decision variables are non-negative
-            prb += G[year, unit, fuel_combination[0]] >= 0
-            prb += G[year, unit, fuel_combination[1]] >= 0
-            prb += CAP[year, unit] >= 0
-
-            for fuel in fuels:
-                # Constraint 2: Generated heat does not exceed already installed capacity
-                prb += G[year, unit, fuel] <= CAP[year, unit]
-
-                prb += F[year, fuel] >= 0
-
-
-                prb.solve(pulp.GUROBI())
-
-                if prb.status == pulp.LpStatusOptimal:
-                    if pulp.value(prb.objective) < best_objective:
-                        best_objective = pulp.value(prb.objective)
-                        best_fuels = fuel_combination
-
-
-# Optimization
-# prb.solve(pulp.GUROBI())
+print(f"Solver calls: {solver_calls}")
 
 print("=========== Minimum Cost ======================")
 print(f"The optimal fuel combination for minimizing cost is: {best_fuels}")
 print(f"Optimal Value of Z when using {best_fuels}:", best_objective)
 print(objective_values)
 
+if best_model is None:
+    print("No fuel combination gives a feasible model")
+    raise SystemExit
+
 print("============= Individual Heat Production ======================")
-# Extracting the optimal values of decision variables
-optimal_fuel_values = {(unit, fuel, year): G[year, unit, fuel].varValue for year in years for unit in units for fuel in fuels}
-print(optimal_fuel_values)
+# Extracting the optimal values of decision variables, a (years, units, fuels) array of G
+optimal_fuel_values = solution_arrays(best_model)['G']
+print(format_solution(best_model, ['G']))
 
 # Calculating the total heat produced by the two cheapest fuels
 total_heat_produced = 0
 
-for unit in units:
+for u, unit in enumerate(units):
     heat_produced = 0
-    for year in years:
+    for i, year in enumerate(years):
         for fuel in best_fuels:
-            heat_produced += COP[fuel] * optimal_fuel_values[unit, fuel, year]
+            heat_produced += COP[fuel] * optimal_fuel_values[i, u, fuels.index(fuel)]
 
     total_heat_produced += heat_produced
     print(f"Heat Produced by {unit}: {heat_produced}")
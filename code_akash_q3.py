@@ -1,5 +1,9 @@
 import pulp
-from itertools import permutations
+
+from model_builder import build_q1_model
+from presolve import format_report
+from results import format_solution, solution_arrays
+from solver_backend import options_from_argv
 
 # ============================= Constants ==========================================================
 # Considering the years from 2025 to 2045 with 5 years leap
@@ -82,88 +86,34 @@ D = [
 best_objective = float('inf')
 best_fuels = None
 
-# Lp Problem for Cost Optimization
-prb = pulp.LpProblem(f"Optimization_for_", pulp.LpMinimize)
-
-# ============================== Decision Variables - value will start from 0 ===============================
-# G represents the amount of energy (heat) produced by each unit u
-G = pulp.LpVariable.dicts("Generation",
-                          [(t, u) for t in years for u in units],
-                          lowBound=0,
-                          cat='Continuous')
-
-# CAP represents the installed capacity (how much heat is already produced by each unit u)
-CAP = pulp.LpVariable.dicts("Installed_Capacity", [(t, u) for t in years for u in units],
-                            lowBound=0,
-                            cat='Continuous')
-
-# F represents amount of fuel needed (given as input to each unit u)to operate
-F = pulp.LpVariable.dicts("Fuel_Consumption", [(t, f) for t in years for f in fuels],
-                          lowBound=0,
-                          cat='Continuous')
-
-# Objective Function - minimize the total system cost
-prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units]
-                  + [C_inv[u] * CAP[t, u] for t in years for u in units]
-                  + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
-
-
-# Constraints
-for year in years:
-    # Constraint 1 - Balance Equation: Total generation of heat by each unit is equal to 20% of demand
-    prb += pulp.lpSum(G[i, j] for i in years for j in units) == 0.2 * D[years.index(year)]
-
-    for unit in units:
-        # Constraint 2: Generated heat does not exceed already installed capacity
-        prb += G[year, unit] <= CAP[year, unit]
+# ============================== Build once, then solve =========================================
+params = {'years': years, 'units': units, 'fuels': fuels, 'COP': COP, 'C_op': C_op, 'C_inv': C_inv,
+          'C_f': C_f, 'X': X, 'X_max': X_max, 'x': x, 'D': D}
 
-        # Constraint 3 - Capacity Boundary Constraint: Increment of X[u] by x[u] every 5 years
-        if year % 5 == 0:
-            prb += CAP[year, unit] <= CAP[year, unit] + X[unit]
-            prb += CAP[year, unit] + X[unit] <= X_max[unit]
+# Lp Problem for Cost Optimization - all variables and constraints are added before the solve
+model = build_q1_model(params)
+G, CAP, F = model.G, model.CAP, model.F
 
-        # ---------- From Online ------------------------------
-        # Constraint 3 - Capacity Boundary Constraint: Increment of X[u] by x[u] every 5 years
-        # Option - 1
-        # for i in range(len(years) - 1):
-        #     prb += X[year, unit] + x[unit] * (years[i + 1] - 2025) == X[year, unit] + x[unit] * (years[i] - 2025)
+# Remove tautologies, repeated rows and rows implied by the variable bounds before the solve
+print(format_report(model.presolve()))
 
-        # Option - 2
-        # if year % 5 == 0:
-        #     prb += X[unit] + x[unit] * (year - 2025) == X_max[unit]
-
-        # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
-        prb += F[year, 'electricity'] == pulp.LpAffineExpression([(G[year, 'power_plant'], 1 / COP['electricity'])])
-        prb += F[year, 'green_hydrogen'] == pulp.LpAffineExpression([(G[year, 'hydrogen_plant'], 1 / COP['green_hydrogen'])])
-        prb += F[year, 'synthetic_gas'] == pulp.LpAffineExpression([(G[year, 'gas_plant'], 1 / COP['synthetic_gas'])])
-
-        # Non-negative Constraint - decision variables are non-negative
-        prb += G[year, unit] >= 0
-        prb += CAP[year, unit] >= 0
-
-        for fuel in fuels:
-            prb += F[year, fuel] >= 0
-
-            prb.solve(pulp.GUROBI())
-
-            if prb.status == pulp.LpStatusOptimal:
-                if pulp.value(prb.objective) < best_objective:
-                    best_objective = pulp.value(prb.objective)
-                    best_fuel = fuel
+# Optimization
+model.solve(**options_from_argv())
 
+if model.is_optimal():
+    best_objective = model.objective()
 
-# Optimization
-# prb.solve(pulp.GUROBI())
+print(f"Status: {pulp.LpStatus[model.prb.status]} after {model.solver_calls} solver call(s)")
 
 # Displaying the results
 print("Optimal solution:")
-for v in prb.variables():
-    print(f"{v.name}: {v.varValue}")
+print(format_solution(model))
 
 print("=================Minimum Costs===========================================================")
 # Extracting the optimal values of decision variables
-optimal_fuel_values = {(unit, year): G[year, unit].varValue for year in years for unit in units }
-print(optimal_fuel_values)
+# (years, units) array of G
+optimal_fuel_values = solution_arrays(model)['G']
+print(format_solution(model, ['G']))
 
 # Sorting fuels by their costs
 sorted_fuels = sorted(C_f.keys(), key=lambda fuel: C_f[fuel])
@@ -173,11 +123,11 @@ cheapest_fuels = sorted_fuels[:2]
 
 # Calculating the total heat produced by the two cheapest fuels
 total_heat_produced = 0
-for unit in units:
+for u, unit in enumerate(units):
     heat_produced = 0
     for fuel in cheapest_fuels:
-        for year in years:
-            heat_produced += COP[fuel] * optimal_fuel_values[unit, year]
+        for i, year in enumerate(years):
+            heat_produced += COP[fuel] * optimal_fuel_values[i, u]
             total_heat_produced += heat_produced
     print(f"Heat Produced by {unit}: {heat_produced}")
 
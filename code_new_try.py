@@ -5,8 +5,13 @@ Created on Tue Jan 30 15:51:45 2024
 @author: roksa
 """
 
+import sys
 import pulp
 from itertools import permutations
+
+from model_builder import ModelBuilder
+from results import format_arrays, variable_arrays, variable_axes
+from solver_backend import options_from_argv, solve
 #from itertools import product
 
 # Constants
@@ -40,6 +45,7 @@ D = [11940000, 10830000, 10000000, 9440000,
      8880000]  # heat demands for 2025,2030,2035,2040,2045 resepectively, unit in MWh
 best_objective = float('inf')
 best_fuels = None
+solver_options = options_from_argv()
 
 # ... (Your imports and constant definitions)
 # Decision Variables - value will start from 0
@@ -47,73 +53,122 @@ G = pulp.LpVariable.dicts("Generation", [(t, u) for t in years for u in units],0
 CAP = pulp.LpVariable.dicts("Installed_Capacity", [(t, u) for t in years for u in units],0)  # X represents the installed capacity (how much heat is already produced by each unit u)
 F = pulp.LpVariable.dicts("Fuel_Consumption", [(t, f) for t in years for f in fuels],0)  # F represents amount of fuel needed (given as input to each unit u)to operate
 
-# Integer Linear Programming
-for i, t in enumerate(years):
-    for u, f in zip(units, fuels):
-        for fuel_combination in permutations(fuels, 2):  # optimization for best fuels to find out which fuel/ more than one fuels is best suited to get the minimum value Z
-            prb = pulp.LpProblem(f"Optimization_for_{fuel_combination[0]}_{fuel_combination[1]}",
-                                         pulp.LpMinimize)
+# Fuel selection mode - 'enumerate' solves one LP per year x unit x fuel permutation,
+# 'milp' states the same choice once with binary selection variables (run with --milp)
+MODE = 'milp' if '--milp' in sys.argv[1:] else 'enumerate'
+
+if MODE == 'milp':
+    # Mixed Integer Linear Programming - one solve instead of years x units x permutations,
+    # rows named by family as in model_builder
+    model = ModelBuilder("Optimization_for_fuel_selection")
+    prb = model.prb
+
+    # SCN[t, u] selects the (year, unit) subproblem the enumeration would have solved,
+    # FUEL_SEL[f] selects the fuels of the combination
+    SCN = model.variables("Scenario_Selection", [(t, u) for t in years for u in units], cat='Binary')
+    FUEL_SEL = model.variables("Fuel_Selection", fuels, cat='Binary')
+
+    # Objective Function - minimize the total system cost
+    prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units] +
+                      [C_inv[u] * CAP[t, u] for t in years for u in units] +
+                      [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
 
-            # Objective Function - minimize the total system cost
-            prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units] +
-                                      [C_inv[u] * CAP[t, u] for t in years for u in units] +
-                                      [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+    # Selection Constraints - exactly one subproblem and a combination of two fuels
+    model.add(pulp.lpSum(SCN[t, u] for t in years for u in units) == 1, "Scenario_Selection")
+    model.add(pulp.lpSum(FUEL_SEL[f] for f in fuels) == 2, "Fuel_Selection")
 
-            # Balance Equation - total generation of heat by each unit will be equal to 20% of demand of that pa
-            prb += G[t, 'power_plant'] + G[t, 'hydrogen_plant'] + G[t, 'gas_plant'] == (0.2*(i+1)) * D[i]
+    for i, t in enumerate(years):
+        demand = 0.2 * (i + 1) * D[i]
 
-            # Constraints
-            # Capacity Constraint - The generated heat from each unit does not exceed the already installed capacity for that unit
-            prb += G[t, u] <= CAP[t, u]
+        # Balance Equation - only the selected year has to meet its 20% share of demand
+        model.add(G[t, 'power_plant'] + G[t, 'hydrogen_plant'] + G[t, 'gas_plant'] ==
+                  demand * pulp.lpSum(SCN[t, u] for u in units), "Balance")
 
-            # Capacity Boundary Constraint - Increment of X[u] by x[u] every 5 years
-            prb += CAP[t, u] <= CAP[t, u] + X[u]
-            prb += CAP[t, u] + X[u] <= X_max[u]
+        for u, f in zip(units, fuels):
+            # Capacity Constraint - big-M relaxed unless (t, u) is the selected subproblem,
+            # the generation of a unit can never exceed the demand of that year
+            model.add(G[t, u] - CAP[t, u] <= demand * (1 - SCN[t, u]), "Capacity")
 
+            # Capacity Boundary Constraint
+            model.add(CAP[t, u] + X[u] <= X_max[u], "Capacity_Boundary")
 
-            # print(G[t, 'power_plant'])
             # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
-            prb += F[t, 'electricity'] == pulp.LpAffineExpression(
-                        [(G[t, 'power_plant'], 1 / COP['electricity'])])
-            prb += F[t, 'green_hydrogen'] == pulp.LpAffineExpression(
-                        [(G[t, 'hydrogen_plant'], 1 / COP['green_hydrogen'])])
-            prb += F[t, 'synthetic_gas'] == pulp.LpAffineExpression(
-                        [(G[t, 'gas_plant'], 1 / COP['synthetic_gas'])])
-
-            # Non-negative Constraint - decision variables are non-negative
-            prb += G[t, u] >= 0
-            prb += CAP[t, u] >= 0
-            prb += F[t, f] >= 0
+            model.add(F[t, f] == pulp.LpAffineExpression([(G[t, u], 1 / COP[f])]), "Fuel_Consumption")
+
+            # Fuel Selection Constraint - big-M, a fuel is only consumed if it is part of the combination
+            model.add(F[t, f] <= demand / COP[f] * FUEL_SEL[f], "Fuel_Use")
+
+    # Optimization
+    model.solve(**solver_options)
+
+    if prb.status == pulp.LpStatusOptimal:
+        best_objective = pulp.value(prb.objective)
+        best_fuels = tuple(f for f in fuels if FUEL_SEL[f].varValue > 0.5)
+
+        # Heat produced by every unit in every year, in MWh
+        print(format_arrays(variable_arrays(prb, {'G': G}), variable_axes({'G': G})))
+
+else:
+    # Integer Linear Programming
+    for i, t in enumerate(years):
+        for u, f in zip(units, fuels):
+            for fuel_combination in permutations(fuels, 2):  # optimization for best fuels to find out which fuel/ more than one fuels is best suited to get the minimum value Z
+                prb = pulp.LpProblem(f"Optimization_for_{fuel_combination[0]}_{fuel_combination[1]}",
+                                             pulp.LpMinimize)
+
+                # Objective Function - minimize the total system cost
+                prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units] +
+                                          [C_inv[u] * CAP[t, u] for t in years for u in units] +
+                                          [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+                # Balance Equation - total generation of heat by each unit will be equal to 20% of demand of that pa
+                prb += G[t, 'power_plant'] + G[t, 'hydrogen_plant'] + G[t, 'gas_plant'] == (0.2*(i+1)) * D[i]
+
+                # Constraints
+                # Capacity Constraint - The generated heat from each unit does not exceed the already installed capacity for that unit
+                prb += G[t, u] <= CAP[t, u]
+
+                # Capacity Boundary Constraint - Increment of X[u] by x[u] every 5 years
+                prb += CAP[t, u] <= CAP[t, u] + X[u]
+                prb += CAP[t, u] + X[u] <= X_max[u]
+
+
+                # print(G[t, 'power_plant'])
+                # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
+                prb += F[t, 'electricity'] == pulp.LpAffineExpression(
+                            [(G[t, 'power_plant'], 1 / COP['electricity'])])
+                prb += F[t, 'green_hydrogen'] == pulp.LpAffineExpression(
+                            [(G[t, 'hydrogen_plant'], 1 / COP['green_hydrogen'])])
+                prb += F[t, 'synthetic_gas'] == pulp.LpAffineExpression(
+                            [(G[t, 'gas_plant'], 1 / COP['synthetic_gas'])])
+
+                # Non-negative Constraint - decision variables are non-negative
+                prb += G[t, u] >= 0
+                prb += CAP[t, u] >= 0
+                prb += F[t, f] >= 0
             
-            #prb += G[t, 'power_plant'] > 0
-            #prb += G[t, 'hydrogen_plant'] > 0
+                #prb += G[t, 'power_plant'] > 0
+                #prb += G[t, 'hydrogen_plant'] > 0
 
-            # Optimization
-            prb.solve(pulp.GUROBI())
+                # Optimization
+                solve(prb, **solver_options)
             
             
-        #if prb.status == pulp.LpStatusOptimal:
-            for t in years:
-                G_power = pulp.value(G[t, 'power_plant'])
-                G_hydrogen = pulp.value(G[t, 'hydrogen_plant'])
-                G_sgas = pulp.value(G[t, 'gas_plant'])
-                
-                print(f"At year {t}:")
-                print(f"  Heat produced by power plant: {G_power} MWh")
-                print(f"  Heat produced by hydrogen plant: {G_hydrogen} MWh")
-                print(f"  Heat produced by gas plant: {G_sgas} MWh")
+            #if prb.status == pulp.LpStatusOptimal:
+                # Heat produced by every unit in every year, in MWh
+                print(format_arrays(variable_arrays(prb, {'G': G}), variable_axes({'G': G})))
             
             
            
 
-            # Debugging Print Statements
-            # print(f"Status: {pulp.LpStatus[prb.status]}")
-            # print(f"Objective Value: {pulp.value(prb.objective)}")
+                # Debugging Print Statements
+                # print(f"Status: {pulp.LpStatus[prb.status]}")
+                # print(f"Objective Value: {pulp.value(prb.objective)}")
 
-            if prb.status == pulp.LpStatusOptimal:
-                if pulp.value(prb.objective) < best_objective:
-                    best_objective = pulp.value(prb.objective)
-                    best_fuels = fuel_combination
+                if prb.status == pulp.LpStatusOptimal:
+                    if pulp.value(prb.objective) < best_objective:
+                        best_objective = pulp.value(prb.objective)
+                        best_fuels = fuel_combination
 
 # Print the results
 print(f"The optimal fuel combination for minimizing cost is: {best_fuels}")
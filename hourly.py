@@ -0,0 +1,124 @@
+from itertools import chain
+
+import numpy as np
+
+from matrix_builder import MatrixModel
+
+# ============================= Hourly Time Resolution =============================================
+# The dispatch block (Balance, Capacity, Peak_Capacity, Fuel_Consumption) is built for every hour of a
+# planning year, the capacity block (Installed_Capacity and its bounds) once per planning year. The rows come from
+# generators that yield one NumPy block per planning year, so no Python list of constraints is held
+# and a 5 planning year x 8760 h model (~130k generation columns) builds in well under 2 GB.
+#   time_resolution='year' - one time slot per planning year, the annual model of code_new_try.py
+#   time_resolution='hour' - HOURS_PER_YEAR slots, demand follows an hourly profile
+# With carry_capacity the planning years are coupled: installed capacity is kept from one planning year
+# to the next (Capacity_Carry rows), and initial_capacity is the capacity the first year starts from.
+# A profile is either one (hours,) array for every planning year or a (years, hours) array with a profile
+# per planning year (timeseries.py); the rows of a year only read that year's row of it.
+HOURS_PER_YEAR = 8760
+
+
+def heat_profile(hours=HOURS_PER_YEAR):
+    # Synthetic heat demand profile: winter peak, summer low and a morning/evening daily pattern.
+    # The shares sum to 1 over the year, so D[i] * profile is the hourly demand in MWh.
+    h = np.arange(hours)
+    seasonal = 1 + 0.6 * np.cos(2 * np.pi * h / hours)
+    daily = 1 + 0.2 * np.cos(2 * np.pi * (h % 24 - 8) / 24) + 0.1 * np.cos(4 * np.pi * (h % 24 - 8) / 24)
+    profile = seasonal * daily
+    return profile / profile.sum()
+
+
+def _unit_fuel_pairs(params):
+    units, fuels = params['units'], params['fuels']
+    unit_fuels = params.get('unit_fuels') or dict(zip(fuels, units))
+    return (np.array([units.index(u) for u in unit_fuels.values()]),
+            np.array([fuels.index(f) for f in unit_fuels]))
+
+
+def demand_share(params):
+    # Share of D[i] covered in planning year i, params['share'] or 20% more every 5 years
+    return params.get('share') or [0.2 * (i + 1) for i in range(len(params['years']))]
+
+
+def capacity_rows(params, CAP, carry_capacity=False):
+    # Capacity block, once per planning year: CAP[t, u] + X[u] <= X_max[u]
+    units = params['units']
+    X = np.array([params['X'][u] for u in units], dtype=float)
+    X_max = np.array([params['X_max'][u] for u in units], dtype=float)
+    for i in range(len(params['years'])):
+        yield 'Capacity_Boundary', CAP[i][:, None], 1.0, -np.inf, X_max - X
+
+        # Capacity Carry Constraint - CAP[t, u] >= CAP[t - 1, u], installed capacity is not retired
+        if carry_capacity and i > 0:
+            yield 'Capacity_Carry', np.stack([CAP[i], CAP[i - 1]], axis=-1), [1.0, -1.0], 0.0, np.inf
+
+
+def year_profile(profile, i):
+    return np.asarray(profile[i], dtype=float) if profile.ndim == 2 else profile
+
+
+def dispatch_rows(params, G, CAP, F, profile):
+    # Dispatch block, one (hours x units) block per planning year
+    COP = np.array([params['COP'][f] for f in params['fuels']], dtype=float)
+    unit_ids, fuel_ids = _unit_fuel_pairs(params)
+    hours = profile.shape[-1]
+    share = demand_share(params)
+
+    for i in range(len(params['years'])):
+        # Balance Equation - generation meets the 20% per 5 years share of demand in every hour
+        year = year_profile(profile, i)
+        demand = share[i] * params['D'][i] * year
+        yield 'Balance', G[i], 1.0, demand, demand
+
+        # Capacity Constraint - the yearly generation of a unit does not exceed its installed capacity (MWh)
+        annual = np.concatenate([G[i].T, CAP[i][:, None]], axis=1)
+        yield 'Capacity', annual, np.append(np.ones(hours), -1.0), -np.inf, 0.0
+
+        # Peak Capacity Constraint - in every hour a unit runs at most at the rate of the demand peak,
+        # G[t, h, u] <= max(profile) * CAP[t, u] (the yearly model has only the Capacity rows)
+        if hours > 1:
+            yield 'Peak_Capacity', np.stack([G[i], np.broadcast_to(CAP[i], G[i].shape)], axis=-1), \
+                [1.0, -year.max()], -np.inf, 0.0
+
+        # Fuel Consumption Constraint - F[t, h, f] - G[t, h, u] / COP[f] == 0
+        pairs = np.stack([F[i][:, fuel_ids], G[i][:, unit_ids]], axis=-1)
+        coefs = np.stack([np.ones(len(fuel_ids)), -1 / COP[fuel_ids]], axis=-1)
+        yield 'Fuel_Consumption', pairs, np.broadcast_to(coefs, pairs.shape).reshape(-1, 2), 0.0, 0.0
+
+
+def time_profile(time_resolution='hour', profile=None):
+    if time_resolution == 'year':
+        return np.ones(1)
+    if time_resolution == 'hour':
+        if profile is None:
+            return heat_profile()
+        # (years, hours) profiles may be memory-mapped, they are read one planning year at a time
+        return profile if getattr(profile, 'ndim', 1) == 2 else np.asarray(profile, dtype=float)
+    raise ValueError(f"Unknown time resolution: {time_resolution}")
+
+
+def build_time_resolved_matrix(params, time_resolution='hour', profile=None, name="Optimization_hourly",
+                               carry_capacity=False, initial_capacity=None):
+    profile = time_profile(time_resolution, profile)
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    T, H, U, Fn = len(years), profile.shape[-1], len(units), len(fuels)
+    C_op = np.array([params['C_op'][u] for u in units], dtype=float)
+    C_inv = np.array([params['C_inv'][u] for u in units], dtype=float)
+    C_f = np.array([params['C_f'][f] for f in fuels], dtype=float)
+
+    model = MatrixModel(name)
+    model.params = params
+    model.profile = profile
+
+    # Decision Variables - capacity per planning year, generation and fuel per hour
+    G = model.add_columns('Generation', (T, H, U), C_op[None, None, :], axes=('years', 'hours', 'units'))
+    CAP = model.add_columns('Installed_Capacity', (T, U), C_inv[None, :], axes=('years', 'units'))
+    F = model.add_columns('Fuel_Consumption', (T, H, Fn), C_f[None, None, :], axes=('years', 'hours', 'fuels'))
+
+    for block in chain(capacity_rows(params, CAP, carry_capacity), dispatch_rows(params, G, CAP, F, profile)):
+        model.add_rows(*block)
+
+    model.assemble()
+    if initial_capacity is not None:
+        model.col_lower[CAP[0]] = initial_capacity
+    return model
@@ -0,0 +1,233 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import sqlite3
+import time
+import traceback
+from concurrent.futures import as_completed
+from contextlib import nullcontext
+from functools import partial
+
+from solution_cache import params_key
+
+# ============================= Sweep Ledger =======================================================
+# Every finished scenario of a sweep is written to an on-disk ledger as soon as it is solved, so a sweep
+# that dies partway through resumes with the unfinished scenarios only. A ledger is a directory with one
+# SQLite file per shard (shard-<i>-of-<N>.sqlite); each file has a single writer, so the shards of one
+# sweep can run on several machines against a shared filesystem without SQLite locking across hosts.
+# Scenario n belongs to shard n % N. Before solving, a shard reads the finished scenarios of all files
+# in the directory, so re-running with another N (or after a shard was moved) never solves twice.
+# merge() collects the rows of all shards in scenario order.
+# A sweep is identified by the hash of its family, builder source, parameters, parameter sets and the
+# solver options that change results, so the ledger of a changed sweep is never mixed with an old one.
+LEDGER_DIR = 'sweep_ledger'
+DONE, FAILED = 'done', 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (sweep TEXT PRIMARY KEY, description TEXT, scenarios INTEGER);
+CREATE TABLE IF NOT EXISTS results (sweep TEXT, scenario TEXT, state TEXT, row TEXT, error TEXT, host TEXT,
+                                    finished REAL, PRIMARY KEY (sweep, scenario));
+"""
+
+
+def sweep_id(family, params, parameter_sets, solver_options):
+    from sweep import BUILDERS
+
+    options = {k: solver_options.get(k) for k in ('mip_gap', 'time_limit', 'cutoff')}
+    return params_key(family, BUILDERS[family], params, parameter_sets or [{}], options)[:16]
+
+
+def parse_shard(text):
+    # '2/4' -> (1, 4): the second of four shards, 1 <= i <= N on the command line
+    i, n = (int(part) for part in text.split('/'))
+    if not 1 <= i <= n:
+        raise ValueError(f"Shard {text} is not in 1/N ... N/N")
+    return i - 1, n
+
+
+def in_shard(scenario_list, shard=(0, 1)):
+    i, n = shard
+    return [s for position, s in enumerate(scenario_list) if position % n == i]
+
+
+def _key(scenario_key):
+    return json.dumps(list(scenario_key))
+
+
+def _tuple(value):
+    # Scenario keys come back from JSON with lists where they had tuples
+    return tuple(_tuple(v) for v in value) if isinstance(value, list) else value
+
+
+class Ledger:
+
+    def __init__(self, directory=LEDGER_DIR, sweep=None, shard=(0, 1)):
+        self.directory = directory
+        self.sweep = sweep
+        self.shard = shard
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"shard-{shard[0] + 1}-of-{shard[1]}.sqlite")
+        # Rollback journal rather than WAL, WAL needs shared memory which network filesystems do not offer
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute('PRAGMA synchronous=FULL')
+        self.connection.executescript(_SCHEMA)
+
+    def register(self, description, scenarios):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO sweeps VALUES (?, ?, ?)',
+                                    (self.sweep, json.dumps(description), scenarios))
+
+    def record(self, rows, errors=()):
+        # One transaction per call, a crash loses at most the rows of the call in progress
+        host = socket.gethostname()
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(self.sweep, _key(row['scenario']), DONE, json.dumps(row), None, host, now) for row in rows]
+                + [(self.sweep, _key(key), FAILED, None, error, host, now) for key, error in errors])
+
+    def close(self):
+        self.connection.close()
+
+
+def _shard_files(directory):
+    return sorted(glob.glob(os.path.join(directory, 'shard-*-of-*.sqlite')))
+
+
+def _query(directory, sql, parameters=()):
+    # Rows of sql over every shard file of the ledger, read-only
+    for path in _shard_files(directory):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=60)
+        try:
+            yield from connection.execute(sql, parameters)
+        except sqlite3.OperationalError:
+            pass   # a shard file that has not got its tables yet
+        finally:
+            connection.close()
+
+
+def finished_rows(directory, sweep):
+    # {scenario key: result row} of every shard
+    rows = {}
+    for scenario, row in _query(directory, 'SELECT scenario, row FROM results WHERE sweep = ? AND state = ?',
+                                (sweep, DONE)):
+        row = json.loads(row)
+        row['scenario'] = _tuple(row['scenario'])
+        rows[scenario] = row
+    return rows
+
+
+def merge(directory, sweep, scenario_list=None):
+    # (rows in scenario order, keys of the scenarios that are not finished yet)
+    rows = finished_rows(directory, sweep)
+    if scenario_list is None:
+        return sorted(rows.values(), key=lambda row: row['scenario']), []
+    keys = [_key(s.key) for s in scenario_list]
+    return [rows[key] for key in keys if key in rows], [s.key for s, key in zip(scenario_list, keys) if key not in rows]
+
+
+# ============================== Running ===========================================================
+def _solve(solve, scenario):
+    try:
+        return scenario.key, solve(scenario), None
+    except Exception:
+        return scenario.key, None, traceback.format_exc(limit=3)
+
+
+def run_ledger(scenario_list, directory=LEDGER_DIR, sweep=None, shard=(0, 1), workers=None, threads_per_worker=1,
+               cache_options=None, fast_path=True, description=None, **solver_options):
+    # Solves the unfinished scenarios of the shard, each written to the ledger as it finishes.
+    # Returns (finished before, solved now, failed now)
+    from sweep import MERIT_ORDER_FAMILIES, merit_order_rows, solve_scenario, worker_pool
+
+    scenario_list = list(scenario_list)
+    ledger = Ledger(directory, sweep, shard)
+    ledger.register(description, len(scenario_list))
+    done = finished_rows(directory, sweep)
+    pending = [s for s in in_shard(scenario_list, shard) if _key(s.key) not in done]
+    finished_before = len(in_shard(scenario_list, shard)) - len(pending)
+    solved = failed = 0
+
+    try:
+        fast = [s for s in pending if fast_path and s.family in MERIT_ORDER_FAMILIES]
+        if fast:
+            ledger.record(merit_order_rows(fast).values())
+            solved += len(fast)
+            pending = [s for s in pending if s.family not in MERIT_ORDER_FAMILIES]
+
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+        solver_options['threads'] = threads_per_worker
+        solve = partial(_solve, partial(solve_scenario, solver_options=solver_options, cache_options=cache_options))
+
+        with worker_pool(workers, threads_per_worker) if workers > 1 else nullcontext() as pool:
+            if pool is None:
+                outcomes = map(solve, pending)
+            else:
+                outcomes = (future.result() for future in as_completed([pool.submit(solve, s) for s in pending]))
+            for key, row, error in outcomes:
+                if error is None:
+                    ledger.record([row])
+                    solved += 1
+                else:
+                    ledger.record([], [(key, error)])
+                    failed += 1
+    finally:
+        ledger.close()
+    return finished_before, solved, failed
+
+
+# ============================== Command line ======================================================
+def status(directory):
+    # {sweep: (description, scenarios, done, failed)} over all shards
+    sweeps = {}
+    for sweep, description, scenarios in _query(directory, 'SELECT sweep, description, scenarios FROM sweeps'):
+        sweeps[sweep] = [json.loads(description), scenarios, set(), set()]
+    for sweep, scenario, state in _query(directory, 'SELECT sweep, scenario, state FROM results'):
+        if sweep in sweeps:
+            sweeps[sweep][2 if state == DONE else 3].add(scenario)
+    return {sweep: (description, scenarios, len(done), len(failed - done))
+            for sweep, (description, scenarios, done, failed) in sweeps.items()}
+
+
+def main(argv=None):
+    from sweep import best, write_table
+    import results
+
+    parser = argparse.ArgumentParser(description="Inspect and merge the ledger of a sharded sweep")
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('status', help="finished and failed scenarios of every sweep in the ledger")
+    show.add_argument('directory', nargs='?', default=LEDGER_DIR)
+    collect = commands.add_parser('merge', help="write the finished scenarios of all shards to one result file")
+    collect.add_argument('directory', nargs='?', default=LEDGER_DIR)
+    collect.add_argument('--sweep', default=None, help="sweep id, required if the ledger holds several sweeps")
+    collect.add_argument('--out', default='sweep_results.csv',
+                         help="result file, .csv, .npz, .arrow/.feather or .parquet")
+    args = parser.parse_args(argv)
+
+    sweeps = status(args.directory)
+    if args.command == 'status':
+        for sweep, (description, scenarios, done, failed) in sweeps.items():
+            print(f"{sweep} {description}: {done} of {scenarios} finished, {failed} failed")
+        return
+
+    if args.sweep is None and len(sweeps) != 1:
+        parser.error(f"the ledger holds {len(sweeps)} sweeps, choose one with --sweep")
+    sweep = args.sweep or next(iter(sweeps))
+    table, _ = merge(args.directory, sweep)
+    if args.out.lower().endswith('.csv'):
+        write_table(table, args.out)
+    else:
+        results.write_results(table, args.out)
+    _, scenarios, done, failed = sweeps[sweep]
+    row = best(table)
+    print(f"{done} of {scenarios} scenarios ({failed} failed) written to {args.out}")
+    if row is not None:
+        print(f"Best scenario {row['scenario']}: {row['objective']}")
+
+
+if __name__ == '__main__':
+    main()
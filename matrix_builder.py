@@ -0,0 +1,242 @@
+import copy
+import time
+
+import numpy as np
+import pulp
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csr_matrix, vstack
+
+import telemetry
+from solver_backend import SCIPY_STATUS, SolveResult
+
+# ============================= Matrix Builder =====================================================
+# Builds the same objective and constraints as model_builder, but directly as a cost vector, column
+# bounds and a CSR constraint matrix with row bounds (row_lower <= A x <= row_upper). No PuLP
+# expression objects are created, every constraint family is one NumPy block, so build time grows
+# linearly with years x units x fuels. The matrix is passed straight to HiGHS via scipy.optimize.milp.
+
+
+class MatrixModel:
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}   # variable family -> (offset, shape)
+        self.axes = {}      # variable family -> params list of every axis, e.g. ('years', 'units')
+        self.rows = {}      # constraint family -> list of (start, stop) row ranges
+        self.n_cols = 0
+        self.n_rows = 0
+        self._blocks = []
+
+    def add_columns(self, family, shape, cost, lower=0.0, upper=np.inf, integer=False, axes=None):
+        size = int(np.prod(shape))
+        self.columns[family] = (self.n_cols, tuple(shape))
+        self.axes[family] = tuple(axes) if axes is not None else None
+        self._blocks.append(('col', np.broadcast_to(cost, shape).ravel(), np.full(size, lower, dtype=float),
+                             np.full(size, upper, dtype=float), np.full(size, int(integer))))
+        index = self.n_cols + np.arange(size).reshape(shape)
+        self.n_cols += size
+        return index
+
+    def add_rows(self, family, cols, vals, lower, upper):
+        # cols and vals are (rows, terms) arrays, lower and upper broadcast to one bound per row
+        shape = np.shape(cols)
+        n = int(np.prod(shape[:-1]))
+        cols = np.asarray(cols).reshape(n, shape[-1])
+        vals = np.broadcast_to(vals, cols.shape)
+        self.rows.setdefault(family, []).append((self.n_rows, self.n_rows + n))
+        self._blocks.append(('row', cols, vals, np.broadcast_to(lower, (n,)).astype(float),
+                             np.broadcast_to(upper, (n,)).astype(float), self.n_rows))
+        self.n_rows += n
+
+    def assemble(self):
+        cols = [b for b in self._blocks if b[0] == 'col']
+        rows = [b for b in self._blocks if b[0] == 'row']
+
+        self.c = np.concatenate([b[1] for b in cols])
+        self.col_lower = np.concatenate([b[2] for b in cols])
+        self.col_upper = np.concatenate([b[3] for b in cols])
+        self.integrality = np.concatenate([b[4] for b in cols])
+
+        row_ids = np.concatenate([np.repeat(np.arange(b[1].shape[0]), b[1].shape[1]) + b[5] for b in rows])
+        col_ids = np.concatenate([b[1].ravel() for b in rows])
+        vals = np.concatenate([b[2].ravel() for b in rows])
+        self.A = csr_matrix((vals, (row_ids, col_ids)), shape=(self.n_rows, self.n_cols))
+        self.row_lower = np.concatenate([b[3] for b in rows])
+        self.row_upper = np.concatenate([b[4] for b in rows])
+        self._blocks = []
+        return self
+
+    def values(self, x, family):
+        offset, shape = self.columns[family]
+        return x[offset:offset + int(np.prod(shape))].reshape(shape)
+
+    def family_counts(self):
+        return {family: sum(stop - start for start, stop in ranges) for family, ranges in self.rows.items()}
+
+    def column_index(self, family):
+        offset, shape = self.columns[family]
+        return offset + np.arange(int(np.prod(shape))).reshape(shape)
+
+    def columns_of(self, family, axis, label):
+        # Columns of a family for one label of a named axis, e.g. ('Fuel_Consumption', 'fuels', 'electricity')
+        position = self.axes[family].index(axis)
+        labels = self.params[axis] if axis in self.params else range(self.columns[family][1][position])
+        return np.take(self.column_index(family), list(labels).index(label), axis=position).ravel()
+
+    def row_index(self, family):
+        return np.concatenate([np.arange(start, stop) for start, stop in self.rows[family]])
+
+    def generation_entries(self, fuel):
+        # The G entries (-1 / COP) of the Fuel_Consumption rows holding an F column of the fuel,
+        # as positions in A.data plus their rows and columns
+        A = self.A
+        rows = self.row_index('Fuel_Consumption')
+        counts = A.indptr[rows + 1] - A.indptr[rows]
+        positions = np.repeat(A.indptr[rows] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        entry_rows = np.repeat(rows, counts)
+        is_fuel = np.isin(A.indices[positions], self.columns_of('Fuel_Consumption', 'fuels', fuel))
+
+        selected = np.isin(entry_rows, entry_rows[is_fuel]) & ~is_fuel
+        return positions[selected], entry_rows[selected], A.indices[positions[selected]]
+
+
+def with_row(model, family, coefficients, lower, upper):
+    # Copy of an assembled model with one more row lower <= coefficients . x <= upper; A and the row
+    # bounds are new arrays, the column arrays are copied so the copy can be changed on its own
+    extended = copy.copy(model)
+    extended.A = csr_matrix(vstack([model.A, csr_matrix(np.asarray(coefficients, dtype=float)[None, :])]))
+    extended.row_lower = np.append(model.row_lower, lower)
+    extended.row_upper = np.append(model.row_upper, upper)
+    extended.rows = {**model.rows, family: [(model.n_rows, model.n_rows + 1)]}
+    extended.n_rows = model.n_rows + 1
+    extended.c, extended.col_lower, extended.col_upper = model.c.copy(), model.col_lower.copy(), model.col_upper.copy()
+    return extended
+
+
+# ============================== code_akash_q1.py / code_akash_q3.py ===============================
+# Same rows as model_builder.build_q1_model, including its tautologies and repeated rows
+def build_q1_matrix(params, name="Optimization_for_"):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    T, U, Fn = len(years), len(units), len(fuels)
+    C_op = np.array([params['C_op'][u] for u in units], dtype=float)
+    C_inv = np.array([params['C_inv'][u] for u in units], dtype=float)
+    C_f = np.array([params['C_f'][f] for f in fuels], dtype=float)
+    COP = np.array([params['COP'][f] for f in fuels], dtype=float)
+    X = np.array([params['X'][u] for u in units], dtype=float)
+    X_max = np.array([params['X_max'][u] for u in units], dtype=float)
+    D = np.asarray(params['D'][:T], dtype=float)
+
+    model = MatrixModel(name)
+    model.params = params
+
+    # Decision Variables - value will start from 0
+    G = model.add_columns('Generation', (T, U), C_op[None, :], axes=('years', 'units'))
+    CAP = model.add_columns('Installed_Capacity', (T, U), C_inv[None, :], axes=('years', 'units'))
+    F = model.add_columns('Fuel_Consumption', (T, Fn), C_f[None, :], axes=('years', 'fuels'))
+
+    # Constraint 1 - Balance Equation: sum of G over all years and units equals 20% of each year's demand
+    model.add_rows('Balance', np.broadcast_to(G.ravel(), (T, T * U)), 1.0, 0.2 * D, 0.2 * D)
+
+    # Constraint 2: Generated heat does not exceed already installed capacity
+    model.add_rows('Capacity', np.stack([G, CAP], axis=-1), [1.0, -1.0], -np.inf, 0.0)
+
+    # Constraint 3 - Capacity Boundary Constraint: CAP <= CAP + X (no columns left) and CAP + X <= X_max
+    model.add_rows('Capacity_Boundary', np.empty((T * U, 0), dtype=int), 1.0, -np.inf,
+                   np.broadcast_to(X, (T, U)).ravel())
+    model.add_rows('Capacity_Boundary', CAP[..., None], 1.0, -np.inf, np.broadcast_to(X_max - X, (T, U)).ravel())
+
+    # Fuel Consumption Constraint - F[t, f] - G[t, u] / COP[f] == 0, added once per unit of the year
+    P = min(U, Fn)
+    pairs = np.stack([F[:, :P], G[:, :P]], axis=-1)
+    coefs = np.stack([np.ones(P), -1 / COP[:P]], axis=-1)
+    model.add_rows('Fuel_Consumption', np.broadcast_to(pairs[:, None], (T, U, P, 2)),
+                   np.broadcast_to(coefs, (T, U, P, 2)).reshape(-1, 2), 0.0, 0.0)
+
+    # Non-negative Constraint - G and CAP once, F once per unit of the year
+    model.add_rows('Non_Negative', G[..., None], 1.0, 0.0, np.inf)
+    model.add_rows('Non_Negative', CAP[..., None], 1.0, 0.0, np.inf)
+    model.add_rows('Non_Negative', np.broadcast_to(F[:, None, :, None], (T, U, Fn, 1)), 1.0, 0.0, np.inf)
+
+    return model.assemble()
+
+
+# ============================== bhai_q3_new.py ====================================================
+# Same rows as model_builder.build_q3_new_model for one combination of fuels
+def build_q3_new_matrix(params, fuel_combination, name=None):
+    years, units, fuels, unit_fuels = params['years'], params['units'], params['fuels'], params['unit_fuels']
+    T, U, Fn = len(years), len(units), len(fuels)
+    C_op = np.array([params['C_op'][u] for u in units], dtype=float)
+    C_inv = np.array([params['C_inv'][u] for u in units], dtype=float)
+    C_f = np.array([params['C_f'][f] for f in fuels], dtype=float)
+    x = np.array([params['x'][u] for u in units], dtype=float)
+    X_max = np.array([params['X_max'][u] for u in units], dtype=float)
+    D = np.asarray(params['D'][:T], dtype=float)
+    elapsed = np.asarray(years, dtype=float) - 2025
+
+    model = MatrixModel(name or f"Optimization_for_{fuel_combination}")
+    model.params = params
+
+    # Decision Variables - value will start from 0
+    G = model.add_columns('Generation', (T, U, Fn), C_op[None, :, None], axes=('years', 'units', 'fuels'))
+    CAP = model.add_columns('Installed_Capacity', (T, U), C_inv[None, :], axes=('years', 'units'))
+    F = model.add_columns('Fuel_Consumption', (T, Fn), C_f[None, :], axes=('years', 'fuels'))
+    FUEL_SEL = model.add_columns('Fuel_Selection', (Fn,), 0.0, upper=1.0, integer=True, axes=('fuels',))
+
+    # Constraint: Choose exactly two power fuels
+    combo = [fuels.index(f) for f in fuel_combination]
+    model.add_rows('Fuel_Selection', FUEL_SEL[combo][None, :], 1.0, 2.0, 2.0)
+
+    # Constraint 1 - Balance Equation: every ordered pair of fuels covers the share of demand
+    fuel_ids = np.array([fuels.index(f) for f in unit_fuels])
+    unit_ids = np.array([units.index(u) for u in unit_fuels.values()])
+    first, second = np.nonzero(~np.eye(len(fuel_ids), dtype=bool))
+    g_fuel = G[:, unit_ids, fuel_ids]                        # (T, pairs of unit_fuels)
+    share = 0.2 * (np.arange(T) + 1)
+    model.add_rows('Balance', np.stack([g_fuel[:, first], g_fuel[:, second]], axis=-1), 1.0,
+                   np.repeat(share * D, len(first)), np.inf)
+
+    # Constraint 3 - Capacity Boundary Constraint: CAP <= CAP + x (no columns left) and CAP + x * (t - 2025) <= X_max
+    model.add_rows('Capacity_Boundary', np.empty((T * U, 0), dtype=int), 1.0, -np.inf,
+                   np.broadcast_to(x, (T, U)).ravel())
+    model.add_rows('Capacity_Boundary', CAP[..., None], 1.0, -np.inf,
+                   (X_max[None, :] - x[None, :] * elapsed[:, None]).ravel())
+
+    # Fuel Consumption Constraint - added once per unit of the year
+    COP = np.array([params['COP'][fuels[f]] for f in fuel_ids], dtype=float)
+    pairs = np.stack([F[:, fuel_ids], g_fuel], axis=-1)
+    coefs = np.broadcast_to(np.stack([np.ones(len(fuel_ids)), -1 / COP], axis=-1), (T, U, len(fuel_ids), 2))
+    model.add_rows('Fuel_Consumption', np.broadcast_to(pairs[:, None], coefs.shape), coefs.reshape(-1, 2), 0.0, 0.0)
+
+    # Non-negative Constraint
+    model.add_rows('Non_Negative', G[:, :, combo][..., None], 1.0, 0.0, np.inf)
+    model.add_rows('Non_Negative', CAP[..., None], 1.0, 0.0, np.inf)
+    model.add_rows('Non_Negative', np.broadcast_to(F[:, None, :, None], (T, U, Fn, 1)), 1.0, 0.0, np.inf)
+
+    # Constraint 2: Generated heat does not exceed already installed capacity
+    model.add_rows('Capacity', np.stack([G, np.broadcast_to(CAP[..., None], G.shape)], axis=-1), [1.0, -1.0],
+                   -np.inf, 0.0)
+
+    return model.assemble()
+
+
+# ============================== Solve =============================================================
+def solve_matrix(model, time_limit=None, mip_gap=None, presolve=True):
+    options = {'disp': False, 'presolve': presolve}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+    if mip_gap is not None:
+        options['mip_rel_gap'] = mip_gap
+
+    start, cpu_start = time.perf_counter(), telemetry.cpu_time()
+    res = milp(model.c, integrality=model.integrality, bounds=Bounds(model.col_lower, model.col_upper),
+               constraints=LinearConstraint(model.A, model.row_lower, model.row_upper), options=options)
+    solve_time = time.perf_counter() - start
+
+    status = pulp.LpStatus[SCIPY_STATUS.get(res.status, pulp.LpStatusUndefined)]
+    objective = float(res.fun) if res.status == 0 else None
+    model.x = res.x
+    result = SolveResult('highs', status, objective, solve_time)
+    if telemetry.enabled():
+        telemetry.record(model.name, telemetry.matrix_stats(model), result, solve_time,
+                         telemetry.cpu_time() - cpu_start, res)
+    return result
@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+import numpy as np
+
+# ============================= Merit Order ========================================================
+# With fixed capacity limits the dispatch of a year is an LP without integer coupling: the demand share
+# 0.2 * (i + 1) * D[i] is filled by the cheapest units first. A unit costs
+#   C_op[u] + C_inv[u] + C_f[f] / COP[f]  per MWh (CAP[t, u] = G[t, u] at the optimum)
+# and produces at most X_max[u] - X[u]. This is the exact optimum of
+# model_builder.build_combination_model and of the yearly hourly.build_time_resolved_matrix model, for
+# non-negative investment costs, computed in closed form for all years and for S parameter sets at once.
+
+MeritOrderResult = namedtuple('MeritOrderResult', ['G', 'CAP', 'F', 'cost', 'feasible'])
+
+
+def parameter_arrays(params, variations=None):
+    # Parameter dicts as (S, n) arrays. variations gives the values that change per parameter set,
+    # e.g. {'C_f': {'electricity': prices}, 'D': demands (S, years)}; unchanged values are broadcast.
+    variations = variations or {}
+    sizes = [np.size(v) for value in variations.values()
+             for v in (value.values() if isinstance(value, dict) else [np.asarray(value)[..., 0]])]
+    S = max(sizes, default=1)
+
+    arrays = {}
+    for name, keys in (('C_op', 'units'), ('C_inv', 'units'), ('X', 'units'), ('X_max', 'units'),
+                       ('C_f', 'fuels'), ('COP', 'fuels')):
+        array = np.tile(np.array([params[name][k] for k in params[keys]], dtype=float), (S, 1))
+        for key, values in variations.get(name, {}).items():
+            array[:, params[keys].index(key)] = values
+        arrays[name] = array
+
+    D = np.asarray(variations.get('D', params['D'][:len(params['years'])]), dtype=float)
+    arrays['D'] = np.broadcast_to(D, (S, len(params['years'])))
+    return arrays
+
+
+def stack_params(params_list):
+    # variations for merit_order from a list of params dicts with the same years, units and fuels
+    variations = {'D': [p['D'][:len(p['years'])] for p in params_list]}
+    for name in ('C_op', 'C_inv', 'X', 'X_max', 'C_f', 'COP'):
+        variations[name] = {k: [p[name][k] for p in params_list] for k in params_list[0][name]}
+    return variations
+
+
+def merit_order(params, variations=None, fuel_combination=None):
+    units, fuels = params['units'], params['fuels']
+    unit_fuels = params.get('unit_fuels') or dict(zip(fuels, units))
+    arrays = parameter_arrays(params, variations)
+    S, T = arrays['D'].shape
+
+    unit_ids = np.array([units.index(u) for u in unit_fuels.values()])
+    fuel_ids = np.array([fuels.index(f) for f in unit_fuels])
+    allowed = np.array([fuel_combination is None or f in fuel_combination for f in unit_fuels])
+
+    # Cost and capacity of every (unit, fuel) pair, units outside the combination get no capacity
+    cost = (arrays['C_op'][:, unit_ids] + arrays['C_inv'][:, unit_ids]
+            + arrays['C_f'][:, fuel_ids] / arrays['COP'][:, fuel_ids])                        # (S, P)
+    headroom = arrays['X_max'][:, unit_ids] - arrays['X'][:, unit_ids]
+    capacity = np.where(allowed, np.maximum(headroom, 0), 0)
+
+    order = np.argsort(cost, axis=1)
+    sorted_cost = np.take_along_axis(cost, order, axis=1)
+    sorted_capacity = np.take_along_axis(capacity, order, axis=1)
+    filled_before = np.cumsum(sorted_capacity, axis=1) - sorted_capacity
+
+    # Demand share of every year, filled pair by pair in merit order
+    demand = 0.2 * (np.arange(T) + 1) * arrays['D']                                             # (S, T)
+    produced = np.clip(demand[:, :, None] - filled_before[:, None, :], 0, sorted_capacity[:, None, :])
+
+    G_pairs = np.empty_like(produced)
+    np.put_along_axis(G_pairs, np.broadcast_to(order[:, None, :], produced.shape), produced, axis=2)
+
+    G = np.zeros((S, T, len(units)))
+    F = np.zeros((S, T, len(fuels)))
+    G[:, :, unit_ids] = G_pairs
+    F[:, :, fuel_ids] = G_pairs / arrays['COP'][:, None, fuel_ids]
+
+    total = (produced * sorted_cost[:, None, :]).sum(axis=(1, 2))
+    feasible = ((sorted_capacity.sum(axis=1)[:, None] >= demand * (1 - 1e-12)).all(axis=1)
+                & (headroom >= 0).all(axis=1))
+    return MeritOrderResult(G, G.copy(), F, np.where(feasible, total, np.inf), feasible)
@@ -0,0 +1,209 @@
+import argparse
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import solver_backend
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import with_row
+from persistent_model import PersistentModel
+from shipped_data import default_params
+
+# ============================= Modelling to Generate Alternatives ==================================
+# Near-optimal portfolios: after the base solve, a Cost_Slack row c . x <= (1 + slack) * optimum is
+# added and the model is re-solved with diversity objectives instead of the cost:
+#   random - random directions over the fuel use and the installed capacity of every planning year,
+#            plus minimizing and maximizing every fuel; the directions are independent and are dealt
+#            to worker processes
+#   hsj    - Hop-Skip-Jump: minimize the number of times each G / CAP column was non-zero in the
+#            solutions so far, one after the other
+# Only the cost vector changes between solves, so every solve starts from the previous basis (which
+# stays primal feasible). Alternatives whose fuel mix (fuel shares of every planning year) differs by
+# less than `distinct` from one already found are dropped.
+METHODS = ['random', 'hsj', 'both']
+TOLERANCE = 1e-6
+
+Alternative = namedtuple('Alternative', ['direction', 'cost', 'fuel_mix', 'CAP'])
+MGAResult = namedtuple('MGAResult', ['optimum', 'alternatives', 'solves', 'base_time', 'solve_time'])
+
+_worker = {}
+
+
+def with_cost_slack(model, optimum=None, slack=0.05):
+    # Copy of the model with the Cost_Slack row, the original costs kept in cost_c; without an optimum
+    # the row has no bound yet
+    bound = np.inf if optimum is None else optimum + slack * abs(optimum)
+    slacked = with_row(model, 'Cost_Slack', model.c, -np.inf, bound)
+    slacked.cost_c = model.c.copy()
+    return slacked
+
+
+def fuel_mix(model, x):
+    # (years, fuels) share of every fuel in the fuel consumption of each planning year
+    F = model.values(x, 'Fuel_Consumption')
+    totals = F.reshape(F.shape[0], -1, F.shape[-1]).sum(axis=1)
+    return totals / np.maximum(totals.sum(axis=1, keepdims=True), TOLERANCE)
+
+
+def _summary(model, label, x):
+    return Alternative(label, float(model.cost_c @ x), fuel_mix(model, x),
+                       model.values(x, 'Installed_Capacity').copy())
+
+
+def random_directions(model, n, seed=0):
+    # (label, cost vector) pairs: min and max of every fuel total, then random weights on the fuel use and
+    # the capacity of every (planning year, fuel) and (planning year, unit)
+    fuels = model.params['fuels']
+    F, CAP = model.column_index('Fuel_Consumption'), model.column_index('Installed_Capacity')
+    fuel_cols = [F[i, ..., f].ravel() for i in range(F.shape[0]) for f in range(F.shape[-1])]
+    unit_cols = [CAP[i, u].ravel() for i in range(CAP.shape[0]) for u in range(CAP.shape[1])]
+    directions = []
+    for f, fuel in enumerate(fuels):
+        for sign, name in ((1.0, 'min'), (-1.0, 'max')):
+            c = np.zeros(model.n_cols)
+            c[F[..., f].ravel()] = sign
+            directions.append((f"{name} {fuel}", c))
+
+    rng = np.random.default_rng(seed)
+    for k in range(max(0, n - len(directions))):
+        c = np.zeros(model.n_cols)
+        for cols, weight in zip(fuel_cols + unit_cols, rng.uniform(-1, 1, len(fuel_cols) + len(unit_cols))):
+            c[cols] = weight
+        directions.append((f"random {k}", c))
+    return directions[:n]
+
+
+def _solve_directions(model, directions, persistent=None):
+    # Every direction on one PersistentModel, each solve warm-started from the last basis
+    persistent = persistent or PersistentModel(model)
+    alternatives = []
+    all_cols = np.arange(model.n_cols)
+    for label, c in directions:
+        persistent.set_costs(all_cols, c)
+        if persistent.solve().status == 'Optimal':
+            alternatives.append(_summary(model, label, persistent.x))
+    return alternatives, len(directions)
+
+
+def _init_worker(model, basis, highs_options):
+    # Every worker starts from the basis of the base solve
+    persistent = PersistentModel(model, **{**highs_options, 'threads': 1})
+    persistent.set_basis(*basis)
+    _worker['persistent'] = persistent
+
+
+def _solve_chunk(directions):
+    persistent = _worker['persistent']
+    return _solve_directions(persistent.model, directions, persistent)
+
+
+def hop_skip_jump(model, persistent, iterations, first_x):
+    # Minimize how often each G / CAP column was used so far, until a solution repeats
+    used = np.zeros(model.n_cols)
+    columns = np.concatenate([model.column_index('Generation').ravel(), model.column_index('Installed_Capacity').ravel()])
+    x, alternatives, solves = first_x, [], 0
+    all_cols = np.arange(model.n_cols)
+    for k in range(iterations):
+        used[columns] += x[columns] > TOLERANCE
+        persistent.set_costs(all_cols, used)
+        solves += 1
+        if persistent.solve().status != 'Optimal':
+            break
+        if np.allclose(persistent.x, x, rtol=1e-6, atol=1e-3):
+            break
+        x = persistent.x
+        alternatives.append(_summary(model, f"hsj {k}", x))
+    return alternatives, solves
+
+
+def distinct_alternatives(alternatives, distinct=0.01):
+    kept = []
+    for alternative in alternatives:
+        if all(np.abs(alternative.fuel_mix - other.fuel_mix).max() > distinct for other in kept):
+            kept.append(alternative)
+    return kept
+
+
+def explore(model, slack=0.05, n=24, method='both', workers=1, distinct=0.01, seed=0, **highs_options):
+    # The base solve and all diversity objectives run on one PersistentModel of the model with the
+    # Cost_Slack row, which has no bound for the base solve, so the first alternative already starts
+    # from the optimal basis; worker processes get that basis too
+    start = time.perf_counter()
+    slacked = with_cost_slack(model)
+    persistent = PersistentModel(slacked, **highs_options)
+    result = persistent.solve()
+    base_time = time.perf_counter() - start
+    if result.status != 'Optimal':
+        return MGAResult(None, [], 1, base_time, base_time)
+
+    persistent.set_row_bounds(slacked.row_index('Cost_Slack'), -np.inf, result.objective + slack * abs(result.objective))
+    optimum_x = persistent.x
+    found, solves = [_summary(slacked, 'optimum', optimum_x)], 1
+
+    if method in ('random', 'both'):
+        directions = random_directions(slacked, n, seed)
+        if workers > 1:
+            chunks = [directions[w::workers] for w in range(workers)]
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(slacked, persistent.basis(), highs_options)) as pool:
+                for alternatives, count in pool.map(_solve_chunk, chunks):
+                    found += alternatives
+                    solves += count
+        else:
+            alternatives, count = _solve_directions(slacked, directions, persistent)
+            found += alternatives
+            solves += count
+
+    if method in ('hsj', 'both'):
+        alternatives, count = hop_skip_jump(slacked, persistent, n, optimum_x)
+        found += alternatives
+        solves += count
+
+    return MGAResult(result.objective, distinct_alternatives(found, distinct), solves, base_time,
+                     time.perf_counter() - start)
+
+
+# ============================== Command line ======================================================
+def format_mix(fuels, shares):
+    # Solver noise like -1e-12 would print as -0.0%
+    return ', '.join(f"{f} {share:.1%}" for f, share in zip(fuels, np.clip(shares, 0, 1) + 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Near-optimal alternative fuel mixes of the shipped model")
+    parser.add_argument('--slack', type=float, default=0.05, help="cost slack as a share of the optimum")
+    parser.add_argument('--alternatives', type=int, default=24, help="diversity objectives per method")
+    parser.add_argument('--method', default='both', choices=METHODS)
+    parser.add_argument('--hours', type=int, default=1, help="time slots per planning year, 1 for the yearly model")
+    parser.add_argument('--workers', type=int, default=1, help="processes for the random directions")
+    parser.add_argument('--distinct', type=float, default=0.01, help="smallest difference of two fuel mixes")
+    parser.add_argument('--seed', type=int, default=0)
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    params = default_params('q3_new')
+    model = (build_time_resolved_matrix(params, 'year') if args.hours == 1
+             else build_time_resolved_matrix(params, 'hour', heat_profile(args.hours)))
+    result = explore(model, args.slack, args.alternatives, args.method, args.workers, args.distinct, args.seed,
+                     threads=options['threads'], time_limit=options['time_limit'], presolve=options['presolve'])
+    if result.optimum is None:
+        print("The base model has no optimal solution")
+        return
+
+    print(f"Optimum {result.optimum:.6g}, {len(result.alternatives)} distinct fuel mixes within {args.slack:.0%} "
+          f"from {result.solves} solves in {result.solve_time:.3f} s (base solve {result.base_time:.3f} s)")
+    optimum = result.alternatives[0].fuel_mix
+    for alternative in result.alternatives:
+        # The optimum with every planning year, the alternatives with the years their shares differ in
+        print(f"{alternative.direction:<20} cost {alternative.cost / result.optimum - 1:+.2%}")
+        differs = np.abs(alternative.fuel_mix - optimum).max(axis=1) > args.distinct
+        for year, shares, shown in zip(params['years'], alternative.fuel_mix, differs | ~differs.any()):
+            if shown:
+                print(f"    {year}  {format_mix(params['fuels'], shares)}")
+
+
+if __name__ == '__main__':
+    main()
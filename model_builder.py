@@ -0,0 +1,341 @@
+import time
+
+import pulp
+
+import presolve
+import solver_backend
+import telemetry
+from pulp_compat import variable_dicts
+
+# ============================= Model Builder ======================================================
+# Assembles all variables and constraints of a model first and solves it once. Every constraint is
+# added under a family name (Balance, Capacity, ...) so the constraints of the built problem are
+# named <family>_<n> and can be counted per family. build_time runs from the creation of the builder
+# to the last added constraint.
+
+
+class ModelBuilder:
+
+    def __init__(self, name, sense=pulp.LpMinimize):
+        self.prb = pulp.LpProblem(name, sense)
+        self.families = {}
+        self.solver_calls = 0
+        self.build_start = time.perf_counter()
+        self.build_time = 0.0
+
+    def add(self, constraint, family):
+        # Comparisons of two constants (x[u] <= X_max[u]) are plain booleans and not added
+        if constraint is True:
+            return
+        n = self.families.get(family, 0)
+        self.prb += constraint, f"{family}_{n}"
+        self.families[family] = n + 1
+        self.build_time = time.perf_counter() - self.build_start
+
+    def variables(self, name, indices, lowBound=None, upBound=None, cat=pulp.LpContinuous):
+        # Dict of variables of the problem, as pulp.LpVariable.dicts
+        return variable_dicts(self.prb, name, indices, lowBound, upBound, cat)
+
+    def presolve(self):
+        # Drop trivial, bound, duplicate and dominated rows before the solve, counted per family
+        self.prb, self.presolve_report = presolve.remove_redundant(self.prb)
+        return self.presolve_report
+
+    def solve(self, **options):
+        # options are passed on to solver_backend.solve (backend, threads, time_limit, mip_gap, presolve)
+        with telemetry.context(build_time=self.build_time):
+            self.result = solver_backend.solve(self.prb, **options)
+        self.solver_calls += 1
+        return self.result
+
+    def objective(self):
+        return pulp.value(self.prb.objective)
+
+    def is_optimal(self):
+        return self.prb.status == pulp.LpStatusOptimal
+
+
+# ============================== code_akash_q1.py / code_akash_q3.py ===============================
+# G[t, u], CAP[t, u] and F[t, f] where the unit and fuel lists are parallel (units[i] burns fuels[i])
+def build_q1_model(params, name="Optimization_for_"):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    COP, C_op, C_inv, C_f = params['COP'], params['C_op'], params['C_inv'], params['C_f']
+    X, X_max, D = params['X'], params['X_max'], params['D']
+
+    model = ModelBuilder(name)
+
+    # Decision Variables - value will start from 0
+    model.G = model.variables("Generation", [(t, u) for t in years for u in units],
+                              lowBound=0, cat='Continuous')
+    model.CAP = model.variables("Installed_Capacity", [(t, u) for t in years for u in units],
+                                lowBound=0, cat='Continuous')
+    model.F = model.variables("Fuel_Consumption", [(t, f) for t in years for f in fuels],
+                              lowBound=0, cat='Continuous')
+    G, CAP, F = model.G, model.CAP, model.F
+
+    # Objective Function - minimize the total system cost
+    model.prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units]
+                            + [C_inv[u] * CAP[t, u] for t in years for u in units]
+                            + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+    for year in years:
+        # Constraint 1 - Balance Equation: Total generation of heat by each unit is equal to 20% of demand
+        model.add(pulp.lpSum(G[i, j] for i in years for j in units) == 0.2 * D[years.index(year)], "Balance")
+
+        for unit in units:
+            # Constraint 2: Generated heat does not exceed already installed capacity
+            model.add(G[year, unit] <= CAP[year, unit], "Capacity")
+
+            # Constraint 3 - Capacity Boundary Constraint: Increment of X[u] by x[u] every 5 years
+            model.add(CAP[year, unit] <= CAP[year, unit] + X[unit], "Capacity_Boundary")
+            model.add(CAP[year, unit] + X[unit] <= X_max[unit], "Capacity_Boundary")
+
+            # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
+            for u, f in zip(units, fuels):
+                model.add(F[year, f] == pulp.LpAffineExpression([(G[year, u], 1 / COP[f])]), "Fuel_Consumption")
+
+            # Non-negative Constraint - decision variables are non-negative
+            model.add(G[year, unit] >= 0, "Non_Negative")
+            model.add(CAP[year, unit] >= 0, "Non_Negative")
+            for fuel in fuels:
+                model.add(F[year, fuel] >= 0, "Non_Negative")
+
+    return model
+
+
+# ============================== bhai_q3_new.py ====================================================
+# G[t, u, f] with the unit of every fuel given by unit_fuels, for one combination of fuels
+def build_q3_new_model(params, fuel_combination, name=None):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    COP, C_op, C_inv, C_f = params['COP'], params['C_op'], params['C_inv'], params['C_f']
+    X_max, x, D, unit_fuels = params['X_max'], params['x'], params['D'], params['unit_fuels']
+
+    model = ModelBuilder(name or f"Optimization_for_{fuel_combination}")
+
+    # Decision Variables - value will start from 0
+    model.G = model.variables("Generation", [(t, u, f) for t in years for u in units for f in fuels],
+                              lowBound=0, cat='Continuous')
+    model.CAP = model.variables("Installed_Capacity", [(t, u) for t in years for u in units],
+                                lowBound=0, cat='Continuous')
+    model.F = model.variables("Fuel_Consumption", [(t, f) for t in years for f in fuels],
+                              lowBound=0, cat='Continuous')
+    model.FUEL_SEL = model.variables("Fuel_Selection", fuels, cat='Binary')
+    G, CAP, F, FUEL_SEL = model.G, model.CAP, model.F, model.FUEL_SEL
+
+    # Objective Function - minimize the total system cost
+    model.prb += pulp.lpSum([C_op[u] * G[t, u, f] for t in years for u in units for f in fuels]
+                            + [C_inv[u] * CAP[t, u] for t in years for u in units]
+                            + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+    # Constraint: Choose exactly two power fuels
+    model.add(pulp.lpSum(FUEL_SEL[fuel] for fuel in fuel_combination) == 2, "Fuel_Selection")
+
+    for i, year in enumerate(years):
+        # Share of the demand grows by 20% every 5 years
+        share = 0.2 * (i + 1)
+
+        # Constraint 1 - Balance Equation: every pair of fuels covers the share of demand
+        for f1, u1 in unit_fuels.items():
+            for f2, u2 in unit_fuels.items():
+                if f1 != f2:
+                    model.add(G[year, u1, f1] + G[year, u2, f2] >= share * D[i], "Balance")
+
+        for unit in units:
+            # Constraint 3 - Capacity Boundary Constraint: Increment of X[u] by x[u] every 5 years
+            model.add(CAP[year, unit] <= CAP[year, unit] + x[unit], "Capacity_Boundary")
+            model.add(CAP[year, unit] + x[unit] * (year - 2025) <= X_max[unit], "Capacity_Boundary")
+
+            # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
+            for f, u in unit_fuels.items():
+                model.add(F[year, f] == pulp.LpAffineExpression([(G[year, u, f], 1 / COP[f])]), "Fuel_Consumption")
+
+            # Non-negative Constraint - decision variables are non-negative
+            model.add(G[year, unit, fuel_combination[0]] >= 0, "Non_Negative")
+            model.add(G[year, unit, fuel_combination[1]] >= 0, "Non_Negative")
+            model.add(CAP[year, unit] >= 0, "Non_Negative")
+
+            for fuel in fuels:
+                # Constraint 2: Generated heat does not exceed already installed capacity
+                model.add(G[year, unit, fuel] <= CAP[year, unit], "Capacity")
+                model.add(F[year, fuel] >= 0, "Non_Negative")
+
+    return model
+
+
+# ============================== code_new_try.py ===================================================
+# One subproblem of the year x unit x fuel permutation enumeration. The fuel permutation does not enter
+# the model, only the year t and the unit u whose capacity is constrained.
+def build_new_try_model(params, year, unit, name=None):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    COP, C_op, C_inv, C_f = params['COP'], params['C_op'], params['C_inv'], params['C_f']
+    X, X_max, D = params['X'], params['X_max'], params['D']
+    i = years.index(year)
+
+    model = ModelBuilder(name or f"Optimization_for_{year}_{unit}")
+
+    # Decision Variables - value will start from 0
+    model.G = model.variables("Generation", [(t, u) for t in years for u in units], 0)
+    model.CAP = model.variables("Installed_Capacity", [(t, u) for t in years for u in units], 0)
+    model.F = model.variables("Fuel_Consumption", [(t, f) for t in years for f in fuels], 0)
+    G, CAP, F = model.G, model.CAP, model.F
+
+    # Objective Function - minimize the total system cost
+    model.prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units] +
+                            [C_inv[u] * CAP[t, u] for t in years for u in units] +
+                            [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+    # Balance Equation - total generation of heat by each unit will be equal to 20% of demand of that year
+    model.add(pulp.lpSum(G[year, u] for u in units) == (0.2 * (i + 1)) * D[i], "Balance")
+
+    # Capacity Constraint - The generated heat from the unit does not exceed the installed capacity
+    model.add(G[year, unit] <= CAP[year, unit], "Capacity")
+
+    # Capacity Boundary Constraint
+    model.add(CAP[year, unit] <= CAP[year, unit] + X[unit], "Capacity_Boundary")
+    model.add(CAP[year, unit] + X[unit] <= X_max[unit], "Capacity_Boundary")
+
+    # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
+    for u, f in zip(units, fuels):
+        model.add(F[year, f] == pulp.LpAffineExpression([(G[year, u], 1 / COP[f])]), "Fuel_Consumption")
+
+    # Non-negative Constraint - decision variables are non-negative
+    f = fuels[units.index(unit)]
+    model.add(G[year, unit] >= 0, "Non_Negative")
+    model.add(CAP[year, unit] >= 0, "Non_Negative")
+    model.add(F[year, f] >= 0, "Non_Negative")
+
+    return model
+
+
+# ============================== 5years_combinationfuel1.py ========================================
+# Electricity plus one other fuel for one year, with the share of electricity growing 20% every 5 years
+def build_5years_model(params, year, other_fuel, name=None):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    COP, C_op, C_inv, C_f = params['COP'], params['C_op'], params['C_inv'], params['C_f']
+    X_max, x, CF, demand = params['X_max'], params['x'], params['CF'], params['demand']
+
+    electricity_contribution = (year - 2025) // 5 * 0.20
+    other_fuel_contribution = 1 - electricity_contribution
+
+    model = ModelBuilder(name or f"Optimization_for_{year}_{other_fuel}")
+
+    # Variables
+    model.G = model.variables("Generation", [(t, u) for t in years for u in units], 0)
+    model.CAP = model.variables("Installed_Capacity", units, 0)
+    model.F = model.variables("Fuel_Consumption", fuels, 0)
+    G, X, F = model.G, model.CAP, model.F
+
+    # Objective Function
+    model.prb += pulp.lpSum(
+        [C_op[u] * G[t, u] for t in years for u in units] +
+        [C_inv[u] * X[u] for u in units] +
+        [C_f[f] * F[f] * COP[f] for f in fuels]
+    ), "TotalCost"
+
+    # Constraints
+    for t in years:
+        model.add(G[t, 'power_plant'] * COP['electricity'] == demand * electricity_contribution, "Balance")
+        model.add(G[t, units[fuels.index(other_fuel)]] * COP[other_fuel] == demand * other_fuel_contribution, "Balance")
+
+    # The script bounds the generation of the last year only
+    for u in units:
+        model.add(G[years[-1], u] <= X[u] * CF, "Capacity")
+        model.add(X[u] <= X_max[u], "Capacity_Boundary")
+        model.add(X[u] <= x[u], "Capacity_Boundary")
+        model.add(x[u] <= X_max[u], "Capacity_Boundary")
+
+    model.add(pulp.lpSum([F[f] for f in fuels if f != 'electricity']) == demand * other_fuel_contribution / COP[other_fuel],
+              "Fuel_Consumption")
+    model.add(F['electricity'] == demand * electricity_contribution / COP['electricity'], "Fuel_Consumption")
+
+    return model
+
+
+# ============================== Fuel combinations =================================================
+# Only the units burning a fuel of the combination may generate. The demand share 0.2 * (i + 1) of every
+# year is met as in code_new_try.py, the capacity is bounded as in code_akash_q1.py.
+def build_combination_model(params, fuel_combination, name=None):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    COP, C_op, C_inv, C_f = params['COP'], params['C_op'], params['C_inv'], params['C_f']
+    X, X_max, D = params['X'], params['X_max'], params['D']
+    unit_fuels = params.get('unit_fuels') or dict(zip(fuels, units))
+
+    model = ModelBuilder(name or f"Optimization_for_{'_'.join(fuel_combination)}")
+
+    # Decision Variables - value will start from 0
+    model.G = model.variables("Generation", [(t, u) for t in years for u in units], lowBound=0)
+    model.CAP = model.variables("Installed_Capacity", [(t, u) for t in years for u in units], lowBound=0)
+    model.F = model.variables("Fuel_Consumption", [(t, f) for t in years for f in fuels], lowBound=0)
+    G, CAP, F = model.G, model.CAP, model.F
+
+    # Objective Function - minimize the total system cost
+    model.prb += pulp.lpSum([C_op[u] * G[t, u] for t in years for u in units]
+                            + [C_inv[u] * CAP[t, u] for t in years for u in units]
+                            + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+    for i, year in enumerate(years):
+        # Balance Equation - generation meets the 20% per 5 years share of demand
+        model.add(pulp.lpSum(G[year, u] for u in units) == 0.2 * (i + 1) * D[i], "Balance")
+
+        for f, u in unit_fuels.items():
+            # Capacity Constraint and Capacity Boundary Constraint
+            model.add(G[year, u] <= CAP[year, u], "Capacity")
+            model.add(CAP[year, u] + X[u] <= X_max[u], "Capacity_Boundary")
+
+            # Fuel Consumption Constraint - Fuel consumption is linked to the generation by the fuel efficiency
+            model.add(F[year, f] == pulp.LpAffineExpression([(G[year, u], 1 / COP[f])]), "Fuel_Consumption")
+
+            # Fuel Selection - units of fuels outside the combination stay off
+            if f not in fuel_combination:
+                model.add(G[year, u] == 0, "Fuel_Selection")
+
+    return model
+
+
+# ============================== k-of-n technology selection =======================================
+# A technology is a (unit, fuel) pair with an efficiency: params['efficiency'][u][f] is the COP of fuel f
+# in unit u (technologies.efficiency_matrix). SEL[u, f] is one binary per technology and at most k are
+# selected, instead of one solve per combinations(fuels, k). Demand as in build_combination_model.
+def build_technology_model(params, k=2, name=None):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    C_op, C_inv, C_f = params['C_op'], params['C_inv'], params['C_f']
+    X, X_max, D = params['X'], params['X_max'], params['D']
+    efficiency = params['efficiency']
+    technologies = [(u, f) for u in units for f in fuels if efficiency.get(u, {}).get(f)]
+
+    model = ModelBuilder(name or f"Optimization_for_{k}_of_{len(technologies)}")
+
+    # Decision Variables - generation per technology, capacity per unit, fuel per fuel
+    model.G = model.variables("Generation", [(t, u, f) for t in years for u, f in technologies], lowBound=0)
+    model.CAP = model.variables("Installed_Capacity", [(t, u) for t in years for u in units], lowBound=0)
+    model.F = model.variables("Fuel_Consumption", [(t, f) for t in years for f in fuels], lowBound=0)
+    model.SEL = model.variables("Technology_Selection", technologies, cat='Binary')
+    G, CAP, F, SEL = model.G, model.CAP, model.F, model.SEL
+
+    # Objective Function - minimize the total system cost
+    model.prb += pulp.lpSum([C_op[u] * G[t, u, f] for t in years for u, f in technologies]
+                            + [C_inv[u] * CAP[t, u] for t in years for u in units]
+                            + [C_f[f] * F[t, f] for t in years for f in fuels]), "TotalCost"
+
+    # Technology Selection - at most k technologies
+    model.add(pulp.lpSum(SEL.values()) <= k, "Technology_Selection")
+
+    for i, year in enumerate(years):
+        # Balance Equation - generation meets the 20% per 5 years share of demand
+        model.add(pulp.lpSum(G[year, u, f] for u, f in technologies) == 0.2 * (i + 1) * D[i], "Balance")
+
+        for u in units:
+            # Capacity Constraint and Capacity Boundary Constraint
+            model.add(pulp.lpSum(G[year, v, f] for v, f in technologies if v == u) <= CAP[year, u], "Capacity")
+            model.add(CAP[year, u] + X[u] <= X_max[u], "Capacity_Boundary")
+
+        for f in fuels:
+            # Fuel Consumption Constraint - the fuel of every technology burning f at its efficiency
+            model.add(F[year, f] == pulp.LpAffineExpression([(G[year, u, g], 1 / efficiency[u][g])
+                                                             for u, g in technologies if g == f]), "Fuel_Consumption")
+
+        for u, f in technologies:
+            # Technology Limit - only selected technologies run, at most at the headroom of their unit
+            model.add(G[year, u, f] <= max(X_max[u] - X[u], 0) * SEL[u, f], "Technology_Limit")
+
+    return model
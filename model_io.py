@@ -0,0 +1,252 @@
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+import solver_backend
+import telemetry
+from hourly import build_time_resolved_matrix
+from matrix_builder import MatrixModel, build_q1_matrix, build_q3_new_matrix, solve_matrix
+from shipped_data import default_params, with_overrides
+from solver_backend import SolveResult
+
+# ============================= Model Bundles ======================================================
+# A built MatrixModel saved once and reloaded without running the Python construction again:
+#   save_bundle / load_bundle - binary bundle (.npz): cost vector, bounds, CSR matrix, row and column
+#                               families with their axes, and the params the model was built from
+#   write_mps / read_mps      - MPS through HiGHS, for other solvers and solver-only benchmarks
+#                               (no index maps, use a bundle to patch parameters); solve_mps solves one
+# patch() changes parameters of a loaded model in place. Every builder keeps the parameters in the
+# same places, so these are patched without knowing which builder made the model:
+#   C_op, C_inv, C_f - costs of the Generation, Installed_Capacity and Fuel_Consumption columns
+#   COP              - the -1 / COP entries of the Fuel_Consumption rows
+#   D                - the Balance row bounds, linear in D[i] and ordered by year; a single value for
+#                      every year, one value per year or {year: value} for some years (--set D.2035=...)
+#   X_max            - the upper bound of the Capacity_Boundary rows on a single CAP column
+# Any other parameter changes the structure or the bound formulas of a builder, rebuild for those.
+PATCHABLE = ['C_op', 'C_inv', 'C_f', 'COP', 'D', 'X_max']
+COST_COLUMNS = {'C_op': ('Generation', 'units'), 'C_inv': ('Installed_Capacity', 'units'),
+                'C_f': ('Fuel_Consumption', 'fuels')}
+ARRAYS = ['c', 'col_lower', 'col_upper', 'integrality', 'row_lower', 'row_upper']
+
+
+def save_bundle(model, path):
+    meta = {'name': model.name, 'n_rows': model.n_rows, 'n_cols': model.n_cols,
+            'columns': model.columns, 'axes': model.axes, 'rows': model.rows, 'params': model.params}
+    extra = {'profile': model.profile} if getattr(model, 'profile', None) is not None else {}
+    # Uncompressed, so loading is a copy of the arrays and nothing else
+    np.savez(path, meta=np.array(json.dumps(meta)), A_data=model.A.data, A_indices=model.A.indices,
+             A_indptr=model.A.indptr, **{name: getattr(model, name) for name in ARRAYS}, **extra)
+
+
+def load_bundle(path):
+    with np.load(path) as bundle:
+        meta = json.loads(str(bundle['meta']))
+        model = MatrixModel(meta['name'])
+        model.n_rows, model.n_cols = meta['n_rows'], meta['n_cols']
+        model.columns = {family: (offset, tuple(shape)) for family, (offset, shape) in meta['columns'].items()}
+        model.axes = {family: tuple(axes) if axes is not None else None for family, axes in meta['axes'].items()}
+        model.rows = {family: [tuple(r) for r in ranges] for family, ranges in meta['rows'].items()}
+        model.params = meta['params']
+        model.A = csr_matrix((bundle['A_data'], bundle['A_indices'], bundle['A_indptr']),
+                             shape=(model.n_rows, model.n_cols))
+        for name in ARRAYS:
+            setattr(model, name, bundle[name])
+        if 'profile' in bundle:
+            model.profile = bundle['profile']
+    return model
+
+
+def write_mps(model, path):
+    import highspy
+    from persistent_model import to_highs_lp
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    highs.passModel(to_highs_lp(model))
+    highs.writeModel(path)
+
+
+def read_mps(path):
+    # A highspy.Highs instance holding the model, ready to run()
+    import highspy
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    highs.readModel(path)
+    return highs
+
+
+def solve_mps(path, threads=None, time_limit=None, mip_gap=None, presolve=True):
+    from persistent_model import highs_status
+
+    highs = read_mps(path)
+    if threads is not None:
+        highs.setOptionValue('threads', threads)
+    if time_limit is not None:
+        highs.setOptionValue('time_limit', float(time_limit))
+    if mip_gap is not None:
+        highs.setOptionValue('mip_rel_gap', float(mip_gap))
+    if not presolve:
+        highs.setOptionValue('presolve', 'off')
+
+    start, cpu_start = time.perf_counter(), telemetry.cpu_time()
+    highs.run()
+    solve_time = time.perf_counter() - start
+    status = highs_status(highs)
+    objective = highs.getInfo().objective_function_value if status == 'Optimal' else None
+    result = SolveResult('highs', status, objective, solve_time)
+    if telemetry.enabled():
+        # No row families in an MPS file, only the totals
+        lp = highs.getLp()
+        problem = {'rows': lp.num_row_, 'cols': lp.num_col_, 'nonzeros': highs.getNumNz(),
+                   'integers': sum(kind.name == 'kInteger' for kind in lp.integrality_), 'families': {}}
+        telemetry.record(path, problem, result, solve_time, telemetry.cpu_time() - cpu_start, highs)
+    return result
+
+
+# ============================== Patching ==========================================================
+def _patch_costs(model, name, values):
+    family, axis = COST_COLUMNS[name]
+    for key, value in values.items():
+        model.c[model.columns_of(family, axis, key)] = value
+
+
+def _patch_cop(model, values):
+    for fuel, cop in values.items():
+        positions, _, _ = model.generation_entries(fuel)
+        model.A.data[positions] = -1 / cop
+
+
+def demand_vector(params, D):
+    # D as one value per planning year, see PATCHABLE
+    years = params['years']
+    if isinstance(D, dict):
+        vector = [float(d) for d in params['D'][:len(years)]]
+        for year, value in D.items():
+            if str(year) not in map(str, years):
+                raise ValueError(f"D.{year}: no such planning year, the years are {years}")
+            vector[list(map(str, years)).index(str(year))] = float(value)
+        return vector
+    if np.ndim(D) == 0:
+        return [float(D)] * len(years)
+    if np.ndim(D) != 1 or len(D) != len(years):
+        raise ValueError(f"D needs one value or one value per planning year ({len(years)}), got {D!r}")
+    return [float(d) for d in D]
+
+
+def demand_ratio(model, D):
+    # Balance rows and the factor of their bounds for the demand D
+    rows = model.row_index('Balance')
+    years = len(model.params['years'])
+    old = np.asarray(model.params['D'][:years], dtype=float)
+    if np.any(old == 0):
+        raise ValueError("Balance rows built for a zero demand cannot be rescaled, rebuild the model")
+    return rows, np.repeat(np.asarray(demand_vector(model.params, D)) / old, len(rows) // years)
+
+
+def x_max_rows(model, unit):
+    # Capacity_Boundary rows on a single CAP column of the unit, their upper bound holds X_max[unit]
+    A = model.A
+    rows = model.row_index('Capacity_Boundary')
+    rows = rows[A.indptr[rows + 1] - A.indptr[rows] == 1]
+    return rows[np.isin(A.indices[A.indptr[rows]], model.columns_of('Installed_Capacity', 'units', unit))]
+
+
+def _patch_demand(model, D):
+    rows, ratio = demand_ratio(model, D)
+    for bounds in (model.row_lower, model.row_upper):
+        finite = np.isfinite(bounds[rows])
+        bounds[rows[finite]] *= ratio[finite]
+
+
+def _patch_x_max(model, values):
+    for unit, value in values.items():
+        model.row_upper[x_max_rows(model, unit)] += value - model.params['X_max'][unit]
+
+
+def patch(model, overrides):
+    # overrides like {'C_f': {'electricity': 80}, 'D': [...]}, as for shipped_data.with_overrides
+    unknown = set(overrides) - set(PATCHABLE)
+    if unknown:
+        raise ValueError(f"Cannot patch {sorted(unknown)} into a built model, rebuild it instead")
+    if 'D' in overrides:
+        overrides = {**overrides, 'D': demand_vector(model.params, overrides['D'])}
+
+    for name, values in overrides.items():
+        if name in COST_COLUMNS:
+            _patch_costs(model, name, values)
+        elif name == 'COP':
+            _patch_cop(model, values)
+        elif name == 'D':
+            _patch_demand(model, values)
+        elif name == 'X_max':
+            _patch_x_max(model, values)
+    model.params = with_overrides(model.params, overrides)
+    return model
+
+
+# ============================== Command line ======================================================
+def build(family, fuel_combination=None, time_resolution='year'):
+    if family == 'q1':
+        return build_q1_matrix(default_params('q1'))
+    if family == 'q3_new':
+        return build_q3_new_matrix(default_params('q3_new'), fuel_combination)
+    if family == 'hourly':
+        return build_time_resolved_matrix(default_params('q3_new'), time_resolution)
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def main(argv=None):
+    from sweep import parse_parameter_sets
+
+    parser = argparse.ArgumentParser(description="Export a built model once, reload, patch and solve it later")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="build a model and save it as a bundle (.npz) or MPS (.mps)")
+    export.add_argument('family', choices=['q1', 'q3_new', 'hourly'])
+    export.add_argument('path')
+    export.add_argument('--fuels', default='electricity,green_hydrogen', help="fuel combination of q3_new")
+    export.add_argument('--time-resolution', default='year', choices=['year', 'hour'])
+    solve = commands.add_parser('solve', help="reload a bundle, patch parameters and solve, or solve an MPS file")
+    solve.add_argument('path')
+    solve.add_argument('--set', action='append', dest='sets', metavar='PARAM[.KEY]=V1,V2,...',
+                       help="parameter values to patch, one solve per combination")
+    solver_backend.add_solver_arguments(solve)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'export':
+        model = build(args.family, tuple(args.fuels.split(',')), args.time_resolution)
+        built = time.perf_counter()
+        (write_mps if args.path.lower().endswith('.mps') else save_bundle)(model, args.path)
+        print(f"Built in {built - start:.3f} s, written to {args.path} in {time.perf_counter() - built:.3f} s")
+        return
+
+    options = solver_backend.options_from_args(args)
+    if args.path.lower().endswith('.mps'):
+        if args.sets:
+            parser.error("an MPS file has no index maps to patch, export a bundle (.npz) instead")
+        result = solve_mps(args.path, options['threads'], options['time_limit'], options['mip_gap'],
+                           options['presolve'])
+        print(f"{args.path}: {result.status}, objective {result.objective}")
+        return
+
+    try:
+        parameter_sets = parse_parameter_sets(args.sets) or [{}]
+    except ValueError as error:
+        parser.error(f"--set: {error}")
+    model = load_bundle(args.path)
+    print(f"Loaded {model.n_rows} rows x {model.n_cols} columns in {time.perf_counter() - start:.3f} s")
+    for overrides in parameter_sets:
+        try:
+            patch(model, overrides)
+        except ValueError as error:
+            parser.error(f"--set: {error}")
+        result = solve_matrix(model, options['time_limit'], options['mip_gap'], options['presolve'])
+        print(f"{overrides}: {result.status}, objective {result.objective}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import solver_backend
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import with_row
+from mga import format_mix, fuel_mix
+from persistent_model import PersistentModel
+from shipped_data import default_params
+
+# ============================= Cost / Emissions Pareto Frontier ====================================
+# The frontier between TotalCost and CO2, traced with the epsilon-constraint method: an Emissions row
+# sum E_f[f] * F[..., f] <= eps is added to the model and the cost is minimized for a series of eps.
+# All points are solved on one PersistentModel, only the upper bound of the Emissions row changes,
+# so every point is a dual simplex warm start from the basis of the previous one.
+# The two ends are the cost optimum and the emission optimum. Further points are placed adaptively:
+# the cost of an LP is convex and piecewise linear in eps, and the dual of the Emissions row is its
+# slope, so between two solved points the frontier lies above both tangents and below the chord.
+# The interval where the triangle between chord and tangents is largest (where the frontier bends)
+# is split at the tangent corner, until `points` are solved or no triangle is larger than `tolerance`
+# of the cost x emissions box. For an LP the corner is a breakpoint of the frontier, so a straight
+# piece is found with one solve and the points found are exact: the frontier is the linear
+# interpolation between them. Models without duals (MIP) split at the middle of the interval.
+# Emission factors are in t CO2 per MWh of fuel, params['E_f'] overrides the defaults.
+EMISSION_FACTORS = {'electricity': 0.38, 'green_hydrogen': 0.02, 'synthetic_gas': 0.2}
+
+ParetoPoint = namedtuple('ParetoPoint', ['emissions', 'cost', 'slope', 'fuel_mix'])
+ParetoResult = namedtuple('ParetoResult', ['points', 'solves', 'iterations', 'solve_time'])
+
+TOLERANCE = 1e-7
+
+
+def emission_factors(params):
+    return {fuel: float(params.get('E_f', {}).get(fuel, EMISSION_FACTORS.get(fuel, 0.0))) for fuel in params['fuels']}
+
+
+def emission_vector(model, factors):
+    # Emissions per unit of every column, non-zero on the Fuel_Consumption columns only
+    e = np.zeros(model.n_cols)
+    for fuel, factor in factors.items():
+        e[model.columns_of('Fuel_Consumption', 'fuels', fuel)] = factor
+    return e
+
+
+def with_emissions(model, factors=None):
+    # Copy of the model with an (unbounded) Emissions row, the emission vector kept in emissions_e
+    factors = emission_factors(model.params) if factors is None else factors
+    e = emission_vector(model, factors)
+    extended = with_row(model, 'Emissions', e, -np.inf, np.inf)
+    extended.emissions_e = e
+    return extended
+
+
+class Frontier:
+
+    def __init__(self, model, factors=None, **highs_options):
+        self.model = with_emissions(model, factors)
+        self.row = self.model.row_index('Emissions')
+        self.persistent = PersistentModel(self.model, **highs_options)
+        self.points = {}   # eps -> ParetoPoint, None where eps is infeasible
+        self.iterations = 0
+
+    def solve(self, eps):
+        # Cost optimum with emissions <= eps
+        p = self.persistent
+        p.set_row_bounds(self.row, -np.inf, eps)
+        result = p.solve()
+        self.iterations += p.iterations
+        if result.status != 'Optimal':
+            self.points[eps] = None
+            return None
+        slope = float(p.row_dual[self.row[0]]) if p.row_dual is not None else None
+        point = ParetoPoint(float(self.model.emissions_e @ p.x), result.objective, slope, fuel_mix(self.model, p.x))
+        self.points[eps] = point
+        return point
+
+    def ends(self):
+        # (emission optimum, cost optimum); the emission optimum is the cheapest point at the lowest emissions
+        p = self.persistent
+        cheapest = self.solve(np.inf)
+        if cheapest is None:
+            return None, None
+        cost = self.model.c.copy()
+        p.set_costs(np.arange(self.model.n_cols), self.model.emissions_e)
+        result = p.solve()
+        self.iterations += p.iterations
+        p.set_costs(np.arange(self.model.n_cols), cost)
+        lowest = self.solve(result.objective * (1 + 1e-9) + 1e-9)
+        return lowest, cheapest
+
+    def trace(self, points=100, tolerance=1e-4):
+        # Adaptive frontier, in increasing emissions
+        lowest, cheapest = self.ends()
+        if lowest is None:
+            return []
+        if cheapest.emissions - lowest.emissions <= TOLERANCE * max(cheapest.emissions, 1.0):
+            return [cheapest]
+        frontier = [lowest, cheapest]
+        flat = [False]   # per interval, True once it is known to be a straight piece
+        area = tolerance * (lowest.cost - cheapest.cost) * (cheapest.emissions - lowest.emissions)
+
+        while len(frontier) < points:
+            gaps = [0.0 if flat[k] else _gap(frontier[k], frontier[k + 1]) for k in range(len(flat))]
+            k = int(np.argmax(gaps))
+            if gaps[k] <= area:
+                break
+            a, b = frontier[k], frontier[k + 1]
+            point = self.solve(_split(a, b))
+            if point is None or not a.emissions < point.emissions < b.emissions or _on_chord(a, b, point):
+                flat[k] = True
+            else:
+                frontier.insert(k + 1, point)
+                flat[k:k + 1] = [False, False]
+        return frontier
+
+    def uniform(self, points=100):
+        # Equal emission steps between the two ends, from the highest emissions down
+        lowest, cheapest = self.ends()
+        if lowest is None:
+            return []
+        steps = np.linspace(cheapest.emissions, lowest.emissions, points)[1:-1]
+        inner = [self.solve(eps) for eps in steps]
+        return [lowest] + [point for point in inner[::-1] if point is not None] + [cheapest]
+
+
+def _gap(a, b):
+    # Area of the triangle between the chord a-b and the tangents at a and b (the frontier lies inside);
+    # without slopes the triangle under the chord in the box of a and b
+    width, height = b.emissions - a.emissions, a.cost - b.cost
+    corner = _tangent_corner(a, b)
+    if corner is None:
+        return 0.5 * width * height
+    e, c = corner
+    return 0.5 * abs(width * (c - a.cost) + height * (e - a.emissions))
+
+
+def _tangent_corner(a, b):
+    # Intersection of the tangents at a and b, None without slopes or for parallel tangents
+    if a.slope is None or b.slope is None or abs(a.slope - b.slope) <= TOLERANCE * max(abs(a.slope), 1.0):
+        return None
+    e = (b.cost - a.cost + a.slope * a.emissions - b.slope * b.emissions) / (a.slope - b.slope)
+    if not a.emissions <= e <= b.emissions:
+        return None
+    return e, a.cost + a.slope * (e - a.emissions)
+
+
+def _split(a, b):
+    # Where the frontier can bend most: the tangent corner, else the middle of the interval
+    corner = _tangent_corner(a, b)
+    return corner[0] if corner is not None else (a.emissions + b.emissions) / 2
+
+
+def _on_chord(a, b, point):
+    chord = a.cost + (b.cost - a.cost) * (point.emissions - a.emissions) / (b.emissions - a.emissions)
+    return point.cost >= chord - TOLERANCE * max(abs(chord), 1.0)
+
+
+def pareto_frontier(model, points=100, tolerance=1e-4, uniform=False, factors=None, **highs_options):
+    start = time.perf_counter()
+    frontier = Frontier(model, factors, **highs_options)
+    traced = frontier.uniform(points) if uniform else frontier.trace(points, tolerance)
+    return ParetoResult(traced, frontier.persistent.solves, frontier.iterations, time.perf_counter() - start)
+
+
+# ============================== Command line ======================================================
+def main(argv=None):
+    from sweep import write_table
+
+    parser = argparse.ArgumentParser(description="Cost / CO2 Pareto frontier of the shipped model")
+    parser.add_argument('--points', type=int, default=100, help="largest number of frontier points")
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help="stop refining when no interval can deviate more than this share of the cost x "
+                             "emissions range")
+    parser.add_argument('--uniform', action='store_true', help="equal emission steps instead of adaptive ones")
+    parser.add_argument('--hours', type=int, default=1, help="time slots per planning year, 1 for the yearly model")
+    parser.add_argument('--emission-factor', action='append', dest='factors', default=[], metavar='FUEL=T_PER_MWH',
+                        help=f"emission factor of a fuel, defaults {EMISSION_FACTORS}")
+    parser.add_argument('--out', default=None, help="write the frontier to this .csv")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    params = default_params('q3_new')
+    params['E_f'] = {**EMISSION_FACTORS, **{fuel: float(value) for fuel, value in
+                                            (factor.split('=', 1) for factor in args.factors)}}
+    model = (build_time_resolved_matrix(params, 'year') if args.hours == 1
+             else build_time_resolved_matrix(params, 'hour', heat_profile(args.hours)))
+    result = pareto_frontier(model, args.points, args.tolerance, args.uniform,
+                             threads=options['threads'], time_limit=options['time_limit'])
+    if not result.points:
+        print("The model has no optimal solution")
+        return
+
+    print(f"{len(result.points)} frontier points from {result.solves} solves ({result.iterations} simplex "
+          f"iterations) in {result.solve_time:.3f} s")
+    table = []
+    for point in result.points:
+        row = {'emissions': point.emissions, 'cost': point.cost, 'slope': point.slope}
+        # Shares of the last planning year, where the demand share is largest
+        row.update({f"share.{fuel}": share for fuel, share in zip(params['fuels'], point.fuel_mix[-1])})
+        table.append(row)
+        mix = format_mix(params['fuels'], point.fuel_mix[-1])
+        slope = f"{-point.slope:10.2f}" if point.slope is not None else f"{'-':>10}"
+        print(f"CO2 {point.emissions:14.6g} t  cost {point.cost:14.6g}  abatement {slope} per t  {mix}")
+    if args.out:
+        write_table(table, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import time
+
+import numpy as np
+
+import telemetry
+from shipped_data import with_overrides
+from solver_backend import SolveResult
+
+# ============================= Persistent Model ===================================================
+# Keeps one HiGHS instance alive for a MatrixModel (matrix_builder, hourly). Parameter sweeps only
+# change costs, coefficients or bounds in place and re-solve, HiGHS then starts the simplex from the
+# previous basis instead of building and solving from scratch.
+#   set_fuel_price - C_f[f], the cost of every F[..., f] column
+#   set_cop        - COP[f], the -1 / COP[f] entries of the Fuel_Consumption rows of fuel f
+#   set_costs / set_col_bounds / set_row_bounds - any other column cost or bound, row bound
+# The MatrixModel arrays are kept in sync, so the model can still be exported or hashed afterwards.
+# model.params is replaced by a changed copy, never written into: the builders keep the caller's dict.
+# After an optimal LP solve the duals stay available: row_dual (shadow prices), col_dual (reduced
+# costs) and ranging() for the cost and bound ranges of the basis (see sensitivity.py). basis() and
+# set_basis() pass the basis on to another instance of the same model.
+
+# highspy is imported where it is used, so the modules building on this one still import without it
+# (solver_backend then solves through scipy).
+_STATUS = {'kOptimal': 'Optimal', 'kInfeasible': 'Infeasible', 'kUnbounded': 'Unbounded',
+           'kUnboundedOrInfeasible': 'Infeasible'}
+
+
+def highs_status(highs):
+    # Model status of a highspy.Highs instance as a PuLP status name
+    return _STATUS.get(highs.getModelStatus().name, 'Not Solved')
+
+
+class PersistentModel:
+
+    def __init__(self, model, threads=None, time_limit=None, mip_gap=None, presolve=True):
+        import highspy
+
+        self.model = model
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', False)
+        if threads is not None:
+            self.highs.setOptionValue('threads', threads)
+        if time_limit is not None:
+            self.highs.setOptionValue('time_limit', float(time_limit))
+        if mip_gap is not None:
+            self.highs.setOptionValue('mip_rel_gap', float(mip_gap))
+        if not presolve:
+            self.highs.setOptionValue('presolve', 'off')
+
+        self.highs.passModel(to_highs_lp(model))
+        self.solves = 0
+        self.iterations = 0
+        self._cop_entries = {}
+        self._stats = None
+        self._ranging = None
+        self.x = self.row_value = self.row_dual = self.col_dual = None
+
+    # ============================== Changes ======================================================
+    def set_costs(self, cols, costs):
+        cols = np.asarray(cols, dtype=np.int32).ravel()
+        costs = np.broadcast_to(np.asarray(costs, dtype=float), cols.shape)
+        self.model.c[cols] = costs
+        self.highs.changeColsCost(len(cols), cols, np.ascontiguousarray(costs))
+
+    def set_col_bounds(self, cols, lower, upper):
+        cols = np.asarray(cols, dtype=np.int32).ravel()
+        lower = np.broadcast_to(np.asarray(lower, dtype=float), cols.shape)
+        upper = np.broadcast_to(np.asarray(upper, dtype=float), cols.shape)
+        self.model.col_lower[cols], self.model.col_upper[cols] = lower, upper
+        self.highs.changeColsBounds(len(cols), cols, np.ascontiguousarray(lower), np.ascontiguousarray(upper))
+
+    def set_row_bounds(self, rows, lower, upper):
+        rows = np.asarray(rows, dtype=np.int32).ravel()
+        lower = np.broadcast_to(np.asarray(lower, dtype=float), rows.shape)
+        upper = np.broadcast_to(np.asarray(upper, dtype=float), rows.shape)
+        self.model.row_lower[rows], self.model.row_upper[rows] = lower, upper
+        for row, lo, up in zip(rows.tolist(), lower.tolist(), upper.tolist()):
+            self.highs.changeRowBounds(row, lo, up)
+
+    def fuel_columns(self, fuel):
+        return self.model.columns_of('Fuel_Consumption', 'fuels', fuel)
+
+    def set_fuel_price(self, fuel, price):
+        self.model.params = with_overrides(self.model.params, {'C_f': {fuel: price}})
+        self.set_costs(self.fuel_columns(fuel), price)
+
+    def set_cop(self, fuel, cop):
+        if fuel not in self._cop_entries:
+            self._cop_entries[fuel] = self.model.generation_entries(fuel)
+        positions, rows, cols = self._cop_entries[fuel]
+
+        self.model.params = with_overrides(self.model.params, {'COP': {fuel: cop}})
+        self.model.A.data[positions] = -1 / cop
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            self.highs.changeCoeff(row, col, -1 / cop)
+
+    # ============================== Solve ========================================================
+    def solve(self):
+        start, cpu_start = time.perf_counter(), telemetry.cpu_time()
+        self.highs.run()
+        solve_time = time.perf_counter() - start
+
+        info = self.highs.getInfo()
+        status = highs_status(self.highs)
+        self.solves += 1
+        self.iterations = info.simplex_iteration_count
+        solution = self.highs.getSolution()
+        self.x = np.array(solution.col_value) if status == 'Optimal' else None
+        self.model.x = self.x
+        # Duals of the LP (no duals for a MIP)
+        dual = status == 'Optimal' and solution.dual_valid
+        self.row_value = np.array(solution.row_value) if status == 'Optimal' else None
+        self.row_dual = np.array(solution.row_dual) if dual else None
+        self.col_dual = np.array(solution.col_dual) if dual else None
+        self._ranging = None
+
+        objective = info.objective_function_value if status == 'Optimal' else None
+        result = SolveResult('highs', status, objective, solve_time)
+        if telemetry.enabled():
+            # The structure does not change between solves, only costs, coefficients and bounds
+            if self._stats is None:
+                self._stats = telemetry.matrix_stats(self.model)
+            telemetry.record(self.model.name, self._stats, result, solve_time, telemetry.cpu_time() - cpu_start,
+                             self.highs)
+        return result
+
+    def ranging(self):
+        # {'col_cost_up': (value, objective), ...} of the last optimal LP solve: the cost or bound at which
+        # the basis changes and the objective there, per column or row
+        if self._ranging is None and self.row_dual is not None:
+            status, ranging = self.highs.getRanging()
+            if status.name == 'kOk':
+                self._ranging = {name: (np.array(getattr(ranging, name).value_),
+                                        np.array(getattr(ranging, name).objective_))
+                                 for name in ('col_cost_up', 'col_cost_dn', 'col_bound_up', 'col_bound_dn',
+                                              'row_bound_up', 'row_bound_dn')}
+        return self._ranging
+
+    def row_status(self):
+        # HighsBasisStatus of every row in the last basis
+        return self.highs.getBasis().row_status
+
+    def basis(self):
+        # (column status, row status) of the last basis as int arrays, to start another instance of the
+        # same model (e.g. in a worker process) from it
+        basis = self.highs.getBasis()
+        return (np.array([int(s) for s in basis.col_status], dtype=np.int8),
+                np.array([int(s) for s in basis.row_status], dtype=np.int8))
+
+    def set_basis(self, col_status, row_status):
+        import highspy
+
+        basis = highspy.HighsBasis()
+        basis.col_status = [highspy.HighsBasisStatus(int(s)) for s in col_status]
+        basis.row_status = [highspy.HighsBasisStatus(int(s)) for s in row_status]
+        basis.valid = True
+        self.highs.setBasis(basis)
+
+    def sweep_fuel_price(self, fuel, prices):
+        # Objective for every price, each step re-solved from the basis of the previous one
+        objectives = []
+        for price in prices:
+            self.set_fuel_price(fuel, price)
+            objectives.append(self.solve().objective)
+        return objectives
+
+
+def to_highs_lp(model):
+    import highspy
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = model.n_cols
+    lp.num_row_ = model.n_rows
+    lp.col_cost_ = model.c
+    lp.col_lower_ = model.col_lower
+    lp.col_upper_ = model.col_upper
+    lp.row_lower_ = model.row_lower
+    lp.row_upper_ = model.row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = model.n_cols
+    lp.a_matrix_.num_row_ = model.n_rows
+    lp.a_matrix_.start_ = model.A.indptr
+    lp.a_matrix_.index_ = model.A.indices
+    lp.a_matrix_.value_ = model.A.data
+    if model.integrality.any():
+        lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+                           for i in model.integrality]
+    return lp
+
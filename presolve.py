@@ -0,0 +1,135 @@
+import pulp
+
+from pulp_compat import constraint_map, problem_with
+
+# ============================= Model Lint / Presolve ==============================================
+# Removes rows that cannot change the solution from a built PuLP problem before it goes to the solver:
+#   trivial   - no variables left, e.g. CAP[t, u] <= CAP[t, u] + X[u] becomes 0 <= X[u]
+#   bound     - one variable and already implied by its bounds, e.g. G[t, u] >= 0 with lowBound=0
+#   duplicate - the same row again (up to scaling), e.g. the Fuel_Consumption rows added once per unit
+#               or the pairwise Balance rows of bhai_q3_new.py for (f1, f2) and (f2, f1)
+#   dominated - same left-hand side as a tighter row, e.g. x <= 5 next to x <= 3
+# Rows are only removed, never changed, and variable bounds are left alone because code_new_try.py
+# shares its variables between problems. PuLP has no supported way to delete a row, so the kept rows
+# are copied into a new problem with the same name, sense and objective. Trivial rows that are violated are kept so the solver still
+# reports the model as infeasible. Rows are counted per family, the name prefix of model_builder.
+REASONS = ['trivial', 'bound', 'duplicate', 'dominated']
+TOLERANCE = 1e-9
+
+
+def family(name):
+    prefix, _, number = name.rpartition('_')
+    return prefix if number.isdigit() and prefix else name
+
+
+def _implied_by_bounds(v, coef, sense, rhs):
+    # coef * v (sense) rhs with the bounds of v
+    if sense == pulp.LpConstraintEQ:
+        return v.lowBound is not None and v.lowBound == v.upBound and abs(coef * v.lowBound - rhs) <= TOLERANCE
+    if coef < 0:
+        coef, rhs, sense = -coef, -rhs, -sense
+    limit = rhs / coef
+    if sense == pulp.LpConstraintGE:
+        return v.lowBound is not None and v.lowBound >= limit - TOLERANCE
+    return v.upBound is not None and v.upBound <= limit + TOLERANCE
+
+
+def _normalized(constraint):
+    # Left-hand side scaled so the first coefficient is 1, with the sense flipped for a negative scale
+    terms = sorted((v.name, coef) for v, coef in constraint.items() if coef != 0)
+    scale = terms[0][1]
+    sense = constraint.sense if scale > 0 or constraint.sense == pulp.LpConstraintEQ else -constraint.sense
+    lhs = tuple((name, round(coef / scale, 12)) for name, coef in terms)
+    return lhs, sense, -constraint.constant / scale
+
+
+def find_redundant(prb):
+    # Returns {constraint name: reason} for every row that can be removed
+    redundant = {}
+    groups = {}
+
+    for name, constraint in constraint_map(prb).items():
+        terms = [(v, coef) for v, coef in constraint.items() if coef != 0]
+        rhs = -constraint.constant
+
+        if not terms:
+            satisfied = (constraint.sense == pulp.LpConstraintEQ and abs(rhs) <= TOLERANCE
+                         or constraint.sense == pulp.LpConstraintLE and 0 <= rhs + TOLERANCE
+                         or constraint.sense == pulp.LpConstraintGE and 0 >= rhs - TOLERANCE)
+            if satisfied:
+                redundant[name] = 'trivial'
+            continue
+
+        if len(terms) == 1 and _implied_by_bounds(terms[0][0], terms[0][1], constraint.sense, rhs):
+            redundant[name] = 'bound'
+            continue
+
+        lhs, sense, rhs = _normalized(constraint)
+        groups.setdefault(lhs, []).append((name, sense, rhs))
+
+    for rows in groups.values():
+        if len(rows) > 1:
+            redundant.update(_redundant_in_group(rows))
+    return redundant
+
+
+def _implies(row, other):
+    # Does row (name, sense, rhs) imply other for the same left-hand side
+    _, sense, rhs = row
+    _, other_sense, other_rhs = other
+    tolerance = TOLERANCE * max(1.0, abs(other_rhs))
+    if other_sense == pulp.LpConstraintEQ:
+        return sense == pulp.LpConstraintEQ and abs(rhs - other_rhs) <= tolerance
+    if other_sense == pulp.LpConstraintLE:
+        return sense != pulp.LpConstraintGE and rhs <= other_rhs + tolerance
+    return sense != pulp.LpConstraintLE and rhs >= other_rhs - tolerance
+
+
+def _redundant_in_group(rows):
+    # Rows with the same left-hand side: keep an equality and the tightest <= and >= rows not implied by it
+    kept = [row for row in rows if row[1] == pulp.LpConstraintEQ][:1]
+    for sense, pick in ((pulp.LpConstraintLE, min), (pulp.LpConstraintGE, max)):
+        candidates = [row for row in rows if row[1] == sense]
+        if candidates:
+            tightest = pick(candidates, key=lambda row: row[2])
+            if not any(_implies(row, tightest) for row in kept):
+                kept.append(tightest)
+
+    redundant = {}
+    for row in rows:
+        if row in kept:
+            continue
+        reference = next((k for k in kept if _implies(k, row)), None)
+        if reference is not None:
+            same = reference[1] == row[1] and abs(reference[2] - row[2]) <= TOLERANCE * max(1.0, abs(row[2]))
+            redundant[row[0]] = 'duplicate' if same else 'dominated'
+    return redundant
+
+
+def lint(prb, redundant=None):
+    # Per family: number of rows and how many of them each reason would remove
+    redundant = find_redundant(prb) if redundant is None else redundant
+    report = {}
+    for name in constraint_map(prb):
+        counts = report.setdefault(family(name), dict.fromkeys(['rows'] + REASONS, 0))
+        counts['rows'] += 1
+        if name in redundant:
+            counts[redundant[name]] += 1
+    return report
+
+
+def remove_redundant(prb):
+    # Returns (problem without the redundant rows, lint report); prb itself is left unchanged
+    redundant = find_redundant(prb)
+    report = lint(prb, redundant)
+    kept = {name: c for name, c in constraint_map(prb).items() if name not in redundant}
+    return problem_with(prb, kept), report
+
+
+def format_report(report):
+    lines = [f"{'Family':<20}{'Rows':>8}" + ''.join(f"{reason:>11}" for reason in REASONS) + f"{'Kept':>8}"]
+    for name, counts in report.items():
+        removed = sum(counts[reason] for reason in REASONS)
+        lines.append(f"{name:<20}{counts['rows']:>8}" + ''.join(f"{counts[reason]:>11}" for reason in REASONS)
+                     + f"{counts['rows'] - removed:>8}")
+    return '\n'.join(lines)
@@ -0,0 +1,93 @@
+import argparse
+import math
+from itertools import combinations
+
+import pulp
+
+import solver_backend
+from merit_order import merit_order
+from model_builder import build_combination_model
+from shipped_data import default_params
+
+# ============================= Bound-based Pruning ================================================
+# Candidate fuel combinations are ranked by a cheap lower bound on their total cost and solved best
+# bound first. A combination whose bound is not below the incumbent best_objective is skipped, the
+# surviving solves get the incumbent as cutoff, so the solver gives up as soon as they cannot win.
+#   merit - every year the demand share is filled by the cheapest units of the combination first,
+#           at C_op + C_inv + C_f / COP per MWh up to X_max - X (no solver call)
+#   lp    - LP relaxation of the combination model (integer variables relaxed). A model without
+#           integer variables is its own relaxation, its bound solve is the answer and not repeated
+#   none  - no pruning, every combination is solved
+
+
+def merit_order_bound(params, fuel_combination):
+    # The combination model is a pure LP, so this bound is its exact optimum
+    return float(merit_order(params, fuel_combination=fuel_combination).cost[0])
+
+
+def lp_relaxation_bound(model, **solver_options):
+    # (bound, result) - result is the relaxation's SolveResult if that is already the exact solve, else None
+    integers = [v for v in model.prb.variables() if v.cat != pulp.LpContinuous]
+    for v in integers:
+        v.cat = pulp.LpContinuous
+    result = solver_backend.solve(model.prb, **solver_options)
+    for v in integers:
+        v.cat = pulp.LpInteger
+    bound = result.objective if result.objective is not None else math.inf
+    return bound, None if integers else result
+
+
+def prune_combinations(params, k=2, bound='merit', **solver_options):
+    candidates = list(combinations(params['fuels'], k))
+    exact = {}
+    if bound == 'merit':
+        bounds = {c: merit_order_bound(params, c) for c in candidates}
+    elif bound == 'lp':
+        bounds = {}
+        for c in candidates:
+            bounds[c], exact[c] = lp_relaxation_bound(build_combination_model(params, c), **solver_options)
+    elif bound == 'none':
+        bounds = {c: -math.inf for c in candidates}
+    else:
+        raise ValueError(f"Unknown bound: {bound}")
+
+    best_objective = math.inf
+    best_fuels = None
+    table = []
+
+    for combination in sorted(candidates, key=bounds.get):
+        row = {'combination': combination, 'bound': bounds[combination], 'status': 'Pruned', 'objective': None}
+        table.append(row)
+        if bounds[combination] >= best_objective:
+            continue
+
+        result = exact.get(combination)
+        if result is None:
+            cutoff = best_objective if best_objective < math.inf else None
+            result = build_combination_model(params, combination).solve(cutoff=cutoff, **solver_options)
+        row['status'], row['objective'] = result.status, result.objective
+
+        if result.objective is not None and result.objective < best_objective:
+            best_objective = result.objective
+            best_fuels = combination
+
+    return best_fuels, best_objective, table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search fuel combinations, skipping those bounded above the incumbent")
+    parser.add_argument('--k', type=int, default=2, help="fuels per combination")
+    parser.add_argument('--bound', default='merit', choices=['merit', 'lp', 'none'])
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    best_fuels, best_objective, table = prune_combinations(default_params('q3_new'), args.k, args.bound,
+                                                           **solver_backend.options_from_args(args))
+    solved = sum(1 for row in table if row['status'] != 'Pruned')
+    print(f"Solved {solved} of {len(table)} combinations, {len(table) - solved} pruned")
+    print(f"The optimal fuel combination for minimizing cost is: {best_fuels}")
+    print(f"Optimal Value of Z when using {best_fuels}:", best_objective)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import warnings
+
+import pulp
+
+# ============================= PuLP Compatibility =================================================
+# PuLP 3.3 deprecates the dict view of prb.constraints, LpVariable.dicts and the bundled CBC
+# (PULP_CBC_CMD) in favour of the PuLP 4.0 API. These helpers use the new API where it exists and the
+# old one on earlier PuLP versions, so the modules run without deprecation warnings on both.
+
+
+def constraint_map(prb):
+    # {name: constraint} of a problem, in the order the constraints were added
+    constraints = prb.constraints
+    return {c.name: c for c in constraints()} if callable(constraints) else constraints
+
+
+def variable_dicts(prb, name, indices, lowBound=None, upBound=None, cat=pulp.LpContinuous):
+    if hasattr(prb, 'add_variable_dicts'):
+        return prb.add_variable_dicts(name, indices, lowBound, upBound, cat)
+    return pulp.LpVariable.dicts(name, indices, lowBound, upBound, cat)
+
+
+def problem_with(prb, constraints):
+    # A new problem with the objective of prb and only the given {name: constraint}
+    problem = pulp.LpProblem(prb.name, prb.sense)
+    problem += prb.objective, prb.objective.name
+    for name, constraint in constraints.items():
+        problem.addConstraint(constraint, name)
+    return problem
+
+
+def cbc_solver(**options):
+    # CBC from the PATH (COIN_CMD), else the copy bundled with PuLP, deprecated but still the only one
+    # on most installations
+    solver = pulp.COIN_CMD(**options)
+    if solver.available():
+        return solver
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return pulp.PULP_CBC_CMD(**options)
@@ -0,0 +1,186 @@
+import importlib.util
+import os
+from itertools import product
+
+import numpy as np
+import pulp
+
+# ============================= Columnar Results ===================================================
+# Solutions as NumPy arrays instead of v.varValue loops: the solution vector is read in one call
+# (from HiGHS when the problem was solved through highspy) and every variable dict of a ModelBuilder
+# (G, CAP, F) becomes one array indexed like its keys, e.g. G[year, unit] or G[year, unit, fuel].
+# Sweep tables are written in bulk, one column per value, with the format taken from the extension:
+#   .npz              - NumPy, the variables stacked to (scenario, year, unit[, fuel]) arrays
+#   .arrow / .feather - Arrow IPC, can be memory-mapped with pyarrow.memory_map (needs pyarrow)
+#   .parquet          - Parquet (needs pyarrow)
+#   .csv              - sweep.write_table
+VARIABLES = ['G', 'CAP', 'F']
+
+
+def solution_vector(prb, variables=None):
+    # Values of prb.variables() in order, NaN where there is no value
+    variables = prb.variables() if variables is None else variables
+    # solverModel may be left over from an earlier solve, so only when the last solver was HiGHS
+    if isinstance(getattr(prb, 'solver', None), pulp.HiGHS) and all(getattr(v, 'index', None) is not None
+                                                                   for v in variables):
+        col_value = np.asarray(prb.solverModel.getSolution().col_value)
+        if len(col_value) == len(variables):
+            return col_value[[v.index for v in variables]]
+    return np.array([np.nan if v.varValue is None else v.varValue for v in variables], dtype=float)
+
+
+def _axes(keys):
+    # Labels of every index position in order of first appearance, e.g. (years, units)
+    keys = [k if isinstance(k, tuple) else (k,) for k in keys]
+    return [list(dict.fromkeys(k[i] for k in keys)) for i in range(len(keys[0]))]
+
+
+def solution_axes(model, names=VARIABLES):
+    return variable_axes({name: getattr(model, name) for name in names if hasattr(model, name)})
+
+
+def variable_axes(variables):
+    return {name: _axes(variable_dict) for name, variable_dict in variables.items()}
+
+
+def solution_arrays(model, names=VARIABLES):
+    # {name: array} for the variable dicts of a solved ModelBuilder, missing keys stay NaN. The columns
+    # and the index are built once per problem and kept on the model, presolve replaces the problem
+    variables = {name: getattr(model, name) for name in names if hasattr(model, name)}
+    prb, columns, index = getattr(model, 'variable_index', (None, None, {}))
+    if prb is not model.prb or set(index) != set(variables):
+        columns = model.prb.variables()
+        index = variable_index(columns, variables)
+        model.variable_index = model.prb, columns, index
+    return variable_arrays(model.prb, variables, index, columns)
+
+
+def variable_index(columns, variables):
+    # {name: (shape, flat positions, columns)} - where each variable of the dicts sits in its array and
+    # in columns (prb.variables()), variables the problem does not use are left out
+    column = {v.name: j for j, v in enumerate(columns)}
+    index = {}
+    for name, axes in variable_axes(variables).items():
+        positions = [{label: i for i, label in enumerate(axis)} for axis in axes]
+        used = [(key if isinstance(key, tuple) else (key,), column[v.name])
+                for key, v in variables[name].items() if v.name in column]
+        shape = tuple(len(axis) for axis in axes)
+        coords = np.array([[p[k] for p, k in zip(positions, key)] for key, _ in used], dtype=np.intp)
+        flat = np.ravel_multi_index(coords.reshape(-1, len(shape)).T, shape)
+        index[name] = shape, flat, np.array([j for _, j in used], dtype=np.intp)
+    return index
+
+
+def variable_arrays(prb, variables, index=None, columns=None):
+    # {name: array} for variable dicts {name: {key: LpVariable}} of a solved problem, as the scripts
+    # without a ModelBuilder keep them; one scatter per variable dict from the solution vector
+    columns = prb.variables() if columns is None else columns
+    vector = solution_vector(prb, columns)
+    index = variable_index(columns, variables) if index is None else index
+
+    arrays = {}
+    for name, (shape, flat, used) in index.items():
+        array = np.full(shape, np.nan)
+        array.reshape(-1)[flat] = vector[used]
+        arrays[name] = array
+    return arrays
+
+
+def flat_columns(arrays, axes):
+    # Sweep table columns like "G[2025,power_plant]" from solution_arrays and solution_axes
+    columns = {}
+    for name, array in arrays.items():
+        for index in np.ndindex(array.shape):
+            labels = ','.join(str(axis[i]) for axis, i in zip(axes[name], index))
+            value = array[index]
+            columns[f"{name}[{labels}]"] = None if np.isnan(value) else float(value)
+    return columns
+
+
+def format_arrays(arrays, axes):
+    # Solution arrays as text tables, one per variable: a row per label of the first axis (the years),
+    # a column per label combination of the others
+    blocks = []
+    for name, array in arrays.items():
+        rows, columns = axes[name][0], ['/'.join(map(str, labels)) for labels in product(*axes[name][1:])] or [name]
+        cells = np.char.mod('%.10g', array.reshape(len(rows), -1) + 0.0)
+        width = max([len(c) for c in columns] + [len(c) for c in cells.ravel()])
+        lines = [f"{name}:", ' ' * 8 + ''.join(f"{c:>{width + 2}}" for c in columns)]
+        lines += [f"{str(row):<8}" + ''.join(f"{c:>{width + 2}}" for c in line) for row, line in zip(rows, cells)]
+        blocks.append('\n'.join(lines))
+    return '\n'.join(blocks)
+
+
+def format_solution(model, names=VARIABLES):
+    return format_arrays(solution_arrays(model, names), solution_axes(model, names))
+
+
+# ============================== Sweep tables ======================================================
+def table_columns(table):
+    # Sweep rows as one NumPy array per column, None becomes NaN
+    names = list(dict.fromkeys(name for row in table for name in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in table]
+        if all(v is None or isinstance(v, (int, float)) for v in values):
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            columns[name] = np.array([str(v) for v in values])
+    return columns
+
+
+def stacked_arrays(columns):
+    # "G[2025,power_plant]" columns as one (scenario, year, unit) array G with its labels per axis
+    groups = {}
+    for name in columns:
+        variable, bracket, index = name.partition('[')
+        if bracket and variable in VARIABLES:
+            groups.setdefault(variable, []).append((tuple(index.rstrip(']').split(',')), name))
+
+    stacked = {}
+    for variable, entries in groups.items():
+        axes = _axes([key for key, _ in entries])
+        positions = [{label: i for i, label in enumerate(axis)} for axis in axes]
+        array = np.full([len(next(iter(columns.values())))] + [len(axis) for axis in axes], np.nan)
+        for key, name in entries:
+            array[(slice(None),) + tuple(p[k] for p, k in zip(positions, key))] = columns[name]
+        stacked[variable] = array
+        for i, axis in enumerate(axes):
+            stacked[f"{variable}_axis{i}"] = np.array(axis)
+    return stacked
+
+
+def write_npz(table, path):
+    columns = table_columns(table)
+    scalars = {name: values for name, values in columns.items() if name.partition('[')[0] not in VARIABLES}
+    np.savez(path, **scalars, **stacked_arrays(columns))
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec('pyarrow') is None:
+        raise RuntimeError("Arrow and Parquet output needs pyarrow, write .npz or .csv instead")
+
+
+def write_arrow(table, path):
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    feather.write_feather(pa.table(table_columns(table)), path, compression='uncompressed')
+
+
+def write_parquet(table, path):
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as parquet
+    parquet.write_table(pa.table(table_columns(table)), path)
+
+
+def write_results(table, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npz':
+        return write_npz(table, path)
+    if extension in ('.arrow', '.feather', '.ipc'):
+        return write_arrow(table, path)
+    if extension == '.parquet':
+        return write_parquet(table, path)
+    raise ValueError(f"Unknown result format: {extension}")
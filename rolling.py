@@ -0,0 +1,145 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import solver_backend
+from hourly import build_time_resolved_matrix, demand_share, heat_profile, time_profile, year_profile
+from matrix_builder import solve_matrix
+from persistent_model import PersistentModel
+from shipped_data import default_params
+
+# ============================= Rolling Horizon ====================================================
+# Long horizons (annual steps up to 2060, hourly dispatch) are solved as a sequence of overlapping
+# windows of `window` planning years instead of one LP. Only the first `commit` years of a window are
+# kept, the next window starts there, with the capacity of the last kept year as its initial capacity
+# (the planning years are coupled by the Capacity_Carry rows of hourly.py). Windows of the same length
+# have the same structure, so one PersistentModel is re-used: only the Balance bounds and the initial
+# capacity change and HiGHS starts from the basis of the previous window. Memory and time per window
+# depend on the window length, not on the horizon.
+
+RollingResult = namedtuple('RollingResult', ['status', 'objective', 'CAP', 'windows', 'solve_time'])
+
+
+def long_horizon_params(params, last_year=2060, step=1):
+    # Annual (or step-year) planning years up to last_year. D is interpolated between the given planning
+    # years and extended with the trend of the last two, the share grows by 20% every 5 years up to 100%.
+    years = list(range(params['years'][0], last_year + 1, step))
+    given, D = np.asarray(params['years'], dtype=float), np.asarray(params['D'][:len(params['years'])], dtype=float)
+    trend = (D[-1] - D[-2]) / (given[-1] - given[-2])
+    demand = np.where(np.asarray(years) <= given[-1], np.interp(years, given, D), D[-1] + trend * (np.asarray(years) - given[-1]))
+    share = [min(1.0, 0.2 * ((year - years[0]) / 5 + 1)) for year in years]
+    return {**params, 'years': years, 'D': [max(float(d), 0.0) for d in demand], 'share': share}
+
+
+def window_params(params, start, stop):
+    share = demand_share(params)
+    return {**params, 'years': params['years'][start:stop], 'D': params['D'][start:stop], 'share': share[start:stop]}
+
+
+def _year_costs(model, x):
+    # Cost of every planning year of a solved window
+    costs = 0.0
+    for family in ('Generation', 'Installed_Capacity', 'Fuel_Consumption'):
+        offset, shape = model.columns[family]
+        values = x[offset:offset + int(np.prod(shape))] * model.c[offset:offset + int(np.prod(shape))]
+        costs = costs + values.reshape(shape[0], -1).sum(axis=1)
+    return costs
+
+
+def solve_rolling(params, window=5, commit=None, time_resolution='year', profile=None, threads=None,
+                  time_limit=None, presolve=True):
+    # commit years of every window are kept, by default half of the window
+    if window < 1:
+        raise ValueError(f"A window needs at least one planning year, got {window}")
+    if commit is None:
+        commit = max(1, window // 2)
+    elif not 1 <= commit <= window:
+        raise ValueError(f"commit must be between 1 and the window of {window} planning years, got {commit}")
+    start_time = time.perf_counter()
+    profile = time_profile(time_resolution, profile)
+    T, U = len(params['years']), len(params['units'])
+
+    CAP = np.zeros((T, U))
+    objective = 0.0
+    status = 'Optimal'
+    persistent, windows, start = None, 0, 0
+    initial = np.zeros(U)
+
+    while start < T:
+        stop = min(start + window, T)
+        keep = T - start if stop == T else commit
+        sub_params = window_params(params, start, stop)
+        window_profile = profile[start:stop] if profile.ndim == 2 else profile
+
+        if persistent is None or len(persistent.model.params['years']) != stop - start:
+            model = build_time_resolved_matrix(sub_params, 'hour', window_profile, name=f"Rolling_{start}",
+                                               carry_capacity=True, initial_capacity=initial)
+            persistent = PersistentModel(model, threads=threads, time_limit=time_limit, presolve=presolve)
+        else:
+            # Same structure as the previous window: new demand and initial capacity, warm start from its basis
+            model = persistent.model
+            for i, (start_row, stop_row) in enumerate(model.rows['Balance']):
+                demand = sub_params['share'][i] * sub_params['D'][i] * year_profile(window_profile, i)
+                persistent.set_row_bounds(np.arange(start_row, stop_row), demand, demand)
+            first_year = model.column_index('Installed_Capacity')[0]
+            persistent.set_col_bounds(first_year, initial, model.col_upper[first_year])
+            model.params = sub_params
+
+        result = persistent.solve()
+        windows += 1
+        if result.status != 'Optimal':
+            status = result.status
+            break
+
+        CAP[start:start + keep] = model.values(persistent.x, 'Installed_Capacity')[:keep]
+        objective += _year_costs(model, persistent.x)[:keep].sum()
+        initial = CAP[start + keep - 1]
+        start += keep
+
+    return RollingResult(status, objective if status == 'Optimal' else None, CAP, windows,
+                         time.perf_counter() - start_time)
+
+
+def solve_full(params, time_resolution='year', profile=None, **solver_options):
+    # The monolithic model of the whole horizon, for the optimality gap of the rolling horizon on small instances
+    model = build_time_resolved_matrix(params, 'hour', time_profile(time_resolution, profile), name="Rolling_full",
+                                       carry_capacity=True)
+    return solve_matrix(model, **solver_options)
+
+
+# ============================== Command line ======================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a long planning horizon in overlapping windows")
+    parser.add_argument('--last-year', type=int, default=2060)
+    parser.add_argument('--step', type=int, default=1, help="years between planning years")
+    parser.add_argument('--window', type=int, default=5, help="planning years per window")
+    parser.add_argument('--commit', type=int, default=None, help="planning years kept per window")
+    parser.add_argument('--hours', type=int, default=1, help="time slots per planning year, 1 for the yearly model")
+    parser.add_argument('--compare', action='store_true', help="also solve the full model and report the gap")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.window < 1:
+        parser.error("--window must be at least 1")
+    if args.commit is not None and not 1 <= args.commit <= args.window:
+        parser.error(f"--commit must be between 1 and --window ({args.window})")
+
+    options = solver_backend.options_from_args(args)
+    params = long_horizon_params(default_params('q3_new'), args.last_year, args.step)
+    resolution, profile = ('year', None) if args.hours == 1 else ('hour', heat_profile(args.hours))
+
+    result = solve_rolling(params, args.window, args.commit, resolution, profile, options['threads'],
+                           options['time_limit'], options['presolve'])
+    print(f"{len(params['years'])} planning years in {result.windows} windows: {result.status}, "
+          f"cost {result.objective} in {result.solve_time:.2f} s")
+
+    if args.compare:
+        full = solve_full(params, resolution, profile, time_limit=options['time_limit'], presolve=options['presolve'])
+        print(f"Full model: {full.status}, cost {full.objective} in {full.solve_time:.2f} s")
+        if result.objective is not None and full.objective:
+            print(f"Optimality gap of the rolling horizon: {(result.objective - full.objective) / full.objective:.4%}")
+
+
+if __name__ == '__main__':
+    main()
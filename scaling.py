@@ -0,0 +1,256 @@
+import argparse
+import copy
+import os
+import tempfile
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+from matrix_builder import MatrixModel, SolveResult, solve_matrix
+
+# ============================= Coefficient Scaling ================================================
+# Demands and capacities are 1e4-1e7 MWh, costs 1e0-1e2 EUR, the Fuel_Consumption rows hold 1/COP and
+# the Technology_Limit rows of the technology model put (X_max - X) ~ 1e6 next to binaries. Two layers,
+# both unscaled transparently after the solve:
+#   in_units(params)  - MWh -> GWh and EUR -> kEUR before any builder (PuLP or matrix) runs; costs per
+#                       energy keep their values, ENERGY_PARAMS shrink by `energy`, so do big-M entries
+#   scale(model)      - a scaled copy of a MatrixModel, x = s * x_scaled, rows multiplied by r and the
+#                       objective by objective_scale. All scales are powers of two, so the scaling adds
+#                       no rounding error, and integer columns keep scale 1:
+#       units     - the unit conversion of in_units on a built model (energy and money rounded to powers
+#                   of two), A stays as it is; the default
+#       geometric - a few passes of geometric-mean row and column scaling of A, then one factor on bounds
+#                   and costs. It narrows the range of A, but HiGHS can need more simplex iterations on
+#                   the balanced matrix (the 24-hour model: 706 -> 1286 with its own scaling off), so it
+#                   is only used when asked for
+# conditioning() reports the coefficient ranges (max / min of the absolute non-zeros, as solvers log
+# them), before and after scaling.
+METHODS = ['units', 'geometric']
+ENERGY = 1e3   # MWh -> GWh
+MONEY = 1e3    # EUR -> kEUR
+# Every parameter in MWh or MWh per year: demands, capacities, capacity growth (x) and the demand of
+# the 5years model
+ENERGY_PARAMS = ('D', 'X', 'X_max', 'x', 'demand')
+
+
+# ============================== Unit conversion ===================================================
+def in_units(params, energy=ENERGY, money=MONEY):
+    scale_energy = lambda values: ({k: v / energy for k, v in values.items()} if isinstance(values, dict)
+                                   else [v / energy for v in values] if isinstance(values, list) else values / energy)
+    scale_cost = lambda values: {k: v * energy / money for k, v in values.items()}
+    return {**params, **{name: scale_energy(params[name]) for name in ENERGY_PARAMS if name in params},
+            **{name: scale_cost(params[name]) for name in ('C_op', 'C_inv', 'C_f')}}
+
+
+def objective_from_units(objective, money=MONEY):
+    return objective * money if objective is not None else None
+
+
+def solve_in_units(build, params, energy=ENERGY, money=MONEY, **solver_options):
+    # build(params) -> ModelBuilder or MatrixModel. Returns the model built in GWh / kEUR and its result
+    # with the objective in EUR; variable values of the model are in GWh, multiply by energy for MWh.
+    model = build(in_units(params, energy, money))
+    if isinstance(model, MatrixModel):
+        result = solve_matrix(model, **solver_options)
+    else:
+        result = model.solve(**solver_options)
+    return model, result._replace(objective=objective_from_units(result.objective, money))
+
+
+# ============================== Matrix scaling ====================================================
+def _extremes(indptr, data, n):
+    # max and min of every row of a CSR (or column of a CSC) matrix of absolute values, 1 for empty ones
+    nonempty = np.diff(indptr) > 0
+    high, low = np.ones(n), np.ones(n)
+    if data.size:
+        starts = indptr[:-1][nonempty]
+        high[nonempty] = np.maximum.reduceat(data, starts)
+        low[nonempty] = np.minimum.reduceat(data, starts)
+    return high, low
+
+
+def _power_of_two(scale):
+    return np.exp2(np.round(np.log2(scale)))
+
+
+def _geometric_mean(values):
+    values = np.abs(values)
+    values = values[np.isfinite(values) & (values > 0)]
+    return float(np.exp(np.log(values).mean())) if values.size else 1.0
+
+
+def geometric_scales(model, passes=4):
+    A = abs(model.A).tocsr()
+    A.eliminate_zeros()
+    r, s = np.ones(model.n_rows), np.ones(model.n_cols)
+    integer = model.integrality.astype(bool)
+    for _ in range(passes):
+        B = (diags(r) @ A @ diags(s)).tocsr()
+        high, low = _extremes(B.indptr, B.data, model.n_rows)
+        r /= np.sqrt(high * low)
+        B = (diags(r) @ A @ diags(s)).tocsc()
+        high, low = _extremes(B.indptr, B.data, model.n_cols)
+        s /= np.sqrt(high * low)
+        s[integer] = 1.0
+
+    # The same factor on all rows and continuous columns leaves their entries of A alone and brings the
+    # bounds to around 1, the objective scale does the same for the costs
+    factor = _geometric_mean(np.concatenate([model.row_lower * r, model.row_upper * r,
+                                             model.col_lower / s, model.col_upper / s]))
+    r /= factor
+    s[~integer] *= factor
+    objective_scale = 1 / _geometric_mean(model.c * s)
+    return _power_of_two(r), _power_of_two(s), float(_power_of_two(objective_scale))
+
+
+def unit_scales(model, energy=ENERGY, money=MONEY):
+    energy, money = _power_of_two(energy), _power_of_two(money)
+    s = np.where(model.integrality.astype(bool), 1.0, energy)
+    return np.full(model.n_rows, 1 / energy), s, 1 / money
+
+
+def scale(model, method='units', **options):
+    # A scaled copy of the model, scaled.scaling holds (r, s, objective_scale) to unscale its solution
+    if method == 'geometric':
+        r, s, objective_scale = geometric_scales(model, **options)
+    elif method == 'units':
+        r, s, objective_scale = unit_scales(model, **options)
+    else:
+        raise ValueError(f"Unknown scaling method: {method}")
+
+    scaled = copy.copy(model)
+    scaled.A = csr_matrix(diags(r) @ model.A @ diags(s))
+    scaled.c = objective_scale * s * model.c
+    scaled.col_lower, scaled.col_upper = model.col_lower / s, model.col_upper / s
+    scaled.row_lower, scaled.row_upper = model.row_lower * r, model.row_upper * r
+    scaled.scaling = (r, s, objective_scale)
+    return scaled
+
+
+def unscale(scaled, x, objective=None):
+    _, s, objective_scale = scaled.scaling
+    return (s * x if x is not None else None), (objective / objective_scale if objective is not None else None)
+
+
+def solve_scaled(model, method='units', time_limit=None, mip_gap=None, presolve=True):
+    # Solves a scaled copy, model.x and the objective are in the original units
+    scaled = scale(model, method)
+    result = solve_matrix(scaled, time_limit, mip_gap, presolve)
+    model.x, objective = unscale(scaled, scaled.x, result.objective)
+    return SolveResult(result.backend, result.status, objective, result.solve_time)
+
+
+# ============================== Conditioning ======================================================
+def _range(values):
+    values = np.abs(values[np.isfinite(values)])
+    values = values[values > 0]
+    return (float(values.min()), float(values.max())) if values.size else (None, None)
+
+
+def _highs(model):
+    import highspy
+    from persistent_model import to_highs_lp
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    if isinstance(model, MatrixModel):
+        highs.passModel(to_highs_lp(model))
+    else:
+        # PuLP models go through an MPS file, as in the benchmark
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.mps')
+            model.prb.writeMPS(path)
+            highs.readModel(path)
+    return highs
+
+
+def conditioning(model):
+    # Coefficient ranges of a MatrixModel or a ModelBuilder
+    if isinstance(model, MatrixModel):
+        A, c = model.A, model.c
+        bounds = np.concatenate([model.row_lower, model.row_upper, model.col_lower, model.col_upper])
+    else:
+        lp = _highs(model).getLp()
+        A = csr_matrix((lp.a_matrix_.value_, lp.a_matrix_.index_, lp.a_matrix_.start_),
+                       shape=(lp.num_col_, lp.num_row_)).T
+        c = np.asarray(lp.col_cost_)
+        bounds = np.concatenate([lp.row_lower_, lp.row_upper_, lp.col_lower_, lp.col_upper_])
+    report = {'matrix': _range(A.data), 'cost': _range(c), 'bounds': _range(bounds)}
+    for name in list(report):
+        low, high = report[name]
+        report[f"{name}_ratio"] = high / low if low else None
+    return report
+
+
+def format_conditioning(report):
+    lines = []
+    for name in ('matrix', 'cost', 'bounds'):
+        low, high = report[name]
+        ratio = report[f"{name}_ratio"]
+        lines.append(f"{name:<8} [{low:.1e}, {high:.1e}]  ratio {ratio:.1e}" if low else f"{name:<8} -")
+    return '\n'.join(lines)
+
+
+def simplex_iterations(model, solver_scaling=True):
+    # (status, objective, simplex iterations, run time) of HiGHS on the model, solver_scaling=False
+    # switches off the scaling of HiGHS itself to see the effect of this layer alone
+    highs = _highs(model)
+    if not solver_scaling:
+        highs.setOptionValue('simplex_scale_strategy', 0)
+    highs.run()
+    info = highs.getInfo()
+    status = highs.modelStatusToString(highs.getModelStatus())
+    return status, info.objective_function_value, info.simplex_iteration_count, highs.getRunTime()
+
+
+# ============================== Command line ======================================================
+def build(family, params, hours):
+    # The benchmark instances, the technology model on a synthetic catalogue
+    from benchmark import build as build_benchmark
+    from matrix_builder import build_q3_new_matrix
+    from model_builder import build_technology_model
+
+    if family == 'q3_new':
+        return build_q3_new_matrix(params, tuple(params['fuels'][:2]))
+    if family == 'technology':
+        return build_technology_model(params, k=max(1, len(params['units']) // 4))
+    return build_benchmark(family, params, hours)
+
+
+def main(argv=None):
+    from benchmark import synthetic_params
+    from shipped_data import default_params
+    from technologies import synthetic_catalogue
+
+    parser = argparse.ArgumentParser(description="Conditioning and simplex iterations of the benchmark instances, "
+                                                 "as built and scaled")
+    parser.add_argument('--family', default='technology', choices=['q1', 'combination', 'hourly', 'q3_new', 'technology'])
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--units', type=int, default=20)
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--method', default='units', choices=METHODS,
+                        help="scaling of the matrix families, PuLP families are always converted to GWh / kEUR")
+    parser.add_argument('--no-solver-scaling', action='store_true', help="switch off the scaling of HiGHS")
+    args = parser.parse_args(argv)
+
+    if args.family == 'technology':
+        params = synthetic_catalogue(default_params('combination'), args.units, max(2, args.units // 4), seed=1)
+    else:
+        params = synthetic_params(args.years, args.units)
+    model = build(args.family, params, args.hours)
+    if isinstance(model, MatrixModel):
+        scaled, label = scale(model, args.method), args.method
+    else:
+        scaled, label = build(args.family, in_units(params), args.hours), 'GWh / kEUR'
+
+    for name, m in (('as built', model), (f"scaled ({label})", scaled)):
+        status, objective, iterations, run_time = simplex_iterations(m, not args.no_solver_scaling)
+        if m is scaled:
+            objective = (unscale(scaled, None, objective)[1] if isinstance(scaled, MatrixModel)
+                         else objective_from_units(objective))
+        print(f"== {name}: {status}, objective {objective:.6e}, {iterations} simplex iterations in {run_time:.3f} s")
+        print(format_conditioning(conditioning(m)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+import solver_backend
+from hourly import build_time_resolved_matrix, heat_profile
+from model_io import COST_COLUMNS, PATCHABLE, demand_ratio, demand_vector, x_max_rows
+from persistent_model import PersistentModel
+from shipped_data import default_params
+
+# ============================= Sensitivity ========================================================
+# What-if queries on a solved LP without re-solving it. The optimal basis of the PersistentModel gives
+#   shadow prices  - row_dual, d cost / d bound of the Balance, Capacity, ... rows
+#   reduced costs  - col_dual of the G / CAP / F columns
+#   ranging        - per column cost and per row bound, the value at which the basis changes
+# A change of costs (C_op, C_inv, C_f) changes the objective by x . dc, a change of bounds (D, X_max)
+# by row_dual . db, as long as the basis stays optimal. For several costs or bounds at once that is
+# checked with the 100% rule (the changes as fractions of their allowed ranges add up to at most 1).
+# Everything else (COP is a matrix coefficient, changes outside the ranges, costs and bounds together,
+# MIP models) falls back to a warm re-solve of the changed model, which is then reverted.
+
+WhatIfResult = namedtuple('WhatIfResult', ['objective', 'change', 'method'])   # method 'dual' or 'resolve'
+Marginal = namedtuple('Marginal', ['value', 'low', 'high'])   # d cost / d parameter, valid in [low, high]
+
+TOLERANCE = 1e-7
+
+
+class Sensitivity:
+
+    def __init__(self, persistent):
+        self.persistent = persistent
+        self.model = persistent.model
+        self.stale = persistent.x is None
+        self._refresh()
+
+    def _refresh(self):
+        # Solution and duals of the unchanged model, re-solved (from the last basis) after a fallback
+        if self.stale:
+            self.persistent.solve()
+            self.stale = False
+        p = self.persistent
+        if p.x is None:
+            raise ValueError(f"Model {self.model.name} has no optimal solution")
+        self.objective = float(self.model.c @ p.x)
+        self.x, self.row_value = p.x, p.row_value
+        self.row_dual, self.col_dual = p.row_dual, p.col_dual
+        self.ranges = p.ranging()
+        self.row_status = p.row_status() if self.row_dual is not None else None
+
+    # ============================== Duals ========================================================
+    def shadow_prices(self, family):
+        self._check_duals()
+        return self.row_dual[self.model.row_index(family)]
+
+    def reduced_costs(self, family):
+        self._check_duals()
+        return self.model.values(self.col_dual, family)
+
+    def cost_ranges(self, family):
+        # (lowest, highest) cost of every column of the family that keeps the basis optimal
+        self._check_duals()
+        return (self.model.values(self.ranges['col_cost_dn'][0], family),
+                self.model.values(self.ranges['col_cost_up'][0], family))
+
+    def _check_duals(self):
+        if self.stale:
+            self._refresh()
+        if self.row_dual is None:
+            raise ValueError(f"Model {self.model.name} has integer columns, there are no duals")
+
+    # ============================== Changes ======================================================
+    def _changes(self, overrides):
+        # (cols, new costs), (rows, new lower, new upper) and the coefficient changes of the overrides
+        unknown = set(overrides) - set(PATCHABLE)
+        if unknown:
+            raise ValueError(f"Cannot change {sorted(unknown)} in a built model, rebuild it instead")
+
+        model = self.model
+        cols, costs, rows, lower, upper, coefficients = [], [], [], [], [], {}
+        for name, values in overrides.items():
+            if name in COST_COLUMNS:
+                family, axis = COST_COLUMNS[name]
+                for key, value in values.items():
+                    on_key = model.columns_of(family, axis, key)
+                    cols.append(on_key)
+                    costs.append(np.full(len(on_key), float(value)))
+            elif name == 'D':
+                # D.<year> overrides become the whole D vector
+                on_balance, ratio = demand_ratio(model, demand_vector(model.params, values))
+                rows.append(on_balance)
+                lower.append(np.where(np.isfinite(model.row_lower[on_balance]), model.row_lower[on_balance] * ratio, -np.inf))
+                upper.append(np.where(np.isfinite(model.row_upper[on_balance]), model.row_upper[on_balance] * ratio, np.inf))
+            elif name == 'X_max':
+                for unit, value in values.items():
+                    on_unit = x_max_rows(model, unit)
+                    rows.append(on_unit)
+                    lower.append(model.row_lower[on_unit])
+                    upper.append(model.row_upper[on_unit] + value - model.params['X_max'][unit])
+            else:
+                coefficients[name] = values
+
+        join = lambda parts, dtype=float: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype)
+        return ((join(cols, int), join(costs)), (join(rows, int), join(lower), join(upper)), coefficients)
+
+    def _cost_change(self, cols, costs):
+        # Objective change and the share of the allowed cost ranges that is used
+        delta = costs - self.model.c[cols]
+        up = self.ranges['col_cost_up'][0][cols] - self.model.c[cols]
+        down = self.model.c[cols] - self.ranges['col_cost_dn'][0][cols]
+        return float(self.x[cols] @ delta), _usage(delta, up, down)
+
+    def _bound_change(self, rows, lower, upper):
+        status = [self.row_status[row] for row in rows.tolist()]
+        at_lower = np.array([s.name == 'kLower' for s in status], dtype=bool)
+        at_upper = np.array([s.name == 'kUpper' for s in status], dtype=bool)
+        basic = np.array([s.name == 'kBasic' for s in status], dtype=bool)
+
+        if not np.all(basic | at_lower | at_upper):
+            return None, np.inf
+
+        # Only the bound a row sits on moves the objective, the bounds of an inactive row may move up to
+        # its activity
+        old_lower, old_upper, activity = self.model.row_lower[rows], self.model.row_upper[rows], self.row_value[rows]
+        with np.errstate(invalid='ignore'):
+            delta_lower = np.where(lower == old_lower, 0.0, lower - old_lower)
+            delta_upper = np.where(upper == old_upper, 0.0, upper - old_upper)
+        bound = np.where(at_lower, old_lower, old_upper)
+        delta = np.where(at_lower, delta_lower, np.where(at_upper, delta_upper, 0.0))
+        up = self.ranges['row_bound_up'][0][rows] - bound
+        down = bound - self.ranges['row_bound_dn'][0][rows]
+        usage = (_usage(delta, up, down)
+                 + _usage(np.where(basic, delta_lower, 0.0), activity - old_lower, np.inf)
+                 + _usage(np.where(basic, delta_upper, 0.0), np.inf, old_upper - activity))
+        return float(self.row_dual[rows] @ delta), usage
+
+    def _linear(self, overrides):
+        # (objective change, usage) from the duals, usage > 1 if the basis may change
+        (cols, costs), (rows, lower, upper), coefficients = self._changes(overrides)
+        if self.row_dual is None or coefficients or (len(cols) and len(rows)):
+            return None, np.inf
+        if len(cols):
+            return self._cost_change(cols, costs)
+        return self._bound_change(rows, lower, upper)
+
+    # ============================== Queries ======================================================
+    def what_if(self, overrides):
+        # overrides like {'C_f': {'green_hydrogen': 150}}, as for model_io.patch
+        if self.stale:
+            self._refresh()
+        change, usage = self._linear(overrides)
+        if usage <= 1 + TOLERANCE:
+            return WhatIfResult(self.objective + change, change, 'dual')
+        return self._resolve(overrides)
+
+    def marginal_value(self, name, key):
+        # Cost change per unit of one parameter, e.g. ('X_max', 'heat_pump') per MWh or ('D', 2035),
+        # and the values of the parameter between which it holds
+        self._check_duals()
+        current, step = self._parameter(name, key)
+        value, usage_up = self._linear(step(current + 1))
+        _, usage_down = self._linear(step(current - 1))
+        if value is None:
+            raise ValueError(f"{name} has no marginal value from the duals, use what_if")
+        return Marginal(value, current - (1 / usage_down if usage_down else np.inf),
+                        current + (1 / usage_up if usage_up else np.inf))
+
+    def _parameter(self, name, key):
+        # Current value and a function giving the overrides for a new value
+        params = self.model.params
+        if name == 'D':
+            i = params['years'].index(key)
+
+            def step(value):
+                D = list(params['D'])
+                D[i] = value
+                return {'D': D}
+            return float(params['D'][i]), step
+        return float(params[name][key]), lambda value: {name: {key: value}}
+
+    def _resolve(self, overrides):
+        # Warm re-solve with the changes applied, then the changes are reverted
+        (cols, costs), (rows, lower, upper), coefficients = self._changes(overrides)
+        p, model = self.persistent, self.model
+        old_costs, old_lower, old_upper = model.c[cols].copy(), model.row_lower[rows].copy(), model.row_upper[rows].copy()
+        old_cop = {fuel: model.params['COP'][fuel] for fuel in coefficients.get('COP', {})}
+
+        p.set_costs(cols, costs)
+        p.set_row_bounds(rows, lower, upper)
+        for fuel, cop in coefficients.get('COP', {}).items():
+            p.set_cop(fuel, cop)
+        result = p.solve()
+
+        p.set_costs(cols, old_costs)
+        p.set_row_bounds(rows, old_lower, old_upper)
+        for fuel, cop in old_cop.items():
+            p.set_cop(fuel, cop)
+        self.stale = True
+        change = result.objective - self.objective if result.objective is not None else None
+        return WhatIfResult(result.objective, change, 'resolve')
+
+
+def _usage(delta, up, down):
+    # Share of the allowed ranges used by the changes (100% rule)
+    allowed = np.where(delta > 0, up, down)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(delta == 0, 0.0, np.abs(delta) / allowed)
+    return float(np.nan_to_num(share, nan=np.inf, posinf=np.inf).sum())
+
+
+# ============================== Command line ======================================================
+def main(argv=None):
+    from sweep import parse_parameter_sets
+
+    parser = argparse.ArgumentParser(description="Shadow prices, marginal values and what-if queries of the "
+                                                 "shipped model without re-solving")
+    parser.add_argument('--hours', type=int, default=1, help="time slots per planning year, 1 for the yearly model")
+    parser.add_argument('--what-if', action='append', dest='sets', metavar='PARAM[.KEY]=V1,V2,...',
+                        help="parameter values to evaluate, one query per combination")
+    parser.add_argument('--check', action='store_true', help="re-solve every what-if query to compare")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    params = default_params('q3_new')
+    model = (build_time_resolved_matrix(params, 'year') if args.hours == 1
+             else build_time_resolved_matrix(params, 'hour', heat_profile(args.hours)))
+    sensitivity = Sensitivity(PersistentModel(model, threads=options['threads'], time_limit=options['time_limit']))
+    print(f"Optimal Value of Z: {sensitivity.objective}")
+
+    for year in params['years']:
+        m = sensitivity.marginal_value('D', year)
+        print(f"D[{year}]: {m.value:.4f} per MWh for D in [{m.low:.6g}, {m.high:.6g}]")
+    for name, keys in (('X_max', params['units']), ('C_f', params['fuels'])):
+        for key in keys:
+            m = sensitivity.marginal_value(name, key)
+            print(f"{name}[{key}]: {m.value:.6g} per unit for {name} in [{m.low:.6g}, {m.high:.6g}]")
+
+    try:
+        queries = parse_parameter_sets(args.sets)
+    except ValueError as error:
+        parser.error(f"--what-if: {error}")
+    for overrides in queries:
+        try:
+            result = sensitivity.what_if(overrides)
+        except ValueError as error:
+            parser.error(f"--what-if: {error}")
+        line = f"{overrides}: {result.objective} ({result.method})"
+        if args.check:
+            line += f", re-solved {sensitivity._resolve(overrides).objective}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import stat
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from solution_cache import params_key
+
+# ============================= Job Service ========================================================
+# A long-lived local service for interactive what-if queries, so a query no longer pays Python, PuLP,
+# model construction and solver start-up. Clients send one JSON job per line, over a Unix socket or
+# localhost TCP, and get one JSON result per line back as soon as it is ready (in completion order,
+# matched by "id"):
+#   {"id": 1, "C_f": {"green_hydrogen": 150}, "COP": {...}, "D": [...], "X_max": {...},
+#    "fuels": ["electricity", "green_hydrogen"], "hours": 1}
+#   {"id": 1, "status": "Optimal", "objective": ..., "method": "dual", "time": 0.0004}
+# Jobs are dispatched to a fixed pool of worker processes. Every worker keeps a PersistentModel and
+# its duals per (fuels, hours) of the shipped data (built once, the default one at start-up) and
+# answers through sensitivity.Sensitivity: from the duals inside their ranges, else by a warm re-solve.
+# Fuels outside "fuels" get a zero upper bound on their Fuel_Consumption columns. Identical jobs that
+# arrive while one is in progress are batched onto the same evaluation. A worker keeps the MODELS most
+# recently used models, the others are rebuilt when asked for again.
+# The socket lives in the user's runtime directory ($XDG_RUNTIME_DIR, else a private directory in the
+# temporary directory), a stale socket of an earlier run is replaced but nothing else.
+MODELS = 4
+JOB_FIELDS = ['id', 'fuels', 'hours', 'C_op', 'C_inv', 'C_f', 'COP', 'D', 'X_max']
+
+
+def _runtime_directory():
+    return os.environ.get('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(), f"project_grid-{os.getuid()}")
+
+
+SOCKET_PATH = os.environ.get('PROJECT_GRID_SOCKET') or os.path.join(_runtime_directory(), 'project_grid.sock')
+
+
+# ============================== Workers ===========================================================
+@lru_cache(maxsize=MODELS)
+def _sensitivity(fuels, hours):
+    from hourly import build_time_resolved_matrix, heat_profile
+    from persistent_model import PersistentModel
+    from sensitivity import Sensitivity
+    from shipped_data import default_params
+
+    params = default_params('q3_new')
+    model = (build_time_resolved_matrix(params, 'year') if hours == 1
+             else build_time_resolved_matrix(params, 'hour', heat_profile(hours)))
+    persistent = PersistentModel(model, threads=1)
+    if fuels is not None:
+        for fuel in set(params['fuels']) - set(fuels):
+            columns = persistent.fuel_columns(fuel)
+            persistent.set_col_bounds(columns, 0.0, 0.0)
+    return Sensitivity(persistent)
+
+
+def _warm(fuels, hours):
+    # Imports, the default model and its first solve happen before the first job arrives
+    _sensitivity(fuels, hours)
+
+
+def evaluate(job):
+    start = time.perf_counter()
+    fuels = tuple(job['fuels']) if job.get('fuels') else None
+    overrides = {name: value for name, value in job.items() if name not in ('id', 'fuels', 'hours')}
+    try:
+        sensitivity = _sensitivity(fuels, int(job.get('hours', 1)))
+        result = sensitivity.what_if(overrides)
+    except (KeyError, ValueError) as error:
+        return {'status': 'Error', 'error': str(error), 'time': time.perf_counter() - start}
+    return {'status': 'Optimal' if result.objective is not None else 'Infeasible', 'objective': result.objective,
+            'method': result.method, 'time': time.perf_counter() - start}
+
+
+# ============================== Server ============================================================
+def _remove_stale_socket(path):
+    # A socket left by an earlier run is removed; a running service or any other file is not touched
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise FileExistsError(f"A service is already running on {path}")
+
+
+class JobService:
+
+    def __init__(self, workers=2, hours=1):
+        self.pool = ProcessPoolExecutor(workers, initializer=_warm, initargs=(None, hours))
+        self.in_progress = {}
+        self.jobs = self.batched = 0
+        # Spawn the workers now (each warms up in the initializer) rather than on the first jobs
+        for future in [self.pool.submit(_warm, None, hours) for _ in range(workers)]:
+            future.result()
+
+    async def submit(self, job):
+        unknown = set(job) - set(JOB_FIELDS)
+        if unknown:
+            return {'status': 'Error', 'error': f"Unknown job fields {sorted(unknown)}"}
+        key = params_key({name: value for name, value in job.items() if name != 'id'})
+        self.jobs += 1
+        if key in self.in_progress:
+            self.batched += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(self.pool, evaluate, job)
+            future.add_done_callback(lambda _: self.in_progress.pop(key, None))
+            self.in_progress[key] = future
+        return dict(await asyncio.shield(self.in_progress[key]))
+
+    async def handle(self, reader, writer):
+        lock = asyncio.Lock()
+
+        async def answer(line):
+            job = {}
+            try:
+                job = json.loads(line)
+                result = await self.submit(job)
+            except Exception as error:
+                # A malformed job fails on its own, the connection and the other jobs go on
+                result = {'status': 'Error', 'error': f"{type(error).__name__}: {error}"}
+            async with lock:
+                writer.write(json.dumps({'id': job.get('id') if isinstance(job, dict) else None, **result}).encode() + b'\n')
+                await writer.drain()
+
+        tasks = []
+        while line := await reader.readline():
+            if line.strip():
+                tasks.append(asyncio.create_task(answer(line)))
+        await asyncio.gather(*tasks)
+        writer.close()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+async def serve(path=SOCKET_PATH, port=None, workers=2, hours=1):
+    if port is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        _remove_stale_socket(path)
+    service = JobService(workers, hours)
+    if port is not None:
+        server = await asyncio.start_server(service.handle, '127.0.0.1', port)
+    else:
+        server = await asyncio.start_unix_server(service.handle, path)
+    print(f"Serving on {f'127.0.0.1:{port}' if port is not None else path} with {workers} warm workers", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        print(f"{service.jobs} jobs, {service.batched} batched onto identical ones")
+
+
+# ============================== Client ============================================================
+def query(jobs, path=SOCKET_PATH, port=None):
+    # Sends the jobs over one connection, yields the results as they arrive
+    if port is not None:
+        connection = socket.create_connection(('127.0.0.1', port))
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    with connection, connection.makefile('rb') as answers:
+        connection.sendall(b''.join(json.dumps(job).encode() + b'\n' for job in jobs))
+        connection.shutdown(socket.SHUT_WR)
+        for line in answers:
+            yield json.loads(line)
+
+
+def main(argv=None):
+    from sweep import parse_parameter_sets
+
+    parser = argparse.ArgumentParser(description="Local what-if service with warm solver workers")
+    commands = parser.add_subparsers(dest='command', required=True)
+    start = commands.add_parser('serve', help="run the service until interrupted")
+    start.add_argument('--workers', type=int, default=2)
+    start.add_argument('--hours', type=int, default=1, help="time slots of the model warmed at start-up")
+    ask = commands.add_parser('query', help="send jobs to a running service")
+    ask.add_argument('--set', action='append', dest='sets', metavar='PARAM[.KEY]=V1,V2,...',
+                     help="parameter values, one job per combination")
+    ask.add_argument('--fuels', default=None, help="comma-separated fuel set")
+    ask.add_argument('--hours', type=int, default=1)
+    for command in (start, ask):
+        command.add_argument('--socket', default=SOCKET_PATH, help="Unix socket path")
+        command.add_argument('--port', type=int, default=None, help="localhost TCP port instead of the socket")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.socket, args.port, args.workers, args.hours))
+        except KeyboardInterrupt:
+            pass
+        except FileExistsError as error:
+            parser.error(str(error))
+        return
+
+    try:
+        parameter_sets = parse_parameter_sets(args.sets)
+    except ValueError as error:
+        parser.error(f"--set: {error}")
+    jobs = []
+    for n, overrides in enumerate(parameter_sets):
+        job = {'id': n, 'hours': args.hours, **overrides}
+        if args.fuels:
+            job['fuels'] = args.fuels.split(',')
+        jobs.append(job)
+    start_time = time.perf_counter()
+    for result in query(jobs, args.socket, args.port):
+        print(json.dumps(result))
+    print(f"{len(jobs)} jobs answered in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import copy
+
+# ============================= Shipped Data =======================================================
+# The constants of the scripts as parameter dicts for the builders in model_builder, one per model family
+#   q1      - code_akash_q1.py and code_akash_q3.py
+#   new_try - code_new_try.py (same data as q1)
+#   q3_new  - bhai_q3_new.py
+#   5years  - 5years_combinationfuel1.py
+
+Q1_PARAMS = {
+    'years': list(range(2025, 2046, 5)),
+    'units': ['power_plant', 'hydrogen_plant', 'gas_plant'],
+    'fuels': ['electricity', 'green_hydrogen', 'synthetic_gas'],
+    'unit_fuels': {'electricity': 'power_plant', 'green_hydrogen': 'hydrogen_plant', 'synthetic_gas': 'gas_plant'},
+    'COP': {'electricity': 2.5, 'green_hydrogen': 0.90, 'synthetic_gas': 0.90},
+    'C_op': {'power_plant': 3, 'hydrogen_plant': 10, 'gas_plant': 10},
+    'C_inv': {'power_plant': 15, 'hydrogen_plant': 18, 'gas_plant': 18},
+    'C_f': {'electricity': 98.44, 'green_hydrogen': 171, 'synthetic_gas': 200},
+    'X': {'power_plant': 1000000, 'hydrogen_plant': 100000, 'gas_plant': 40000},
+    'X_max': {'power_plant': 10000000, 'hydrogen_plant': 800000, 'gas_plant': 200000},
+    'x': {'power_plant': 1500000, 'hydrogen_plant': 140000, 'gas_plant': 45000},
+    'D': [11940000, 10830000, 10000000, 9440000, 8880000],
+}
+
+Q3_NEW_PARAMS = copy.deepcopy(Q1_PARAMS)
+Q3_NEW_PARAMS['X_max']['power_plant'] = 12300000
+
+FIVE_YEARS_PARAMS = {
+    'years': list(range(2025, 2046, 5)),
+    'units': ['power_plant', 'hydrogen_plant', 'gas_plant'],
+    'fuels': ['electricity', 'green_hydrogen', 'synthetic_gas'],
+    'COP': {'electricity': 2.5, 'green_hydrogen': 0.90, 'synthetic_gas': 0.85},
+    'C_op': {'power_plant': 300, 'hydrogen_plant': 1000, 'gas_plant': 900},
+    'C_inv': {'power_plant': 1500, 'hydrogen_plant': 1800, 'gas_plant': 1700},
+    'C_f': {'electricity': 9844, 'green_hydrogen': 17100, 'synthetic_gas': 20000},
+    'X_max': {'power_plant': 168, 'hydrogen_plant': 150, 'gas_plant': 125},
+    'x': {'power_plant': 10, 'hydrogen_plant': 12, 'gas_plant': 9},
+    'CF': 20,
+    'demand': 100,   # the script's constant demand, split between electricity and the other fuel
+}
+
+PARAMS = {'q1': Q1_PARAMS, 'new_try': Q1_PARAMS, 'q3_new': Q3_NEW_PARAMS, '5years': FIVE_YEARS_PARAMS,
+          'combination': Q3_NEW_PARAMS}
+
+
+def default_params(family):
+    # A copy, so callers can change single values without touching the shipped data
+    return copy.deepcopy(PARAMS[family])
+
+
+def with_overrides(params, overrides):
+    # overrides like {'C_f': {'electricity': 80}, 'D': [...]} - dict values are merged key by key
+    params = copy.deepcopy(params)
+    for name, value in overrides.items():
+        if isinstance(value, dict) and isinstance(params.get(name), dict):
+            params[name].update(value)
+        else:
+            params[name] = value
+    return params
@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pulp
+
+import solver_backend
+from pulp_compat import constraint_map
+from solver_backend import SolveResult
+
+# ============================= Solution Cache =====================================================
+# Solved models are stored on disk under the SHA-256 of their normalized content, one compressed .npz
+# per model holding status, objective and the variable values. Keys come either from the parameters
+# (params_key: parameter dicts + builder source + subproblem, no build needed on a hit) or from the
+# generated problem itself (problem_key). The source of a builder counts with the sources of every
+# module of its directory it reaches through its module's globals (model_builder -> solver_backend,
+# hourly -> matrix_builder, ...), so a change in a helper is a new key too. The least recently used
+# entries are evicted once the cache grows past max_bytes or max_entries; the size is kept as a running
+# total per SolutionCache, the directory is only listed again when that total passes a limit.
+#   use    - return cached results, solve and store on a miss
+#   bypass - always solve, the cache is neither read nor written
+#   verify - always solve and compare with the cached objective, warn and replace on a mismatch
+CACHE_DIR = os.environ.get('PROJECT_GRID_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solution_cache'))
+MODES = ['use', 'bypass', 'verify']
+
+
+def _normalize(obj):
+    # Same parameters give the same key: dict order, tuples vs lists, 3 vs 3.0 and NumPy arrays do not matter
+    if isinstance(obj, dict):
+        return {str(k): _normalize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [_normalize(v) for v in obj]
+    if isinstance(obj, (bool, str)) or obj is None:
+        return obj
+    if isinstance(obj, (int, float, np.number)):
+        return float(obj)
+    if callable(obj):
+        return f"{obj.__module__}.{obj.__qualname__}:{_source_digest(obj)}"
+    return str(obj)
+
+
+def _local_modules(module, seen):
+    # The module and, recursively, every module of its directory referenced by its globals
+    directory = os.path.dirname(os.path.abspath(module.__file__))
+    seen[module.__name__] = module
+    for value in list(vars(module).values()):
+        other = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None) or '')
+        path = getattr(other, '__file__', None)
+        if (other is not None and other.__name__ not in seen and path
+                and os.path.dirname(os.path.abspath(path)) == directory):
+            _local_modules(other, seen)
+    return seen
+
+
+@lru_cache(maxsize=None)
+def _module_digest(name):
+    h = hashlib.sha256()
+    for module_name, module in sorted(_local_modules(sys.modules[name], {}).items()):
+        h.update(module_name.encode())
+        h.update(inspect.getsource(module).encode())
+    return h.hexdigest()
+
+
+def _source_digest(obj):
+    module = inspect.getmodule(obj)
+    if module is None or not getattr(module, '__file__', None):
+        return hashlib.sha256(inspect.getsource(obj).encode()).hexdigest()
+    return _module_digest(module.__name__)
+
+
+def params_key(*parts):
+    data = json.dumps(_normalize(parts), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def problem_key(prb):
+    # Hash of the generated problem: columns with bounds and type, objective and every row
+    h = hashlib.sha256()
+    h.update(repr(prb.sense).encode())
+    for v in sorted(prb.variables(), key=lambda v: v.name):
+        h.update(f"{v.name}|{v.lowBound}|{v.upBound}|{v.cat};".encode())
+    h.update(repr(sorted((v.name, float(c)) for v, c in prb.objective.items())).encode())
+    for name, c in sorted(constraint_map(prb).items()):
+        h.update(f"{name}|{c.sense}|{float(c.constant)}|".encode())
+        h.update(repr(sorted((v.name, float(coef)) for v, coef in c.items())).encode())
+    return h.hexdigest()
+
+
+class SolutionCache:
+
+    def __init__(self, directory=CACHE_DIR, mode='use', max_bytes=512 * 2 ** 20, max_entries=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._size = None   # {entry name: bytes}, listed on the first write
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                entry = {'status': str(data['status']), 'objective': float(data['objective']),
+                         'values': {name: None if np.isnan(value) else value
+                                    for name, value in zip(data['names'].tolist(), data['values'].tolist())}}
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+
+        if np.isnan(entry['objective']):
+            entry['objective'] = None
+        # Reading an entry makes it the most recently used one
+        os.utime(path)
+        self.hits += 1
+        return entry
+
+    def put(self, key, status, objective, values):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as file:
+            np.savez_compressed(file, status=np.array(status),
+                                objective=np.array(np.nan if objective is None else objective, dtype=float),
+                                names=np.array(list(values), dtype=str),
+                                values=np.array([np.nan if v is None else v for v in values.values()], dtype=float))
+        os.replace(tmp, path)
+
+        if self._size is None:
+            self._size = self._list()
+        self._size[os.path.basename(path)] = os.path.getsize(path)
+        if self._over(sum(self._size.values()), len(self._size)):
+            self.evict()
+
+    def _list(self):
+        return {name: os.path.getsize(os.path.join(self.directory, name))
+                for name in os.listdir(self.directory) if name.endswith('.npz')}
+
+    def _over(self, total, count):
+        return total > self.max_bytes or (self.max_entries is not None and count > self.max_entries)
+
+    def evict(self):
+        # Lists the directory again (other processes may have written to it) and removes the least
+        # recently used entries until it is within the limits
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        while entries and self._over(total, len(entries)):
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+        self._size = {name: size for _, size, name in entries}
+
+
+_open = {}
+
+
+def open_cache(**options):
+    # One SolutionCache per process and options, so its running size total lasts across the scenarios
+    key = tuple(sorted(options.items()))
+    if key not in _open:
+        _open[key] = SolutionCache(**options)
+    return _open[key]
+
+
+def cached_solve(model, cache, key=None, **solver_options):
+    # Solve a ModelBuilder through the cache, on a hit the cached values are written into the PuLP variables
+    prb = model.prb
+    key = key or problem_key(prb)
+    entry = cache.get(key) if cache.mode != 'bypass' else None
+
+    if entry is not None and cache.mode == 'use':
+        for v in prb.variables():
+            v.varValue = entry['values'].get(v.name)
+        prb.status = {s: n for n, s in pulp.LpStatus.items()}.get(entry['status'], pulp.LpStatusUndefined)
+        model.result = SolveResult('cache', entry['status'], entry['objective'], 0.0)
+        return model.result
+
+    result = solver_backend.solve(prb, **solver_options)
+    model.result = result
+    model.solver_calls += 1
+
+    store(cache, key, entry, result, {v.name: v.varValue for v in prb.variables()})
+    return result
+
+
+def store(cache, key, entry, result, values):
+    # After a fresh solve: check it against the cached entry in verify mode and (re)write the entry
+    if entry is not None and cache.mode == 'verify' and not same_objective(entry['objective'], result.objective):
+        warnings.warn(f"Cached objective {entry['objective']} differs from fresh solve {result.objective}, "
+                      f"replacing cache entry {key}")
+    if cache.mode != 'bypass':
+        cache.put(key, result.status, result.objective, values)
+
+
+def same_objective(a, b, rel_tol=1e-6):
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= rel_tol * max(1.0, abs(a), abs(b))
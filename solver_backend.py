@@ -0,0 +1,221 @@
+import argparse
+import importlib.util
+import json
+import os
+import time
+from collections import namedtuple
+
+import pulp
+
+import telemetry
+from pulp_compat import cbc_solver, constraint_map
+
+# ============================= Solver Backends ====================================================
+# One place to pick the solver instead of calling pulp.GUROBI() in every script. All backends take
+# the same options (threads, time_limit, mip_gap, presolve, cutoff) and return a SolveResult. A cutoff
+# stops the solve as soon as the objective provably cannot get below it (minimization).
+#   highs  - HiGHS through highspy (pulp.HiGHS), or through scipy.optimize.milp when highspy is missing
+#   cbc    - COIN-OR CBC shipped with PuLP
+#   gurobi - Gurobi, needs a licence
+#   auto   - benchmark every installed backend once per model shape and keep the fastest
+BACKENDS = ['highs', 'cbc', 'gurobi']
+DEFAULT_BACKEND = 'highs'
+
+# Fastest backend per model shape found by --solver auto, shared between runs
+AUTO_CACHE_FILE = os.environ.get('PROJECT_GRID_SOLVER_CACHE',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solver_choice.json'))
+
+SolveResult = namedtuple('SolveResult', ['backend', 'status', 'objective', 'solve_time'])
+
+# scipy.optimize.milp status: 0 optimal, 1 iteration or time limit, 2 infeasible, 3 unbounded, 4 other
+SCIPY_STATUS = {0: pulp.LpStatusOptimal, 1: pulp.LpStatusNotSolved, 2: pulp.LpStatusInfeasible,
+                3: pulp.LpStatusUnbounded}
+
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def backend_available(name):
+    if name == 'highs':
+        return _has_module('highspy') or _has_module('scipy')
+    if name == 'cbc':
+        return cbc_solver(msg=False).available()
+    if name == 'gurobi':
+        return pulp.GUROBI(msg=False).available()
+    raise ValueError(f"Unknown solver backend: {name}")
+
+
+def available_backends():
+    return [name for name in BACKENDS if backend_available(name)]
+
+
+def get_solver(name, threads=None, time_limit=None, mip_gap=None, presolve=True, msg=False, cutoff=None):
+    # PuLP solver object for a backend, None for HiGHS without highspy (solved through scipy instead)
+    if name == 'highs':
+        if not _has_module('highspy'):
+            return None
+        params = {} if presolve else {'presolve': 'off'}
+        if cutoff is not None:
+            params['objective_bound'] = cutoff
+        return pulp.HiGHS(msg=msg, timeLimit=time_limit, gapRel=mip_gap, threads=threads, **params)
+    if name == 'cbc':
+        options = [] if cutoff is None else [f"cutoff {cutoff}"]
+        return cbc_solver(msg=msg, timeLimit=time_limit, gapRel=mip_gap, threads=threads,
+                          presolve=None if presolve else False, options=options)
+    if name == 'gurobi':
+        params = {} if presolve else {'Presolve': 0}
+        if threads is not None:
+            params['Threads'] = threads
+        if cutoff is not None:
+            params['Cutoff'] = cutoff
+        return pulp.GUROBI(msg=msg, timeLimit=time_limit, gapRel=mip_gap, **params)
+    raise ValueError(f"Unknown solver backend: {name}")
+
+
+def model_shape(prb):
+    # Models with the same number of columns, rows, non-zeros and integer columns share a backend choice
+    nonzeros = sum(len(c) for c in constraint_map(prb).values())
+    integers = sum(1 for v in prb.variables() if v.cat != pulp.LpContinuous)
+    return f"{prb.numVariables()}x{prb.numConstraints()}:{nonzeros}:{integers}"
+
+
+def _solve_scipy(prb, time_limit=None, mip_gap=None, presolve=True):
+    # HiGHS through scipy.optimize.milp - the PuLP problem is turned into a sparse matrix and the
+    # solution is written back into the PuLP variables. scipy does not expose threads or a cutoff.
+    import numpy as np
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import csr_matrix
+
+    variables = prb.variables()
+    index = {v.name: j for j, v in enumerate(variables)}
+
+    c = np.zeros(len(variables))
+    for v, coef in prb.objective.items():
+        c[index[v.name]] = coef * prb.sense
+
+    rows, cols, vals, lb, ub = [], [], [], [], []
+    for i, constraint in enumerate(constraint_map(prb).values()):
+        for v, coef in constraint.items():
+            rows.append(i)
+            cols.append(index[v.name])
+            vals.append(coef)
+        rhs = -constraint.constant
+        lb.append(rhs if constraint.sense != pulp.LpConstraintLE else -np.inf)
+        ub.append(rhs if constraint.sense != pulp.LpConstraintGE else np.inf)
+
+    A = csr_matrix((vals, (rows, cols)), shape=(len(lb), len(variables)))
+    bounds = Bounds([-np.inf if v.lowBound is None else v.lowBound for v in variables],
+                    [np.inf if v.upBound is None else v.upBound for v in variables])
+    integrality = [0 if v.cat == pulp.LpContinuous else 1 for v in variables]
+
+    options = {'disp': False, 'presolve': presolve}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+    if mip_gap is not None:
+        options['mip_rel_gap'] = mip_gap
+
+    constraints = [LinearConstraint(A, lb, ub)] if len(lb) else []
+    res = milp(c, integrality=integrality, bounds=bounds, constraints=constraints, options=options)
+
+    prb.status = SCIPY_STATUS.get(res.status, pulp.LpStatusUndefined)
+    prb.solverModel = res
+    if res.x is not None:
+        for v, value in zip(variables, res.x):
+            v.varValue = float(value)
+    return prb.status
+
+
+def _solve_with(prb, backend, threads=None, time_limit=None, mip_gap=None, presolve=True, msg=False, cutoff=None):
+    solver = get_solver(backend, threads, time_limit, mip_gap, presolve, msg, cutoff)
+    start, cpu_start = time.perf_counter(), telemetry.cpu_time()
+    if solver is None:
+        _solve_scipy(prb, time_limit, mip_gap, presolve)
+    else:
+        prb.solve(solver)
+    solve_time = time.perf_counter() - start
+
+    objective = pulp.value(prb.objective) if prb.status == pulp.LpStatusOptimal else None
+    result = SolveResult(backend, pulp.LpStatus[prb.status], objective, solve_time)
+    if telemetry.enabled():
+        # CBC leaves no solver model behind, solverModel would still be the one of an earlier solve
+        solver_model = prb.solverModel if backend != 'cbc' else None
+        telemetry.record(prb.name, telemetry.problem_stats(prb), result, solve_time,
+                         telemetry.cpu_time() - cpu_start, solver_model)
+    return result
+
+
+def _load_auto_cache():
+    try:
+        with open(AUTO_CACHE_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_auto_cache(cache):
+    try:
+        with open(AUTO_CACHE_FILE, 'w') as file:
+            json.dump(cache, file, indent=2)
+    except OSError:
+        pass
+
+
+def _solve_auto(prb, **options):
+    backends = available_backends()
+    shape = model_shape(prb)
+    cache = _load_auto_cache()
+
+    if cache.get(shape) in backends:
+        return _solve_with(prb, cache[shape], **options)
+
+    # Benchmark every installed backend once on this model and keep the fastest
+    results = [_solve_with(prb, backend, **options) for backend in backends]
+    fastest = min(results, key=lambda r: r.solve_time)
+    cache[shape] = fastest.backend
+    _store_auto_cache(cache)
+
+    # Leave the variables holding the solution of the chosen backend
+    if fastest is not results[-1]:
+        return _solve_with(prb, fastest.backend, **options)
+    return fastest
+
+
+def solve(prb, backend=None, threads=None, time_limit=None, mip_gap=None, presolve=True, msg=False, cutoff=None):
+    options = {'threads': threads, 'time_limit': time_limit, 'mip_gap': mip_gap, 'presolve': presolve, 'msg': msg,
+               'cutoff': cutoff}
+    backend = backend or DEFAULT_BACKEND
+
+    if backend == 'auto':
+        return _solve_auto(prb, **options)
+
+    # Open-source fallback: HiGHS first, then CBC
+    if not backend_available(backend) and backend == DEFAULT_BACKEND:
+        backend = 'cbc'
+    return _solve_with(prb, backend, **options)
+
+
+# ============================== Command line ======================================================
+def add_solver_arguments(parser):
+    parser.add_argument('--solver', default=DEFAULT_BACKEND, choices=BACKENDS + ['auto'],
+                        help="solver backend (default: %(default)s)")
+    parser.add_argument('--threads', type=int, default=None, help="solver threads")
+    parser.add_argument('--time-limit', type=float, default=None, help="solver time limit in seconds")
+    parser.add_argument('--mip-gap', type=float, default=None, help="relative MIP gap")
+    parser.add_argument('--no-presolve', dest='presolve', action='store_false', help="switch solver presolve off")
+    parser.add_argument('--telemetry', default=None, metavar='FILE', help="append one JSON line per solve to FILE")
+    return parser
+
+
+def options_from_args(args):
+    if args.telemetry:
+        telemetry.enable(args.telemetry)
+    return {'backend': args.solver, 'threads': args.threads, 'time_limit': args.time_limit,
+            'mip_gap': args.mip_gap, 'presolve': args.presolve}
+
+
+def options_from_argv(argv=None):
+    # Solver options of a script, other command line flags (e.g. --milp) are left to the script
+    parser = add_solver_arguments(argparse.ArgumentParser(add_help=False))
+    args, _ = parser.parse_known_args(argv)
+    return options_from_args(args)
@@ -0,0 +1,268 @@
+import argparse
+import random
+import time
+from collections import namedtuple
+from itertools import chain
+from multiprocessing import Pipe, Process
+
+import numpy as np
+
+import solver_backend
+from hourly import capacity_rows, demand_share, dispatch_rows, time_profile
+from matrix_builder import MatrixModel, solve_matrix
+from persistent_model import PersistentModel
+from shipped_data import default_params, with_overrides
+
+# ============================= Two-stage Stochastic Mode ==========================================
+# Capacity is decided once (first stage, CAP[t, u]), dispatch per demand / price scenario (second
+# stage, G[s, t, h, u] and F[s, t, h, f]) on the rows of hourly.py. A scenario is a set of overrides of
+# the second-stage parameters (D, C_f, C_op, COP) with a probability; the expected cost is minimized.
+#   extensive - one MatrixModel with the CAP columns shared by all scenario blocks, built block by block
+#   benders   - multi-cut Benders decomposition: a small master over CAP and one cost estimate per
+#               scenario, the scenario subproblems are solved with CAP fixed (in worker processes, each
+#               keeping its PersistentModels for warm starts) and return their cost and its gradient in
+#               CAP (the reduced costs of the fixed CAP columns) as a cut for the master.
+# A subproblem is feasible exactly when sum_u CAP[t, u] covers the demand share of year t (a unit can
+# then run in proportion to the profile), so the master carries these rows and no feasibility cuts
+# are needed. The cost estimates start at 0, which needs non-negative C_op and C_f.
+SECOND_STAGE = ['D', 'C_f', 'C_op', 'COP']
+
+BendersResult = namedtuple('BendersResult', ['status', 'objective', 'lower_bound', 'CAP', 'iterations', 'solve_time'])
+
+
+def demand_scenarios(params, n, spread=0.1, price_spread=0.0, seed=0):
+    # n equally likely scenarios: every year's demand and (optionally) every fuel price scaled by a
+    # random factor in [1 - spread, 1 + spread]
+    rng = random.Random(seed)
+    years = len(params['years'])
+    scenarios = []
+    for _ in range(n):
+        overrides = {'D': [d * rng.uniform(1 - spread, 1 + spread) for d in params['D'][:years]]}
+        if price_spread:
+            overrides['C_f'] = {f: c * rng.uniform(1 - price_spread, 1 + price_spread)
+                                for f, c in params['C_f'].items()}
+        scenarios.append(overrides)
+    return scenarios
+
+
+def _scenario_params(params, scenarios, probabilities):
+    for overrides in scenarios:
+        first_stage = set(overrides) - set(SECOND_STAGE)
+        if first_stage:
+            raise ValueError(f"Scenarios can only change {SECOND_STAGE}, not {sorted(first_stage)}")
+    probabilities = np.full(len(scenarios), 1 / len(scenarios)) if probabilities is None else np.asarray(probabilities)
+    return [with_overrides(params, overrides) for overrides in scenarios], probabilities
+
+
+def _vector(params, name, keys):
+    return np.array([params[name][k] for k in params[keys]], dtype=float)
+
+
+# ============================== Extensive form ====================================================
+def build_extensive_form(params, scenarios, probabilities=None, time_resolution='year', profile=None,
+                         name="Stochastic_extensive_form"):
+    scenario_params, probabilities = _scenario_params(params, scenarios, probabilities)
+    profile = time_profile(time_resolution, profile)
+    S, T, H = len(scenario_params), len(params['years']), profile.shape[-1]
+    U, Fn = len(params['units']), len(params['fuels'])
+
+    model = MatrixModel(name)
+    model.params, model.scenario_params, model.probabilities, model.profile = params, scenario_params, probabilities, profile
+
+    # Decision Variables - shared capacity, generation and fuel per scenario weighted by its probability
+    C_op = np.array([_vector(p, 'C_op', 'units') for p in scenario_params])
+    C_f = np.array([_vector(p, 'C_f', 'fuels') for p in scenario_params])
+    CAP = model.add_columns('Installed_Capacity', (T, U), _vector(params, 'C_inv', 'units')[None, :],
+                            axes=('years', 'units'))
+    G = model.add_columns('Generation', (S, T, H, U), (probabilities[:, None] * C_op)[:, None, None, :],
+                          axes=('scenarios', 'years', 'hours', 'units'))
+    F = model.add_columns('Fuel_Consumption', (S, T, H, Fn), (probabilities[:, None] * C_f)[:, None, None, :],
+                          axes=('scenarios', 'years', 'hours', 'fuels'))
+
+    blocks = chain(capacity_rows(params, CAP),
+                   *(dispatch_rows(p, G[s], CAP, F[s], profile) for s, p in enumerate(scenario_params)))
+    for block in blocks:
+        model.add_rows(*block)
+    return model.assemble()
+
+
+# ============================== Benders ===========================================================
+def build_recourse_model(params, profile, name="Stochastic_recourse"):
+    # Dispatch of one scenario, CAP columns without cost and fixed to the master's value before each solve
+    T, H, U, Fn = len(params['years']), profile.shape[-1], len(params['units']), len(params['fuels'])
+    model = MatrixModel(name)
+    model.params, model.profile = params, profile
+    CAP = model.add_columns('Installed_Capacity', (T, U), 0.0, axes=('years', 'units'))
+    G = model.add_columns('Generation', (T, H, U), _vector(params, 'C_op', 'units')[None, None, :],
+                          axes=('years', 'hours', 'units'))
+    F = model.add_columns('Fuel_Consumption', (T, H, Fn), _vector(params, 'C_f', 'fuels')[None, None, :],
+                          axes=('years', 'hours', 'fuels'))
+    for block in dispatch_rows(params, G, CAP, F, profile):
+        model.add_rows(*block)
+    return model.assemble()
+
+
+def _evaluate(subproblem, CAP):
+    # Recourse cost at CAP and its gradient, the reduced costs of the fixed CAP columns
+    cols = subproblem.model.column_index('Installed_Capacity').ravel()
+    subproblem.set_col_bounds(cols, CAP, CAP)
+    result = subproblem.solve()
+    if result.status != 'Optimal':
+        raise RuntimeError(f"Scenario subproblem is {result.status} for the master's capacity")
+    return result.objective, np.asarray(subproblem.highs.getSolution().col_dual)[cols]
+
+
+def _worker(connection, scenario_params, profile, solver_options):
+    subproblems = [PersistentModel(build_recourse_model(p, profile), **solver_options) for p in scenario_params]
+    while True:
+        CAP = connection.recv()
+        if CAP is None:
+            break
+        connection.send([_evaluate(subproblem, CAP) for subproblem in subproblems])
+
+
+class _ScenarioPool:
+    # Scenarios dealt round-robin to long-lived worker processes, in this process for workers=1
+
+    def __init__(self, scenario_params, profile, workers, solver_options):
+        self.n = len(scenario_params)
+        self.workers = max(1, min(workers, self.n))
+        if self.workers == 1:
+            self.subproblems = [PersistentModel(build_recourse_model(p, profile), **solver_options)
+                                for p in scenario_params]
+            return
+        self.connections, self.processes = [], []
+        for w in range(self.workers):
+            parent, child = Pipe()
+            process = Process(target=_worker, args=(child, scenario_params[w::self.workers], profile, solver_options),
+                              daemon=True)
+            process.start()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def evaluate(self, CAP):
+        if self.workers == 1:
+            return [_evaluate(subproblem, CAP) for subproblem in self.subproblems]
+        for connection in self.connections:
+            connection.send(CAP)
+        results = [None] * self.n
+        for w, connection in enumerate(self.connections):
+            results[w::self.workers] = connection.recv()
+        return results
+
+    def close(self):
+        if self.workers > 1:
+            for connection in self.connections:
+                connection.send(None)
+            for process in self.processes:
+                process.join()
+
+
+def _master(params, scenario_params, probabilities):
+    # min C_inv CAP + sum_s p_s theta_s, CAP + X <= X_max as column bounds, demand cover rows per year
+    import highspy
+
+    units = params['units']
+    T, U, S = len(params['years']), len(units), len(scenario_params)
+    headroom = _vector(params, 'X_max', 'units') - _vector(params, 'X', 'units')
+
+    master = highspy.Highs()
+    master.setOptionValue('output_flag', False)
+    cost = np.concatenate([np.tile(_vector(params, 'C_inv', 'units'), T), probabilities])
+    upper = np.concatenate([np.tile(headroom, T), np.full(S, highspy.kHighsInf)])
+    master.addCols(T * U + S, cost, np.zeros(T * U + S), upper, 0, np.array([], dtype=np.int32),
+                   np.array([], dtype=np.int32), np.array([]))
+    for i in range(T):
+        demand = max(demand_share(p)[i] * p['D'][i] for p in scenario_params)
+        master.addRow(demand, highspy.kHighsInf, U, np.arange(i * U, (i + 1) * U, dtype=np.int32), np.ones(U))
+    return master
+
+
+def solve_benders(params, scenarios, probabilities=None, time_resolution='year', profile=None, workers=1,
+                  tolerance=1e-6, max_iterations=200, threads=1, time_limit=None, presolve=True):
+    if max_iterations < 1:
+        raise ValueError(f"Benders needs at least one iteration, got max_iterations={max_iterations}")
+    start = time.perf_counter()
+    scenario_params, probabilities = _scenario_params(params, scenarios, probabilities)
+    profile = time_profile(time_resolution, profile)
+    T, U, S = len(params['years']), len(params['units']), len(scenario_params)
+    n = T * U
+    C_inv = np.tile(_vector(params, 'C_inv', 'units'), T)
+
+    master = _master(params, scenario_params, probabilities)
+    pool = _ScenarioPool(scenario_params, profile, workers, {'threads': threads, 'presolve': presolve})
+    lower, upper, best_CAP = -np.inf, np.inf, None
+    status = 'Not Solved'
+
+    try:
+        for iteration in range(1, max_iterations + 1):
+            master.run()
+            if master.getModelStatus().name != 'kOptimal':
+                status = 'Infeasible'
+                break
+            solution = np.array(master.getSolution().col_value)
+            CAP, theta = solution[:n], solution[n:]
+            lower = master.getInfo().objective_function_value
+
+            evaluations = pool.evaluate(CAP)
+            costs = np.array([cost for cost, _ in evaluations])
+            value = C_inv @ CAP + probabilities @ costs
+            if value < upper:
+                upper, best_CAP = value, CAP.reshape(T, U)
+
+            if upper - lower <= tolerance * max(1.0, abs(upper)):
+                status = 'Optimal'
+                break
+            if time_limit is not None and time.perf_counter() - start > time_limit:
+                break
+
+            # Optimality cut per scenario whose estimate is below its cost: theta_s - g_s CAP >= Q_s - g_s CAP^
+            for s, (cost, gradient) in enumerate(evaluations):
+                if theta[s] < cost - tolerance * max(1.0, abs(cost)):
+                    cols = np.append(np.arange(n, dtype=np.int32), np.int32(n + s))
+                    master.addRow(cost - gradient @ CAP, np.inf, n + 1, cols, np.append(-gradient, 1.0))
+    finally:
+        pool.close()
+
+    objective = upper if np.isfinite(upper) else None
+    return BendersResult(status, objective, lower, best_CAP, iteration, time.perf_counter() - start)
+
+
+# ============================== Command line ======================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capacity plan against demand and price scenarios")
+    parser.add_argument('--scenarios', type=int, default=20)
+    parser.add_argument('--spread', type=float, default=0.1, help="relative demand spread of the scenarios")
+    parser.add_argument('--price-spread', type=float, default=0.0, help="relative fuel price spread")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--method', default='benders', choices=['extensive', 'benders'])
+    parser.add_argument('--time-resolution', default='year', choices=['year', 'hour'])
+    parser.add_argument('--workers', type=int, default=1, help="processes for the Benders subproblems")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    params = default_params('q3_new')
+    scenarios = demand_scenarios(params, args.scenarios, args.spread, args.price_spread, args.seed)
+
+    if args.method == 'extensive':
+        model = build_extensive_form(params, scenarios, time_resolution=args.time_resolution)
+        result = solve_matrix(model, options['time_limit'], options['mip_gap'], options['presolve'])
+        CAP = model.values(model.x, 'Installed_Capacity') if result.objective is not None else None
+        print(f"Extensive form {model.n_rows} rows x {model.n_cols} columns: {result.status}, "
+              f"expected cost {result.objective} in {result.solve_time:.2f} s")
+    else:
+        result = solve_benders(params, scenarios, time_resolution=args.time_resolution, workers=args.workers,
+                               threads=options['threads'] or 1, time_limit=options['time_limit'],
+                               presolve=options['presolve'])
+        CAP = result.CAP
+        print(f"Benders: {result.status} after {result.iterations} iterations, expected cost {result.objective} "
+              f"(lower bound {result.lower_bound}) in {result.solve_time:.2f} s")
+
+    if CAP is not None:
+        for t, row in zip(params['years'], CAP):
+            print(t, {u: round(float(v), 1) for u, v in zip(params['units'], row)})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import csv
+import importlib.util
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import combinations, product
+from multiprocessing import get_context
+
+import pulp
+
+import model_builder
+import results
+import solver_backend
+import telemetry
+from merit_order import merit_order, stack_params
+from solution_cache import MODES as CACHE_MODES, open_cache, params_key, store
+from shipped_data import default_params, with_overrides
+
+# ============================= Scenario Sweep Engine ==============================================
+# The subproblems of the scripts (years x other_fuel, years x units, combinations of fuels) and any
+# number of parameter sets are independent, so every scenario is built and solved in its own worker
+# process. Each worker gets threads_per_worker solver threads, by default the pool has
+# cpu_count // threads_per_worker workers so the cores are not oversubscribed. BLAS / OpenMP size their
+# thread pools when they are loaded, so the workers are spawned (not forked from a parent that has them
+# loaded already) with THREAD_VARIABLES set; threadpoolctl, when installed, limits them as well.
+# Families in MERIT_ORDER_FAMILIES are pure LPs with the merit-order structure, their scenarios are
+# evaluated in closed form (merit_order.py), all parameter sets of a subproblem in one vectorized call.
+# With --ledger every finished scenario is written to disk at once (ledger.py), a re-run resumes the
+# unfinished ones and --shard i/N splits the sweep over several machines sharing the ledger directory.
+
+Scenario = namedtuple('Scenario', ['key', 'family', 'args', 'params'])
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+BUILDERS = {
+    'q1': model_builder.build_q1_model,
+    'new_try': model_builder.build_new_try_model,
+    'q3_new': model_builder.build_q3_new_model,
+    '5years': model_builder.build_5years_model,
+    'combination': model_builder.build_combination_model,
+}
+MERIT_ORDER_FAMILIES = {'combination'}
+
+
+def subproblems(family, params):
+    years, units, fuels = params['years'], params['units'], params['fuels']
+    if family == 'q1':
+        return [()]
+    if family == 'new_try':
+        # The fuel permutation of code_new_try.py does not enter the model, one solve per (year, unit)
+        return [(t, u) for t in years for u in units]
+    if family in ('q3_new', 'combination'):
+        return [(combination,) for combination in combinations(fuels, 2)]
+    if family == '5years':
+        return [(y, f) for y in years for f in fuels if f != 'electricity']
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def scenarios(family, params=None, parameter_sets=None):
+    # One scenario per parameter set and subproblem, the key is (parameter set number, *subproblem)
+    params = default_params(family) if params is None else params
+    for n, overrides in enumerate(parameter_sets or [{}]):
+        scenario_params = with_overrides(params, overrides)
+        for args in subproblems(family, scenario_params):
+            yield Scenario((n,) + tuple(args), family, tuple(args), scenario_params)
+
+
+def _column(name, index):
+    index = index if isinstance(index, tuple) else (index,)
+    return f"{name}[{','.join(map(str, index))}]"
+
+
+def solve_scenario(scenario, solver_options=None, cache_options=None):
+    solver_options = solver_options or {}
+    builder = BUILDERS[scenario.family]
+
+    # The cache key covers the builder source, subproblem, parameters and the options that change the result,
+    # so a hit needs neither a build nor a solve
+    cache = open_cache(**cache_options) if cache_options else None
+    entry = None
+    if cache is not None:
+        key = params_key(builder, scenario.args, scenario.params,
+                         {k: solver_options.get(k) for k in ('mip_gap', 'time_limit', 'cutoff')})
+        entry = cache.get(key) if cache.mode != 'bypass' else None
+        if entry is not None and cache.mode == 'use':
+            return {'scenario': scenario.key, 'status': entry['status'], 'objective': entry['objective'],
+                    'build_time': 0.0, 'solve_time': 0.0, **entry['values']}
+
+    start = time.perf_counter()
+    model = builder(scenario.params, *scenario.args)
+    model.presolve()
+    build_time = time.perf_counter() - start
+
+    with telemetry.context(scenario=scenario.key):
+        result = model.solve(**solver_options)
+
+    values = results.flat_columns(results.solution_arrays(model), results.solution_axes(model))
+    if cache is not None:
+        store(cache, key, entry, result, values)
+
+    return {'scenario': scenario.key, 'status': result.status, 'objective': result.objective,
+            'build_time': build_time, 'solve_time': result.solve_time, **values}
+
+
+def merit_order_rows(scenario_list):
+    # Rows of solve_scenario for scenarios of a MERIT_ORDER_FAMILIES family, without building a model
+    groups = {}
+    for scenario in scenario_list:
+        groups.setdefault(scenario.args, []).append(scenario)
+
+    rows = {}
+    for (fuel_combination,), group in groups.items():
+        params = group[0].params
+        start = time.perf_counter()
+        result = merit_order(params, stack_params([s.params for s in group]), fuel_combination)
+        solve_time = (time.perf_counter() - start) / len(group)
+
+        for n, scenario in enumerate(group):
+            feasible = bool(result.feasible[n])
+            values = {}
+            for name, array, keys in (('G', result.G, params['units']), ('CAP', result.CAP, params['units']),
+                                      ('F', result.F, params['fuels'])):
+                for i, t in enumerate(params['years']):
+                    for j, k in enumerate(keys):
+                        values[_column(name, (t, k))] = float(array[n, i, j]) if feasible else None
+            status = pulp.LpStatus[pulp.LpStatusOptimal if feasible else pulp.LpStatusInfeasible]
+            rows[scenario.key] = {'scenario': scenario.key, 'status': status,
+                                  'objective': float(result.cost[n]) if feasible else None,
+                                  'build_time': 0.0, 'solve_time': solve_time, **values}
+    return rows
+
+
+_thread_limits = []
+
+
+def _init_worker(threads):
+    # Keep BLAS/OpenMP inside the worker to its share of the cores as well
+    if importlib.util.find_spec('threadpoolctl') is not None:
+        from threadpoolctl import threadpool_limits
+        _thread_limits.append(threadpool_limits(threads))
+
+
+@contextmanager
+def worker_pool(workers, threads):
+    # Spawned worker processes that start with THREAD_VARIABLES = threads. The variables are set in this
+    # process while the pool lives (workers may start on demand) and restored afterwards.
+    saved = {var: os.environ.get(var) for var in THREAD_VARIABLES}
+    os.environ.update({var: str(threads) for var in THREAD_VARIABLES})
+    pool = ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=_init_worker,
+                               initargs=(threads,))
+    try:
+        yield pool
+    finally:
+        pool.shutdown(cancel_futures=True)
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def run_sweep(scenario_list, workers=None, threads_per_worker=1, cache_options=None, fast_path=True,
+              **solver_options):
+    # cache_options are the SolutionCache arguments (directory, mode, max_bytes, ...), None for no cache
+    scenario_list = list(scenario_list)
+    if fast_path and any(s.family in MERIT_ORDER_FAMILIES for s in scenario_list):
+        fast = merit_order_rows([s for s in scenario_list if s.family in MERIT_ORDER_FAMILIES])
+        solved = iter(run_sweep([s for s in scenario_list if s.family not in MERIT_ORDER_FAMILIES], workers,
+                                threads_per_worker, cache_options, fast_path=False, **solver_options))
+        return [fast[s.key] if s.family in MERIT_ORDER_FAMILIES else next(solved) for s in scenario_list]
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    solver_options['threads'] = threads_per_worker
+    solve = partial(solve_scenario, solver_options=solver_options, cache_options=cache_options)
+
+    if workers == 1:
+        return [solve(s) for s in scenario_list]
+
+    chunksize = max(1, len(scenario_list) // (workers * 4))
+    with worker_pool(workers, threads_per_worker) as pool:
+        return list(pool.map(solve, scenario_list, chunksize=chunksize))
+
+
+def best(table):
+    optimal = [row for row in table if row['status'] == pulp.LpStatus[pulp.LpStatusOptimal]]
+    return min(optimal, key=lambda row: row['objective']) if optimal else None
+
+
+def write_table(table, path):
+    columns = list(dict.fromkeys(column for row in table for column in row))
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(table)
+
+
+# ============================== Command line ======================================================
+def parse_parameter_sets(assignments):
+    # --set C_f.electricity=80,98.44,120 --set COP.electricity=2.5,3 gives the product of all values
+    axes = []
+    for assignment in assignments or []:
+        name, values = assignment.split('=', 1)
+        axes.append([(name, float(value)) for value in values.split(',')])
+
+    parameter_sets = []
+    for combination in product(*axes):
+        overrides = {}
+        for name, value in combination:
+            param, _, key = name.partition('.')
+            if isinstance(overrides.get(param), dict) != bool(key) and param in overrides:
+                raise ValueError(f"{param} is set both as a whole and per key")
+            if key:
+                overrides.setdefault(param, {})[key] = value
+            else:
+                overrides[param] = value
+        parameter_sets.append(overrides)
+    return parameter_sets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the scenarios of a model family in parallel")
+    parser.add_argument('--family', default='q3_new', choices=sorted(BUILDERS))
+    parser.add_argument('--set', action='append', dest='sets', metavar='PARAM[.KEY]=V1,V2,...',
+                        help="parameter values to sweep, repeat for a product of several parameters")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--out', default='sweep_results.csv',
+                        help="result file, .csv, .npz, .arrow/.feather or .parquet")
+    parser.add_argument('--cache', default='use', choices=CACHE_MODES + ['off'],
+                        help="solution cache: use, bypass (always solve), verify (solve and compare) or off")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--cache-max-mb', type=float, default=512)
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help="solve merit-order families with the solver instead of in closed form")
+    parser.add_argument('--ledger', default=None, metavar='DIR',
+                        help="write every finished scenario to this ledger directory and resume from it")
+    parser.add_argument('--shard', default='1/1', metavar='I/N', help="solve the i-th of N shards (needs --ledger)")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    options.pop('threads')
+    cache_options = None
+    if args.cache != 'off':
+        cache_options = {'mode': args.cache, 'max_bytes': int(args.cache_max_mb * 2 ** 20)}
+        if args.cache_dir:
+            cache_options['directory'] = args.cache_dir
+
+    start = time.perf_counter()
+    parameter_sets = parse_parameter_sets(args.sets)
+    scenario_list = list(scenarios(args.family, parameter_sets=parameter_sets))
+    if args.ledger:
+        import ledger
+
+        sweep = ledger.sweep_id(args.family, default_params(args.family), parameter_sets, options)
+        before, solved, failed = ledger.run_ledger(
+            scenario_list, args.ledger, sweep, ledger.parse_shard(args.shard), workers=args.workers,
+            threads_per_worker=args.threads_per_worker, cache_options=cache_options,
+            fast_path=not args.no_fast_path, description={'family': args.family, 'sets': args.sets}, **options)
+        print(f"Sweep {sweep}, shard {args.shard}: {before} finished before, {solved} solved, {failed} failed "
+              f"in {time.perf_counter() - start:.2f} s")
+        table, missing = ledger.merge(args.ledger, sweep, scenario_list)
+        if missing:
+            print(f"{len(missing)} of {len(scenario_list)} scenarios not finished yet, the results are written "
+                  f"once all shards are done (or with python ledger.py merge {args.ledger})")
+            return
+    elif args.shard != '1/1':
+        parser.error("--shard needs --ledger")
+    else:
+        table = run_sweep(scenario_list, workers=args.workers, threads_per_worker=args.threads_per_worker,
+                          cache_options=cache_options, fast_path=not args.no_fast_path, **options)
+    if args.out.lower().endswith('.csv'):
+        write_table(table, args.out)
+    else:
+        results.write_results(table, args.out)
+
+    row = best(table)
+    print(f"{len(table)} scenarios in {time.perf_counter() - start:.2f} s, results in {args.out}")
+    if row is not None:
+        print(f"Best scenario {row['scenario']}: {row['objective']}")
+
+
+if __name__ == '__main__':
+    main()
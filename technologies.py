@@ -0,0 +1,107 @@
+import argparse
+import random
+import time
+from itertools import combinations
+
+import pulp
+
+import solver_backend
+from model_builder import build_technology_model
+from shipped_data import default_params
+
+# ============================= Technology Catalogue ===============================================
+# The unit <-> fuel mapping as data: params['efficiency'] = {unit: {fuel: COP}}, one entry per technology,
+# any unit may burn several fuels and any fuel may be burnt in several units. The choice of at most k
+# technologies is one MILP (model_builder.build_technology_model) with one binary per technology,
+# so a catalogue of 20-50 technologies is still a single solve instead of C(n, k) solves.
+
+
+def efficiency_matrix(params):
+    # The catalogue of the scripts: every fuel in its unit of unit_fuels (or the parallel lists) at COP[f]
+    unit_fuels = params.get('unit_fuels') or dict(zip(params['fuels'], params['units']))
+    efficiency = {u: {} for u in params['units']}
+    for f, u in unit_fuels.items():
+        efficiency[u][f] = params['COP'][f]
+    return efficiency
+
+
+def with_catalogue(params):
+    return {**params, 'efficiency': params.get('efficiency') or efficiency_matrix(params)}
+
+
+def synthetic_catalogue(params, n_units=10, n_fuels=5, density=0.5, seed=0):
+    # n_units x n_fuels catalogue in the ranges of the shipped data, every unit burns at least one fuel
+    # and can cover 40-100% of the peak demand
+    rng = random.Random(seed)
+    units = [f"unit_{u}" for u in range(n_units)]
+    fuels = [f"fuel_{f}" for f in range(n_fuels)]
+    efficiency = {}
+    for u in units:
+        burnt = [f for f in fuels if rng.random() < density] or [rng.choice(fuels)]
+        efficiency[u] = {f: rng.uniform(0.85, 3.0) for f in burnt}
+    return {
+        **params,
+        'units': units,
+        'fuels': fuels,
+        'efficiency': efficiency,
+        'C_op': {u: rng.uniform(3, 10) for u in units},
+        'C_inv': {u: rng.uniform(15, 18) for u in units},
+        'C_f': {f: rng.uniform(98, 200) for f in fuels},
+        'X': {u: 0.0 for u in units},
+        'X_max': {u: rng.uniform(0.4, 1.0) * max(params['D']) for u in units},
+    }
+
+
+def selected(model):
+    return [tech for tech, v in model.SEL.items() if v.varValue is not None and v.varValue > 0.5]
+
+
+def select_technologies(params, k=2, **solver_options):
+    model = build_technology_model(with_catalogue(params), k)
+    result = model.solve(**solver_options)
+    return (selected(model) if result.objective is not None else None), result.objective, model
+
+
+def enumerate_technologies(params, k=2, **solver_options):
+    # Reference: one solve per subset of k technologies with SEL fixed, the search the scripts do for fuels
+    model = build_technology_model(with_catalogue(params), k)
+    best_technologies, best_objective = None, float('inf')
+    for subset in combinations(model.SEL, k):
+        for tech, v in model.SEL.items():
+            v.lowBound = v.upBound = int(tech in subset)
+        result = model.solve(**solver_options)
+        if result.objective is not None and result.objective < best_objective:
+            best_technologies, best_objective = list(subset), result.objective
+    return best_technologies, best_objective, model.solver_calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Choose at most k technologies of a unit-fuel catalogue")
+    parser.add_argument('--k', type=int, default=2)
+    parser.add_argument('--units', type=int, default=None, help="synthetic catalogue with this many units")
+    parser.add_argument('--fuels', type=int, default=5, help="fuels of the synthetic catalogue")
+    parser.add_argument('--density', type=float, default=0.5, help="share of unit-fuel pairs in the catalogue")
+    parser.add_argument('--enumerate', action='store_true', help="also solve every subset of k technologies")
+    solver_backend.add_solver_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = solver_backend.options_from_args(args)
+    params = default_params('combination')
+    if args.units:
+        params = synthetic_catalogue(params, args.units, args.fuels, args.density)
+
+    start = time.perf_counter()
+    chosen, objective, model = select_technologies(params, args.k, **options)
+    print(f"{len(model.SEL)} technologies, at most {args.k}: {pulp.LpStatus[model.prb.status]} "
+          f"in {time.perf_counter() - start:.2f} s")
+    print(f"Selected technologies: {chosen}")
+    print(f"Optimal Value of Z: {objective}")
+
+    if args.enumerate:
+        start = time.perf_counter()
+        chosen, objective, calls = enumerate_technologies(params, args.k, **options)
+        print(f"Enumeration, {calls} solves in {time.perf_counter() - start:.2f} s: {chosen}, {objective}")
+
+
+if __name__ == '__main__':
+    main()
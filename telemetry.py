@@ -0,0 +1,154 @@
+import argparse
+import json
+import math
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pulp
+
+from presolve import family
+from pulp_compat import constraint_map
+
+# ============================= Solve Telemetry ====================================================
+# One JSON-lines record per solve, written by solver_backend.solve, matrix_builder.solve_matrix and
+# PersistentModel.solve while a telemetry file is set (PROJECT_GRID_TELEMETRY, --telemetry or enable()):
+#   scenario    - the key set by the caller with context(scenario=...), else the problem name
+#   rows, cols, nonzeros, integers and per constraint family rows/nonzeros
+#   build_time  - from ModelBuilder, wall_time / cpu_time of the solve (CPU includes CBC subprocesses)
+#   iterations, nodes, gap - from HiGHS or Gurobi, None where the solver does not report them
+#   backend, status, objective
+# A record costs one pass over the rows and one append to the file, so it can stay on for sweeps.
+# Every record is a single O_APPEND write, so the workers of a sweep can share the file.
+TELEMETRY_FILE = os.environ.get('PROJECT_GRID_TELEMETRY')
+
+_fd = None
+_context = {}
+
+
+def enable(path):
+    global TELEMETRY_FILE, _fd
+    TELEMETRY_FILE, _fd = path, None
+    # Worker processes started with spawn read the file from the environment
+    os.environ['PROJECT_GRID_TELEMETRY'] = path
+
+
+def enabled():
+    return TELEMETRY_FILE is not None
+
+
+@contextmanager
+def context(**fields):
+    # Fields added to every record emitted inside the block, e.g. context(scenario=(0, 'electricity'))
+    global _context
+    previous = _context
+    _context = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context = previous
+
+
+def cpu_time():
+    # CPU time of this process plus its finished children (CBC runs as a subprocess)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _finite(value):
+    # Strict JSON has no Infinity/NaN, e.g. the MIP gap of a model without an incumbent
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def emit(record):
+    global _fd
+    if _fd is None:
+        _fd = os.open(TELEMETRY_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    record = {k: _finite(v) for k, v in record.items()}
+    os.write(_fd, (json.dumps(record, default=str) + '\n').encode())
+
+
+# ============================== Statistics ========================================================
+def problem_stats(prb):
+    families = {}
+    constraints = constraint_map(prb)
+    for name, constraint in constraints.items():
+        counts = families.setdefault(family(name), {'rows': 0, 'nonzeros': 0})
+        counts['rows'] += 1
+        counts['nonzeros'] += len(constraint)
+    variables = prb.variables()
+    return {'rows': len(constraints), 'cols': len(variables),
+            'nonzeros': sum(counts['nonzeros'] for counts in families.values()),
+            'integers': sum(1 for v in variables if v.cat != pulp.LpContinuous), 'families': families}
+
+
+def matrix_stats(model):
+    row_nonzeros = np.diff(model.A.indptr)
+    families = {}
+    for name, blocks in model.rows.items():
+        families[name] = {'rows': sum(stop - start for start, stop in blocks),
+                          'nonzeros': int(sum(row_nonzeros[start:stop].sum() for start, stop in blocks))}
+    return {'rows': model.n_rows, 'cols': model.n_cols, 'nonzeros': int(model.A.nnz),
+            'integers': int(np.count_nonzero(model.integrality)), 'families': families}
+
+
+def solver_stats(solver_model):
+    # highspy.Highs, a gurobipy model or a scipy.optimize.milp result
+    if hasattr(solver_model, 'getInfo'):
+        info = solver_model.getInfo()
+        mip = info.mip_node_count >= 0
+        return {'iterations': info.simplex_iteration_count + max(info.ipm_iteration_count, 0),
+                'nodes': info.mip_node_count if mip else None, 'gap': info.mip_gap if mip else None}
+    if hasattr(solver_model, 'IterCount'):
+        mip = solver_model.IsMIP
+        return {'iterations': int(solver_model.IterCount), 'nodes': int(solver_model.NodeCount) if mip else None,
+                'gap': solver_model.MIPGap if mip and solver_model.SolCount else None}
+    return {'iterations': getattr(solver_model, 'nit', None), 'nodes': getattr(solver_model, 'mip_node_count', None),
+            'gap': getattr(solver_model, 'mip_gap', None)}
+
+
+def record(name, problem, result, wall_time, cpu_time, solver_model=None):
+    emit({'time': time.time(), 'pid': os.getpid(), 'scenario': name, 'build_time': None, **_context,
+          **{k: v for k, v in problem.items() if k != 'families'},
+          'backend': result.backend, 'status': result.status, 'objective': result.objective,
+          'wall_time': wall_time, 'cpu_time': cpu_time,
+          **solver_stats(solver_model), 'families': problem['families']})
+
+
+# ============================== Summary ===========================================================
+def load(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def summary(records, by='scenario', top=20):
+    # Solves, wall and CPU time per value of a record field, largest wall time first
+    groups = {}
+    for r in records:
+        key = json.dumps(r.get(by))
+        group = groups.setdefault(key, {by: r.get(by), 'solves': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+        group['solves'] += 1
+        group['wall_time'] += r['wall_time']
+        group['cpu_time'] += r['cpu_time']
+    return sorted(groups.values(), key=lambda g: -g['wall_time'])[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Where the solve time of a telemetry file goes")
+    parser.add_argument('path')
+    parser.add_argument('--by', default='scenario', help="record field to group by, e.g. scenario, status, backend")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    records = load(args.path)
+    print(f"{len(records)} solves, {sum(r['wall_time'] for r in records):.2f} s wall, "
+          f"{sum(r['cpu_time'] for r in records):.2f} s CPU")
+    print(f"{args.by:<60}{'Solves':>8}{'Wall':>10}{'CPU':>10}")
+    for group in summary(records, args.by, args.top):
+        print(f"{str(group[args.by]):<60}{group['solves']:>8}{group['wall_time']:>10.3f}{group['cpu_time']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The modules live in the repository root, next to the scripts
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def without_highspy():
+    # Runs Python code in a fresh interpreter where importing highspy fails, returns the process
+    def run(code):
+        return subprocess.run([sys.executable, '-c', f"import sys; sys.modules['highspy'] = None\n{code}"],
+                              cwd=ROOT, capture_output=True, text=True)
+    return run
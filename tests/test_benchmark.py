@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from benchmark import STAGES, main
+
+ARGS = ['--family', 'combination', '--years', '5', '--units', '3']
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    out = tmp_path_factory.mktemp('benchmark') / 'results.json'
+    main(ARGS + ['--out', str(out)])
+    with open(out) as file:
+        return json.load(file)
+
+
+def test_results(results):
+    [case] = results['cases']
+    assert case['status'] == 'Optimal'
+    assert all(case[stage] >= 0 for stage in STAGES)
+
+
+def test_regression_exit_code(results, tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    out = str(tmp_path / 'results.json')
+    with open(baseline, 'w') as file:
+        json.dump(results, file)
+    main(ARGS + ['--out', out, '--baseline', str(baseline), '--tolerance', '100'])
+
+    # A baseline that used a fraction of the memory is a regression
+    smaller = json.loads(json.dumps(results))
+    for case in smaller['cases']:
+        case['peak_rss_mb'] /= 1000
+    with open(baseline, 'w') as file:
+        json.dump(smaller, file)
+    with pytest.raises(SystemExit) as raised:
+        main(ARGS + ['--out', out, '--baseline', str(baseline)])
+    assert raised.value.code == 1
+
+
+def test_imports_without_highspy(without_highspy):
+    process = without_highspy("import benchmark")
+    assert process.returncode == 0, process.stderr
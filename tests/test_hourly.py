@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import solve_matrix
+from model_builder import build_combination_model
+
+# The data of 5years_combinationfuel1.py
+PARAMS = {
+    'years': [2025, 2030, 2035, 2040, 2045],
+    'units': ['power_plant', 'hydrogen_plant', 'gas_plant'],
+    'fuels': ['electricity', 'green_hydrogen', 'synthetic_gas'],
+    'unit_fuels': {'electricity': 'power_plant', 'green_hydrogen': 'hydrogen_plant', 'synthetic_gas': 'gas_plant'},
+    'COP': {'electricity': 2.5, 'green_hydrogen': 0.9, 'synthetic_gas': 0.9},
+    'C_op': {'power_plant': 3, 'hydrogen_plant': 10, 'gas_plant': 10},
+    'C_inv': {'power_plant': 15, 'hydrogen_plant': 18, 'gas_plant': 18},
+    'C_f': {'electricity': 98.44, 'green_hydrogen': 171, 'synthetic_gas': 200},
+    'X': {'power_plant': 1000000, 'hydrogen_plant': 100000, 'gas_plant': 40000},
+    'X_max': {'power_plant': 12300000, 'hydrogen_plant': 800000, 'gas_plant': 200000},
+    'x': {'power_plant': 1500000, 'hydrogen_plant': 140000, 'gas_plant': 45000},
+    'D': [11940000, 10830000, 10000000, 9440000, 8880000],
+}
+
+
+@pytest.fixture(scope='module')
+def yearly():
+    return build_combination_model(PARAMS, tuple(PARAMS['fuels'])).solve().objective
+
+
+def test_year_resolution_matches_yearly_model(yearly):
+    assert solve_matrix(build_time_resolved_matrix(PARAMS, 'year')).objective == pytest.approx(yearly, rel=1e-9)
+
+
+@pytest.mark.parametrize('profile', [heat_profile(1), np.ones(1), np.full(24, 1 / 24)],
+                         ids=['one slot', 'ones', 'flat day'])
+def test_flat_profile_matches_yearly_model(yearly, profile):
+    model = build_time_resolved_matrix(PARAMS, 'hour', profile)
+    assert solve_matrix(model).objective == pytest.approx(yearly, rel=1e-9)
+
+
+def test_hourly_shape():
+    model = build_time_resolved_matrix(PARAMS, 'hour', heat_profile(24))
+    T, H, U, Fn = 5, 24, 3, 3
+    assert model.n_cols == T * (H * U + U + H * Fn)
+    assert solve_matrix(model).status == 'Optimal'
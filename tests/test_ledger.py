@@ -0,0 +1,59 @@
+import pytest
+
+import sweep
+from ledger import finished_rows, merge, run_ledger
+from shipped_data import default_params
+
+SWEEP = 'test'
+
+
+@pytest.fixture
+def scenario_list():
+    return list(sweep.scenarios('new_try', default_params('new_try')))
+
+
+@pytest.fixture
+def solved(monkeypatch):
+    # Keys of the scenarios that reach the solver
+    keys = []
+    solve_scenario = sweep.solve_scenario
+
+    def counting(scenario, **kwargs):
+        keys.append(scenario.key)
+        return solve_scenario(scenario, **kwargs)
+
+    monkeypatch.setattr(sweep, 'solve_scenario', counting)
+    return keys
+
+
+def test_resume_after_killed_shard(tmp_path, scenario_list, solved, monkeypatch):
+    solve_scenario = sweep.solve_scenario
+
+    def killed_after_five(scenario, **kwargs):
+        if len(solved) == 5:
+            raise KeyboardInterrupt
+        return solve_scenario(scenario, **kwargs)
+
+    monkeypatch.setattr(sweep, 'solve_scenario', killed_after_five)
+    with pytest.raises(KeyboardInterrupt):
+        run_ledger(scenario_list, tmp_path, SWEEP, workers=1)
+    assert len(finished_rows(tmp_path, SWEEP)) == 5
+
+    monkeypatch.setattr(sweep, 'solve_scenario', solve_scenario)
+    first = list(solved)
+    assert run_ledger(scenario_list, tmp_path, SWEEP, workers=1) == (5, len(scenario_list) - 5, 0)
+    assert not set(first) & set(solved[len(first):])
+    assert len(solved) == len(scenario_list)
+
+
+def test_merged_shards_cover_every_scenario_once(tmp_path, scenario_list, solved):
+    for i in range(3):
+        run_ledger(scenario_list, tmp_path, SWEEP, shard=(i, 3), workers=1)
+    rows, missing = merge(tmp_path, SWEEP, scenario_list)
+    assert missing == []
+    assert [row['scenario'] for row in rows] == [s.key for s in scenario_list]
+    assert sorted(solved) == sorted(s.key for s in scenario_list)
+
+    # Another shard count finds every scenario finished
+    assert run_ledger(scenario_list, tmp_path, SWEEP, shard=(0, 2), workers=1) == (8, 0, 0)
+    assert len(solved) == len(scenario_list)
@@ -0,0 +1,59 @@
+import pytest
+
+from matrix_builder import build_q1_matrix, build_q3_new_matrix, solve_matrix
+from model_builder import build_q1_model, build_q3_new_model
+
+# The data of code_akash_q1.py; bhai_q3_new.py allows a larger power plant
+Q1_PARAMS = {
+    'years': list(range(2025, 2046, 5)),
+    'units': ['power_plant', 'hydrogen_plant', 'gas_plant'],
+    'fuels': ['electricity', 'green_hydrogen', 'synthetic_gas'],
+    'unit_fuels': {'electricity': 'power_plant', 'green_hydrogen': 'hydrogen_plant', 'synthetic_gas': 'gas_plant'},
+    'COP': {'electricity': 2.5, 'green_hydrogen': 0.90, 'synthetic_gas': 0.90},
+    'C_op': {'power_plant': 3, 'hydrogen_plant': 10, 'gas_plant': 10},
+    'C_inv': {'power_plant': 15, 'hydrogen_plant': 18, 'gas_plant': 18},
+    'C_f': {'electricity': 98.44, 'green_hydrogen': 171, 'synthetic_gas': 200},
+    'X': {'power_plant': 1000000, 'hydrogen_plant': 100000, 'gas_plant': 40000},
+    'X_max': {'power_plant': 10000000, 'hydrogen_plant': 800000, 'gas_plant': 200000},
+    'x': {'power_plant': 1500000, 'hydrogen_plant': 140000, 'gas_plant': 45000},
+    'D': [11940000, 10830000, 10000000, 9440000, 8880000],
+}
+Q3_NEW_PARAMS = dict(Q1_PARAMS, X_max=dict(Q1_PARAMS['X_max'], power_plant=12300000))
+
+COMBINATIONS = [('electricity', 'green_hydrogen'), ('electricity', 'synthetic_gas'),
+                ('green_hydrogen', 'synthetic_gas')]
+
+# The shipped q1 and q3_new data are infeasible; the variants below have an optimum. q1 asks every year
+# for 0.2 * D of the generation of all years, so it needs the same demand in every year.
+Q1_DATA = {'shipped': Q1_PARAMS, 'flat demand': dict(Q1_PARAMS, D=[10000000] * 5)}
+Q3_NEW_DATA = {'shipped': Q3_NEW_PARAMS,
+               'large plants': dict(Q3_NEW_PARAMS, X_max={'power_plant': 1230000000, 'hydrogen_plant': 80000000,
+                                                          'gas_plant': 20000000})}
+
+
+def assert_same_solve(result, matrix_result):
+    assert matrix_result.status == result.status
+    if result.status == 'Optimal':
+        assert matrix_result.objective == pytest.approx(result.objective, rel=1e-7)
+
+
+@pytest.mark.parametrize('data', sorted(Q1_DATA))
+def test_q1_matrix_matches_model(data):
+    params = Q1_DATA[data]
+    assert_same_solve(build_q1_model(params).solve(), solve_matrix(build_q1_matrix(params)))
+
+
+@pytest.mark.parametrize('data', sorted(Q3_NEW_DATA))
+@pytest.mark.parametrize('combination', COMBINATIONS)
+def test_q3_new_matrix_matches_model(data, combination):
+    params = Q3_NEW_DATA[data]
+    assert_same_solve(build_q3_new_model(params, combination).solve(),
+                      solve_matrix(build_q3_new_matrix(params, combination)))
+
+
+def test_variants_have_an_optimum():
+    # Otherwise the comparisons above only check that both builders agree on infeasibility
+    params = Q1_DATA['flat demand']
+    assert build_q1_model(params).solve().status == 'Optimal'
+    params = Q3_NEW_DATA['large plants']
+    assert build_q3_new_model(params, COMBINATIONS[0]).solve().status == 'Optimal'
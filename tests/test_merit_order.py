@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix
+from matrix_builder import solve_matrix
+from merit_order import merit_order, stack_params
+from model_builder import build_combination_model
+from shipped_data import default_params, with_overrides
+
+PARAMS = default_params('combination')
+
+
+@pytest.mark.parametrize('combination', list(itertools.combinations(PARAMS['fuels'], 2)))
+def test_merit_order_matches_combination_model(combination):
+    result = build_combination_model(PARAMS, combination).solve()
+    fast = merit_order(PARAMS, fuel_combination=combination)
+    assert bool(fast.feasible[0]) == (result.status == 'Optimal')
+    if result.status == 'Optimal':
+        assert fast.cost[0] == pytest.approx(result.objective, rel=1e-9)
+
+
+def test_merit_order_matches_yearly_matrix():
+    result = solve_matrix(build_time_resolved_matrix(PARAMS, 'year'))
+    assert merit_order(PARAMS).cost[0] == pytest.approx(result.objective, rel=1e-9)
+
+
+def test_stacked_parameter_sets_match_one_solve_each():
+    # Fuel prices that reorder the units, and a demand no combination can cover
+    params_list = [with_overrides(PARAMS, {'C_f': {'electricity': price}}) for price in (10, 100, 1000)]
+    params_list.append(with_overrides(PARAMS, {'D': [3 * d for d in PARAMS['D']]}))
+    fast = merit_order(PARAMS, stack_params(params_list))
+    for s, params in enumerate(params_list):
+        result = build_combination_model(params, tuple(params['fuels'])).solve()
+        if result.status == 'Optimal':
+            assert fast.cost[s] == pytest.approx(result.objective, rel=1e-9)
+        else:
+            assert not fast.feasible[s] and np.isinf(fast.cost[s])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix
+from matrix_builder import solve_matrix
+from mga import explore, main
+from shipped_data import default_params
+
+
+@pytest.fixture
+def model():
+    return build_time_resolved_matrix(default_params('q3_new'), 'year')
+
+
+@pytest.mark.parametrize('method', ['random', 'hsj', 'both'])
+def test_alternatives_stay_within_the_slack(model, method):
+    optimum = solve_matrix(build_time_resolved_matrix(default_params('q3_new'), 'year')).objective
+    result = explore(model, slack=0.05, n=12, method=method)
+    assert result.optimum == pytest.approx(optimum, rel=1e-9)
+    assert result.alternatives[0].direction == 'optimum'
+    for alternative in result.alternatives:
+        assert alternative.cost <= 1.05 * optimum * (1 + 1e-7)
+
+
+def test_alternatives_are_distinct(model):
+    alternatives = explore(model, slack=0.1, n=24, distinct=0.01).alternatives
+    assert len(alternatives) > 2
+    for i, a in enumerate(alternatives):
+        for b in alternatives[i + 1:]:
+            assert np.abs(a.fuel_mix - b.fuel_mix).max() > 0.01
+
+
+def test_main_prints_the_years_that_differ(capsys):
+    main(['--alternatives', '4'])
+    lines = capsys.readouterr().out.splitlines()[1:]
+    assert '-0.0%' not in '\n'.join(lines)
+    headers = [i for i, line in enumerate(lines) if not line.startswith(' ')]
+    years = [j - i - 1 for i, j in zip(headers, headers[1:] + [len(lines)])]
+    assert years[0] == len(default_params('q3_new')['years'])
+    assert len(years) > 1 and all(n >= 1 for n in years[1:])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import build_q1_matrix, build_q3_new_matrix, solve_matrix
+from model_io import demand_vector, load_bundle, main, patch, save_bundle, solve_mps, write_mps
+from shipped_data import default_params, with_overrides
+
+BUILDS = {
+    'q1': lambda params: build_q1_matrix(params),
+    'q3_new': lambda params: build_q3_new_matrix(params, ('electricity', 'green_hydrogen')),
+    'hourly': lambda params: build_time_resolved_matrix(params, 'hour', heat_profile(4)),
+}
+PATCHES = [
+    {'C_f': {'electricity': 80.0}, 'C_op': {'gas_plant': 12.0}, 'C_inv': {'power_plant': 20.0}},
+    {'COP': {'electricity': 3.1, 'synthetic_gas': 0.8}},
+    {'X_max': {'hydrogen_plant': 900000.0}},
+    {'D': 9000000.0},
+    {'D': [12000000.0, 11000000.0, 10000000.0, 9000000.0, 8000000.0]},
+    {'D': {'2035': 12500000.0}},
+]
+
+
+def assert_same_model(model, other):
+    for name in ('c', 'col_lower', 'col_upper', 'integrality', 'row_lower', 'row_upper'):
+        np.testing.assert_allclose(getattr(model, name), getattr(other, name), rtol=1e-12)
+    np.testing.assert_allclose(model.A.toarray(), other.A.toarray(), rtol=1e-12)
+
+
+@pytest.mark.parametrize('family', sorted(BUILDS))
+def test_bundle_round_trip(family, tmp_path):
+    model = BUILDS[family](default_params('q3_new'))
+    save_bundle(model, tmp_path / 'model.npz')
+    loaded = load_bundle(tmp_path / 'model.npz')
+    assert_same_model(loaded, model)
+    assert (loaded.columns, loaded.rows, loaded.params) == (model.columns, model.rows, model.params)
+
+
+@pytest.mark.parametrize('family', sorted(BUILDS))
+@pytest.mark.parametrize('overrides', PATCHES)
+def test_patched_bundle_matches_fresh_build(family, overrides, tmp_path):
+    params = default_params('q3_new')
+    save_bundle(BUILDS[family](params), tmp_path / 'model.npz')
+    patched = patch(load_bundle(tmp_path / 'model.npz'), overrides)
+    if 'D' in overrides:
+        overrides = {**overrides, 'D': demand_vector(params, overrides['D'])}
+    fresh = BUILDS[family](with_overrides(params, overrides))
+    assert_same_model(patched, fresh)
+
+
+def test_demand_vector():
+    params = default_params('q3_new')
+    assert demand_vector(params, 5) == [5.0] * 5
+    assert demand_vector(params, {2030: 1, '2045': 2}) == [11940000, 1, 10000000, 9440000, 2]
+    with pytest.raises(ValueError, match="planning year"):
+        demand_vector(params, {'2026': 1})
+    with pytest.raises(ValueError, match="one value per planning year"):
+        demand_vector(params, [1, 2])
+
+
+def test_mps_round_trip(tmp_path):
+    model = build_time_resolved_matrix(default_params('combination'), 'year')
+    write_mps(model, str(tmp_path / 'model.mps'))
+    result = solve_mps(str(tmp_path / 'model.mps'))
+    assert result.status == 'Optimal'
+    assert result.objective == pytest.approx(solve_matrix(model).objective, rel=1e-9)
+
+
+def test_command_line(tmp_path, capsys):
+    path = str(tmp_path / 'model.npz')
+    main(['export', 'hourly', path])
+    main(['solve', path, '--set', 'D.2045=1', '--set', 'C_f.electricity=2,3'])
+    assert capsys.readouterr().out.count('Optimal') == 2
+    main(['export', 'hourly', str(tmp_path / 'model.mps')])
+    main(['solve', str(tmp_path / 'model.mps')])
+    assert 'Optimal' in capsys.readouterr().out
+    for sets in (['D.2026=1'], ['D=abc'], ['D=1', 'D.2030=2']):
+        with pytest.raises(SystemExit) as exit_info:
+            main(['solve', path] + [option for value in sets for option in ('--set', value)])
+        assert exit_info.value.code == 2
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix
+from pareto import EMISSION_FACTORS, emission_factors, pareto_frontier
+from shipped_data import default_params, with_overrides
+
+
+def _model(E_f=None):
+    params = default_params('q3_new')
+    return build_time_resolved_matrix(params if E_f is None else with_overrides(params, {'E_f': E_f}), 'year')
+
+
+@pytest.mark.parametrize('E_f', [None, {'electricity': 0.76}], ids=['default', 'dirty electricity'])
+def test_adaptive_frontier_matches_uniform_points(E_f):
+    adaptive = pareto_frontier(_model(E_f))
+    uniform = pareto_frontier(_model(E_f), points=100, uniform=True)
+    assert len(uniform.points) == 100
+    assert adaptive.solves < 10
+    emissions = [point.emissions for point in adaptive.points]
+    costs = [point.cost for point in adaptive.points]
+    assert emissions == sorted(emissions) and costs == sorted(costs, reverse=True)
+    for point in uniform.points:
+        assert np.interp(point.emissions, emissions, costs) == pytest.approx(point.cost, rel=1e-9)
+
+
+def test_emission_factor_override():
+    params = with_overrides(default_params('q3_new'), {'E_f': {'electricity': 0.0}})
+    assert emission_factors(params) == {**EMISSION_FACTORS, 'electricity': 0.0}
+
+    # Electricity is the cheapest fuel, without its emissions there is nothing to trade off
+    [point] = pareto_frontier(_model({'electricity': 0.0})).points
+    assert point.emissions == 0.0
+    assert point.cost == pytest.approx(pareto_frontier(_model()).points[-1].cost, rel=1e-9)
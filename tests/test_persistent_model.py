@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+import shipped_data
+from hourly import build_time_resolved_matrix
+from matrix_builder import build_q3_new_matrix, solve_matrix
+from persistent_model import PersistentModel
+from shipped_data import default_params
+
+SHIPPED_Q3_NEW = copy.deepcopy(shipped_data.Q3_NEW_PARAMS)
+
+
+def test_changes_leave_params_alone():
+    # A model built from the shipped dict itself and one from a caller's copy
+    params = default_params('q3_new')
+    models = [build_q3_new_matrix(shipped_data.Q3_NEW_PARAMS, ('electricity', 'green_hydrogen')),
+              build_time_resolved_matrix(params, 'year')]
+    for model in models:
+        persistent = PersistentModel(model)
+        persistent.sweep_fuel_price('electricity', [50.0, 129.95])
+        persistent.set_cop('green_hydrogen', 0.5)
+        assert model.params['C_f']['electricity'] == 129.95
+        assert model.params['COP']['green_hydrogen'] == 0.5
+    assert shipped_data.Q3_NEW_PARAMS == SHIPPED_Q3_NEW
+    assert params == default_params('q3_new')
+
+
+def test_warm_sweep_matches_fresh_solves():
+    params = default_params('q3_new')
+    persistent = PersistentModel(build_time_resolved_matrix(params, 'year'))
+    prices = [40.0, 80.0, 160.0]
+    objectives = persistent.sweep_fuel_price('electricity', prices)
+    for price, objective in zip(prices, objectives):
+        fresh = shipped_data.with_overrides(params, {'C_f': {'electricity': price}})
+        assert objective == pytest.approx(solve_matrix(build_time_resolved_matrix(fresh, 'year')).objective,
+                                          rel=1e-9)
+
+
+def test_imports_without_highspy(without_highspy):
+    process = without_highspy("import persistent_model")
+    assert process.returncode == 0, process.stderr
@@ -0,0 +1,49 @@
+import pytest
+
+from model_builder import (build_5years_model, build_combination_model, build_new_try_model, build_q1_model,
+                           build_q3_new_model)
+from presolve import REASONS, remove_redundant
+from pulp_compat import constraint_map
+from shipped_data import default_params, with_overrides
+
+# Families with an optimum on the shipped data, and the q1 / q3_new variants of test_matrix_builder.py
+BUILDS = {
+    'q1': lambda: build_q1_model(with_overrides(default_params('q1'), {'D': [10000000] * 5})),
+    'q3_new': lambda: build_q3_new_model(
+        with_overrides(default_params('q3_new'), {'X_max': {'power_plant': 1230000000, 'hydrogen_plant': 80000000,
+                                                            'gas_plant': 20000000}}),
+        ('electricity', 'green_hydrogen')),
+    'new_try': lambda: build_new_try_model(default_params('new_try'), 2035, 'power_plant'),
+    '5years': lambda: build_5years_model(default_params('5years'), 2035, 'green_hydrogen'),
+    'combination': lambda: build_combination_model(default_params('q3_new'), ('electricity', 'green_hydrogen')),
+}
+
+
+@pytest.mark.parametrize('family', sorted(BUILDS))
+def test_remove_redundant_keeps_objective(family):
+    result = BUILDS[family]().solve()
+    assert result.status == 'Optimal'
+    model = BUILDS[family]()
+    rows = model.prb.numConstraints()
+    report = model.presolve()
+    assert rows == sum(counts['rows'] for counts in report.values())
+    assert model.prb.numConstraints() == sum(counts['rows'] - sum(counts[reason] for reason in REASONS)
+                                             for counts in report.values())
+    presolved = model.solve()
+    assert presolved.status == 'Optimal'
+    assert presolved.objective == pytest.approx(result.objective, rel=1e-9)
+
+
+def test_infeasible_model_stays_infeasible():
+    model = build_q1_model(default_params('q1'))
+    model.presolve()
+    assert model.solve().status == 'Infeasible'
+
+
+def test_remove_redundant_leaves_problem_unchanged():
+    model = BUILDS['q1']()
+    names = list(constraint_map(model.prb))
+    presolved, _ = remove_redundant(model.prb)
+    assert list(constraint_map(model.prb)) == names
+    assert set(constraint_map(presolved)) < set(names)
+    assert presolved.objective.name == model.prb.objective.name
@@ -0,0 +1,41 @@
+import pytest
+
+import solver_backend
+from model_builder import build_combination_model
+from pruning import prune_combinations
+
+
+def six_fuel_params():
+    # Fuel i burnt in unit i, dearer fuels at a better COP, so the best combinations are close in cost
+    D = [11940000, 10830000, 10000000, 9440000, 8880000]
+    units = [f"unit_{i}" for i in range(6)]
+    fuels = [f"fuel_{i}" for i in range(6)]
+    X = {u: 1e5 * (i + 1) for i, u in enumerate(units)}
+    return {
+        'years': [2025, 2030, 2035, 2040, 2045], 'units': units, 'fuels': fuels, 'unit_fuels': dict(zip(fuels, units)),
+        'COP': {f: 0.9 + 0.3 * i for i, f in enumerate(fuels)}, 'C_op': {u: 3 + i for i, u in enumerate(units)},
+        'C_inv': {u: 15 + 0.5 * i for i, u in enumerate(units)}, 'C_f': {f: 98 + 20 * i for i, f in enumerate(fuels)},
+        'X': X, 'X_max': {u: X[u] + max(D) / 3 for u in units}, 'x': {u: 1.5 * X[u] for u in units}, 'D': D,
+    }
+
+
+PARAMS = six_fuel_params()
+
+
+@pytest.mark.parametrize('bound', ['merit', 'lp'])
+def test_pruned_combinations_never_beat_the_incumbent(bound):
+    best_fuels, best_objective, table = prune_combinations(PARAMS, 3, bound)
+    assert prune_combinations(PARAMS, 3, 'none')[1] == pytest.approx(best_objective, rel=1e-9)
+    pruned = [row['combination'] for row in table if row['status'] == 'Pruned']
+    assert pruned
+    for combination in pruned:
+        objective = build_combination_model(PARAMS, combination).solve().objective
+        assert objective is None or objective >= best_objective * (1 - 1e-9)
+
+
+def test_lp_bound_of_a_pure_lp_is_not_solved_again(monkeypatch):
+    calls = []
+    solve = solver_backend.solve
+    monkeypatch.setattr(solver_backend, 'solve', lambda *args, **kwargs: calls.append(1) or solve(*args, **kwargs))
+    _, _, table = prune_combinations(PARAMS, 3, 'lp')
+    assert len(calls) == len(table)
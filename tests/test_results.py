@@ -0,0 +1,50 @@
+import numpy as np
+
+from model_builder import build_combination_model, build_q3_new_model
+from results import format_solution, solution_arrays, variable_arrays
+from shipped_data import default_params, with_overrides
+
+
+def _solved():
+    model = build_combination_model(default_params('combination'), ('electricity', 'green_hydrogen'))
+    model.solve()
+    return model
+
+
+def test_arrays_match_variable_values():
+    model = _solved()
+    params = default_params('combination')
+    G = solution_arrays(model)['G']
+    expected = np.array([[model.G[t, u].varValue for u in params['units']] for t in params['years']])
+    np.testing.assert_allclose(G, expected)
+    np.testing.assert_allclose(variable_arrays(model.prb, {'G': model.G})['G'], expected)
+
+
+def test_arrays_follow_presolve():
+    # q3_new with large plants, G[year, unit, fuel] has keys for every fuel but only the selected ones are used
+    params = with_overrides(default_params('q3_new'), {'X_max': {'power_plant': 1230000000,
+                                                                 'hydrogen_plant': 80000000, 'gas_plant': 20000000}})
+    model = build_q3_new_model(params, ('electricity', 'green_hydrogen'))
+    model.solve()
+    before = solution_arrays(model)
+    model.presolve()
+    model.solve()
+    arrays = solution_arrays(model)
+    assert model.variable_index[0] is model.prb
+    for name in ('G', 'CAP', 'F'):
+        variables = getattr(model, name)
+        expected = np.full(arrays[name].shape, np.nan)
+        for i, key in enumerate(variables):
+            value = variables[key].varValue
+            expected.reshape(-1)[i] = np.nan if value is None else value
+        np.testing.assert_allclose(arrays[name], expected)
+        np.testing.assert_allclose(arrays[name], before[name], rtol=1e-9)
+
+
+def test_format_solution_has_a_row_per_year():
+    model = _solved()
+    text = format_solution(model, ['G'])
+    lines = text.splitlines()
+    assert lines[0] == 'G:' and 'power_plant' in lines[1]
+    assert [line.split()[0] for line in lines[2:]] == [str(t) for t in default_params('combination')['years']]
+    assert '8880000' in lines[-1]
@@ -0,0 +1,28 @@
+import pytest
+
+from rolling import long_horizon_params, solve_full, solve_rolling
+from shipped_data import default_params
+
+
+@pytest.fixture
+def params():
+    return long_horizon_params(default_params('q3_new'), 2035)
+
+
+@pytest.mark.parametrize('commit', [0, 3, -1])
+def test_commit_outside_window_is_rejected(params, commit):
+    with pytest.raises(ValueError, match="commit"):
+        solve_rolling(params, window=2, commit=commit)
+
+
+def test_one_window_is_the_full_model(params):
+    rolling = solve_rolling(params, window=len(params['years']))
+    full = solve_full(params)
+    assert rolling.windows == 1
+    assert rolling.objective == pytest.approx(full.objective, rel=1e-6)
+
+
+def test_rolling_covers_every_year(params):
+    result = solve_rolling(params, window=4, commit=2)
+    assert result.status == 'Optimal'
+    assert result.CAP.shape[0] == len(params['years'])
@@ -0,0 +1,60 @@
+import pytest
+
+from benchmark import synthetic_params
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import solve_matrix
+from model_builder import build_5years_model, build_combination_model, build_q1_model, build_q3_new_model
+from pulp_compat import constraint_map
+from scaling import ENERGY, METHODS, in_units, scale, simplex_iterations, solve_in_units, solve_scaled, unscale
+from shipped_data import default_params
+
+# The shipped q1 and q3_new data are infeasible, as in the scripts; the conversion must keep that too
+BUILDS = {
+    'q1': lambda params: build_q1_model(params),
+    'q3_new': lambda params: build_q3_new_model(params, ('electricity', 'green_hydrogen')),
+    'combination': lambda params: build_combination_model(params, ('electricity', 'green_hydrogen')),
+    '5years': lambda params: build_5years_model(params, 2035, 'green_hydrogen'),
+}
+
+
+@pytest.mark.parametrize('family', sorted(BUILDS))
+def test_in_units_keeps_objective(family):
+    params = default_params(family)
+    build = BUILDS[family]
+    result = build(params).solve()
+    _, converted = solve_in_units(build, params)
+    assert converted.status == result.status
+    if result.status == 'Optimal':
+        assert converted.objective == pytest.approx(result.objective, rel=1e-6)
+
+
+def test_in_units_scales_every_row_bound():
+    # Every right-hand side of q3_new but the fuel count is in MWh, including CAP + x * (year - 2025) <= X_max
+    build = BUILDS['q3_new']
+    params = default_params('q3_new')
+    original = constraint_map(build(params).prb)
+    converted = constraint_map(build(in_units(params)).prb)
+    for (name, row), row_in_units in zip(original.items(), converted.values()):
+        if name.startswith('Fuel_Selection'):
+            continue
+        assert row_in_units.constant == pytest.approx(row.constant / ENERGY, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('solver_scaling', [False, True])
+@pytest.mark.parametrize('hours', [12, 24])
+def test_default_scaling_does_not_add_iterations(hours, solver_scaling):
+    model = build_time_resolved_matrix(synthetic_params(5, 20), 'hour', heat_profile(hours))
+    status, objective, iterations, _ = simplex_iterations(model, solver_scaling)
+    scaled = scale(model)
+    scaled_status, scaled_objective, scaled_iterations, _ = simplex_iterations(scaled, solver_scaling)
+    assert scaled_status == status == 'Optimal'
+    assert unscale(scaled, None, scaled_objective)[1] == pytest.approx(objective, rel=1e-9)
+    assert scaled_iterations <= iterations
+
+
+def test_solve_scaled_matches_solve():
+    model = build_time_resolved_matrix(default_params('combination'), 'hour', heat_profile(6))
+    expected = solve_matrix(model)
+    for method in METHODS:
+        result = solve_scaled(model, method)
+        assert result.objective == pytest.approx(expected.objective, rel=1e-7)
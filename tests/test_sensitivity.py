@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from hourly import build_time_resolved_matrix, heat_profile
+from matrix_builder import solve_matrix
+from model_io import demand_vector
+from persistent_model import PersistentModel
+from sensitivity import Sensitivity, main
+from shipped_data import default_params, with_overrides
+
+QUERIES = [
+    {'D': {'2025': 10000000.0}},          # inside the range of the basis, answered from the duals
+    {'D': {'2035': 30000000.0}},          # outside, re-solved
+    {'D': 9000000.0},
+    {'C_f': {'electricity': 90.0}},
+    {'X_max': {'power_plant': 11000000.0}},
+    {'COP': {'electricity': 3.0}},
+]
+
+
+def build(params, hours):
+    return (build_time_resolved_matrix(params, 'year') if hours == 1
+            else build_time_resolved_matrix(params, 'hour', heat_profile(hours)))
+
+
+@pytest.mark.parametrize('hours', [1, 6])
+@pytest.mark.parametrize('overrides', QUERIES)
+def test_what_if_matches_fresh_solve(hours, overrides):
+    params = default_params('q3_new')
+    sensitivity = Sensitivity(PersistentModel(build(params, hours)))
+    answer = sensitivity.what_if(overrides)
+
+    if 'D' in overrides:
+        overrides = {**overrides, 'D': demand_vector(params, overrides['D'])}
+    fresh = solve_matrix(build(with_overrides(params, overrides), hours))
+    assert answer.objective == pytest.approx(fresh.objective, rel=1e-7)
+
+
+def test_what_if_leaves_the_model_unchanged():
+    params = default_params('q3_new')
+    model = build(params, 1)
+    sensitivity = Sensitivity(PersistentModel(model))
+    before = (model.c.copy(), model.row_lower.copy(), model.row_upper.copy(), model.A.data.copy())
+    for overrides in QUERIES:
+        sensitivity.what_if(overrides)
+    for array, old in zip((model.c, model.row_lower, model.row_upper, model.A.data), before):
+        np.testing.assert_array_equal(array, old)
+    assert sensitivity.what_if({}).objective == pytest.approx(solve_matrix(build(params, 1)).objective, rel=1e-9)
+
+
+def test_command_line(capsys):
+    main(['--what-if', 'D.2025=10000000,20000000', '--check'])
+    lines = capsys.readouterr().out.splitlines()[-2:]
+    for line in lines:
+        answer, resolved = line.rpartition('}: ')[2].split(', re-solved ')
+        assert float(answer.split()[0]) == pytest.approx(float(resolved), rel=1e-7)
+    with pytest.raises(SystemExit):
+        main(['--what-if', 'D.2026=1'])
+
+
+def test_imports_without_highspy(without_highspy):
+    process = without_highspy("import sensitivity")
+    assert process.returncode == 0, process.stderr
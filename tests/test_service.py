@@ -0,0 +1,69 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import service
+from hourly import build_time_resolved_matrix
+from matrix_builder import solve_matrix
+from model_io import demand_vector
+from shipped_data import default_params, with_overrides
+
+JOBS = [
+    {'id': 0},
+    {'id': 1, 'D': {'2030': 12000000}},
+    {'id': 2, 'D': [12000000, 11000000, 10000000, 9000000, 8000000]},
+    {'id': 3, 'C_f': {'electricity': 90}, 'COP': {'electricity': 3.0}},
+]
+
+
+def fresh_objective(job):
+    params = default_params('q3_new')
+    overrides = {name: value for name, value in job.items() if name != 'id'}
+    if 'D' in overrides:
+        overrides['D'] = demand_vector(params, overrides['D'])
+    return solve_matrix(build_time_resolved_matrix(with_overrides(params, overrides), 'year')).objective
+
+
+@pytest.mark.parametrize('job', JOBS)
+def test_evaluate_matches_fresh_solve(job):
+    result = service.evaluate(job)
+    assert result['status'] == 'Optimal', result
+    assert result['objective'] == pytest.approx(fresh_objective(job), rel=1e-7)
+
+
+def test_models_are_capped():
+    for hours in range(2, service.MODELS + 4):
+        service.evaluate({'id': hours, 'hours': hours})
+    assert service._sensitivity.cache_info().currsize == service.MODELS
+
+
+def test_stale_socket_only(tmp_path):
+    path = str(tmp_path / 'service.sock')
+    with open(path, 'w'):
+        pass
+    with pytest.raises(FileExistsError, match="not a socket"):
+        service._remove_stale_socket(path)
+    os.unlink(path)
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    service._remove_stale_socket(path)
+    assert not os.path.exists(path)
+
+
+def test_served_jobs(tmp_path):
+    path = str(tmp_path / 'run' / 'service.sock')
+    server = subprocess.Popen([sys.executable, 'service.py', 'serve', '--socket', path, '--workers', '1'],
+                              cwd=os.path.dirname(service.__file__), stdout=subprocess.PIPE, text=True)
+    try:
+        assert 'Serving' in server.stdout.readline()
+        results = {result['id']: result for result in service.query(JOBS, path)}
+        for job in JOBS:
+            assert results[job['id']]['objective'] == pytest.approx(fresh_objective(job), rel=1e-7)
+        assert oct(os.stat(os.path.dirname(path)).st_mode & 0o777) == oct(0o700)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
@@ -0,0 +1,53 @@
+import importlib
+import sys
+
+import pytest
+
+from shipped_data import default_params
+from solution_cache import SolutionCache, params_key
+from sweep import run_sweep, scenarios
+
+
+def test_missing_values_come_back_as_none(tmp_path):
+    cache = SolutionCache(str(tmp_path))
+    cache.put('key', 'Infeasible', None, {'G[2025,power_plant]': None, 'CAP[2025,power_plant]': 2.5})
+    entry = cache.get('key')
+    assert entry['objective'] is None
+    assert entry['values'] == {'G[2025,power_plant]': None, 'CAP[2025,power_plant]': 2.5}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SolutionCache(str(tmp_path), max_entries=3)
+    for n in range(5):
+        cache.put(f"key{n}", 'Optimal', float(n), {'x': float(n)})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['key2.npz', 'key3.npz', 'key4.npz']
+    assert cache.get('key0') is None and cache.get('key4')['objective'] == 4.0
+
+
+@pytest.mark.parametrize('family', ['new_try', '5years', 'combination'])
+def test_cached_sweep_equals_fresh_sweep(tmp_path, family):
+    scenario_list = list(scenarios(family, default_params(family)))
+    options = {'directory': str(tmp_path)}
+    fresh = run_sweep(scenario_list, workers=1, fast_path=False)
+    stored = run_sweep(scenario_list, workers=1, cache_options=options, fast_path=False)
+    cached = run_sweep(scenario_list, workers=1, cache_options=options, fast_path=False)
+    strip = lambda table: [{k: v for k, v in row.items() if not k.endswith('_time')} for row in table]
+    assert strip(cached) == strip(stored) == strip(fresh)
+
+
+def test_key_follows_helper_modules(tmp_path, monkeypatch):
+    # A change in a module the builder only calls into is a new key
+    (tmp_path / 'grid_helper.py').write_text("def rows():\n    return 1\n")
+    (tmp_path / 'grid_builder.py').write_text("from grid_helper import rows\n\n\ndef build(params):\n    return rows()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import grid_builder
+    before = params_key(grid_builder.build, {'D': [1.0]})
+
+    (tmp_path / 'grid_helper.py').write_text("def rows():\n    return 2\n")
+    for name in ('grid_helper', 'grid_builder'):
+        sys.modules.pop(name)
+    importlib.invalidate_caches()
+    import solution_cache
+    solution_cache._module_digest.cache_clear()
+    import grid_builder as changed
+    assert params_key(changed.build, {'D': [1.0]}) != before
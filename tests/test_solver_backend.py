@@ -0,0 +1,40 @@
+import pytest
+
+import solver_backend
+from model_builder import build_q1_model
+
+# The data of code_akash_q1.py with the same demand every year, so the model has an optimum
+PARAMS = {
+    'years': list(range(2025, 2046, 5)),
+    'units': ['power_plant', 'hydrogen_plant', 'gas_plant'],
+    'fuels': ['electricity', 'green_hydrogen', 'synthetic_gas'],
+    'COP': {'electricity': 2.5, 'green_hydrogen': 0.90, 'synthetic_gas': 0.90},
+    'C_op': {'power_plant': 3, 'hydrogen_plant': 10, 'gas_plant': 10},
+    'C_inv': {'power_plant': 15, 'hydrogen_plant': 18, 'gas_plant': 18},
+    'C_f': {'electricity': 98.44, 'green_hydrogen': 171, 'synthetic_gas': 200},
+    'X': {'power_plant': 1000000, 'hydrogen_plant': 100000, 'gas_plant': 40000},
+    'X_max': {'power_plant': 10000000, 'hydrogen_plant': 800000, 'gas_plant': 200000},
+    'x': {'power_plant': 1500000, 'hydrogen_plant': 140000, 'gas_plant': 45000},
+    'D': [10000000] * 5,
+}
+
+
+@pytest.mark.parametrize('backend', solver_backend.available_backends())
+def test_backends_agree(backend):
+    reference = solver_backend.solve(build_q1_model(PARAMS).prb, backend='highs')
+    result = solver_backend.solve(build_q1_model(PARAMS).prb, backend=backend)
+    assert reference.status == result.status == 'Optimal'
+    assert result.objective == pytest.approx(reference.objective, rel=1e-6)
+
+
+def test_highs_without_highspy_solves_through_scipy(without_highspy):
+    process = without_highspy(
+        "import solver_backend\n"
+        "from model_builder import build_q1_model\n"
+        "from tests.test_solver_backend import PARAMS\n"
+        "result = solver_backend.solve(build_q1_model(PARAMS).prb, backend='highs')\n"
+        "print(result.status, result.objective)")
+    assert process.returncode == 0, process.stderr
+    status, objective = process.stdout.split()
+    assert status == 'Optimal'
+    assert float(objective) == pytest.approx(solver_backend.solve(build_q1_model(PARAMS).prb).objective, rel=1e-6)
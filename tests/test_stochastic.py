@@ -0,0 +1,38 @@
+import pytest
+
+from hourly import heat_profile
+from matrix_builder import solve_matrix
+from shipped_data import default_params
+from stochastic import build_extensive_form, demand_scenarios, solve_benders
+
+
+@pytest.fixture
+def params():
+    return default_params('q3_new')
+
+
+@pytest.mark.parametrize('time_resolution, profile, price_spread', [('year', None, 0.0), ('hour', heat_profile(12), 0.2)])
+def test_benders_matches_extensive_form(params, time_resolution, profile, price_spread):
+    scenarios = demand_scenarios(params, 6, spread=0.15, price_spread=price_spread, seed=3)
+    extensive = solve_matrix(build_extensive_form(params, scenarios, time_resolution=time_resolution, profile=profile))
+    benders = solve_benders(params, scenarios, time_resolution=time_resolution, profile=profile)
+    assert extensive.status == benders.status == 'Optimal'
+    assert benders.objective == pytest.approx(extensive.objective, rel=1e-5)
+    assert benders.lower_bound <= benders.objective * (1 + 1e-9)
+
+
+def test_benders_needs_an_iteration(params):
+    with pytest.raises(ValueError, match="max_iterations"):
+        solve_benders(params, demand_scenarios(params, 2), max_iterations=0)
+
+
+def test_extensive_form_without_highspy(without_highspy):
+    # Benders needs highspy for its master problem, the extensive form is solved through scipy
+    process = without_highspy(
+        "from matrix_builder import solve_matrix\n"
+        "from shipped_data import default_params\n"
+        "from stochastic import build_extensive_form, demand_scenarios\n"
+        "params = default_params('q3_new')\n"
+        "print(solve_matrix(build_extensive_form(params, demand_scenarios(params, 3, seed=1))).status)")
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.split() == ['Optimal']
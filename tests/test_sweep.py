@@ -0,0 +1,17 @@
+import os
+
+from shipped_data import default_params
+from sweep import THREAD_VARIABLES, run_sweep, scenarios, worker_pool
+
+
+def test_workers_start_with_thread_limits(monkeypatch):
+    monkeypatch.delenv('OMP_NUM_THREADS', raising=False)
+    with worker_pool(2, 1) as pool:
+        assert [pool.submit(os.getenv, var).result() for var in THREAD_VARIABLES] == ['1'] * len(THREAD_VARIABLES)
+    assert 'OMP_NUM_THREADS' not in os.environ
+
+
+def test_parallel_sweep_equals_serial_sweep():
+    scenario_list = list(scenarios('new_try', default_params('new_try')))
+    strip = lambda table: [{k: v for k, v in row.items() if not k.endswith('_time')} for row in table]
+    assert strip(run_sweep(scenario_list, workers=2)) == strip(run_sweep(scenario_list, workers=1))
@@ -0,0 +1,34 @@
+import pytest
+
+from shipped_data import default_params
+from technologies import enumerate_technologies, select_technologies, synthetic_catalogue
+
+
+@pytest.fixture
+def catalogue():
+    # 6 technologies, none of which can cover the peak demand alone
+    params = default_params('combination')
+    catalogue = synthetic_catalogue(params, n_units=6, n_fuels=3, density=0.5, seed=0)
+    return {**catalogue, 'X_max': {u: 0.45 * max(params['D']) for u in catalogue['units']}}
+
+
+@pytest.mark.parametrize('k', [2, 3])
+def test_milp_matches_enumeration(catalogue, k):
+    chosen, objective, model = select_technologies(catalogue, k)
+    best, best_objective, calls = enumerate_technologies(catalogue, k)
+    assert model.solver_calls == 1
+    assert calls > 1
+    assert 0 < len(chosen) <= k
+    assert objective == pytest.approx(best_objective, rel=1e-9)
+
+
+def test_k_is_enforced(catalogue):
+    chosen, objective, model = select_technologies(catalogue, 1)
+    assert chosen is None and objective is None
+    assert enumerate_technologies(catalogue, 1)[1] == float('inf')
+
+
+def test_shipped_catalogue():
+    chosen, objective, _ = select_technologies(default_params('combination'), 2)
+    assert len(chosen) <= 2
+    assert objective == pytest.approx(enumerate_technologies(default_params('combination'), 2)[1], rel=1e-9)
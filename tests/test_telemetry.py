@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import telemetry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_milp_script_rows_have_families(tmp_path):
+    path = str(tmp_path / 'telemetry.jsonl')
+    subprocess.run([sys.executable, 'code_new_try.py', '--milp', '--telemetry', path], cwd=ROOT, check=True,
+                   capture_output=True)
+    record, = telemetry.load(path)
+    assert record['status'] == 'Optimal'
+    assert record['build_time'] > 0
+    assert record['families'] == {
+        'Scenario_Selection': {'rows': 1, 'nonzeros': 15}, 'Fuel_Selection': {'rows': 1, 'nonzeros': 3},
+        'Balance': {'rows': 5, 'nonzeros': 30}, 'Capacity': {'rows': 15, 'nonzeros': 45},
+        'Capacity_Boundary': {'rows': 15, 'nonzeros': 15}, 'Fuel_Consumption': {'rows': 15, 'nonzeros': 30},
+        'Fuel_Use': {'rows': 15, 'nonzeros': 30}}
+    assert sum(family['rows'] for family in record['families'].values()) == record['rows']
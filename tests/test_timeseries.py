@@ -0,0 +1,45 @@
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pytest
+
+import timeseries
+from shipped_data import default_params
+from timeseries import ingest, synthetic_source, with_series
+
+YEARS = np.arange(2025, 2031)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / 'series.csv')
+    synthetic_source(path, YEARS, regions=2, hours=48)
+    return path
+
+
+def _without_pyarrow(monkeypatch):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name == 'pyarrow' else find_spec(name, *args))
+
+
+def test_numpy_reader_matches_pyarrow(source, tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    arrow = ingest(source, str(tmp_path / 'arrow'))
+    _without_pyarrow(monkeypatch)
+    with pytest.warns(UserWarning, match="one column at a time"):
+        plain = ingest(source, str(tmp_path / 'plain'))
+    with open(os.path.join(plain.directory, timeseries.INDEX)) as file:
+        assert json.load(file)['reader'] == 'numpy'
+    assert plain.names == arrow.names
+    for name in arrow.names:
+        np.testing.assert_allclose(plain[name], arrow[name], rtol=1e-6)
+
+
+def test_with_series_sums_demand_per_year(source):
+    series = ingest(source)
+    params, profile = with_series(default_params('q3_new'), series, 'region_0', list(YEARS[:5]))
+    assert params['D'] == pytest.approx([series.year('D.region_0', year).sum() for year in YEARS[:5]])
+    assert profile.shape == (5, 48)
+    np.testing.assert_allclose(np.asarray(profile).sum(axis=1), 1.0)
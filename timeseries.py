@@ -0,0 +1,250 @@
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+
+# ============================= Time-series Ingest =================================================
+# Demand, price and efficiency time series are read from CSV or Parquet once and converted to one
+# .npy array of shape (years, hours) per series in a cache directory next to the source
+# (<source>.series/ with an index.json). Later runs memory-map those arrays, nothing is parsed or
+# copied into Python lists: a year or a window of years is a view that is only read when used.
+# The source is re-converted when its size or modification time changes. Without pyarrow a CSV is
+# parsed by NumPy one column at a time (with a warning); index.json records the reader used.
+# Source layout, one row per time slot:
+#   year, hour, D.north, D.south, C_f.electricity, COP.electricity, ...
+# 'hour' is optional (rows of a year are then in time order), every year needs the same number of
+# rows. A series is named PARAM or PARAM.KEY, with KEY a region for D and a fuel for C_f and COP.
+SUFFIX = '.series'
+INDEX = 'index.json'
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec('pyarrow') is None:
+        raise RuntimeError("Parquet input needs pyarrow, convert the source to .csv instead")
+
+
+def _column_reader(path):
+    # (column names, read(name) -> 1-d array, reader) of a CSV or Parquet file. pyarrow reads the file
+    # once into a columnar table; without it a CSV is parsed by NumPy one column at a time, so only one
+    # column is in memory at once (the file is read once per column)
+    if path.lower().endswith('.parquet'):
+        _require_pyarrow()
+        import pyarrow.parquet as parquet
+        table = parquet.read_table(path)
+    elif importlib.util.find_spec('pyarrow') is not None:
+        import pyarrow.csv as pa_csv
+        table = pa_csv.read_csv(path)
+    else:
+        warnings.warn(f"pyarrow is not installed, {path} is parsed with NumPy one column at a time")
+        with open(path, newline='') as file:
+            header = next(csv.reader(file))
+        read = lambda name: np.loadtxt(path, delimiter=',', skiprows=1, usecols=header.index(name), ndmin=1)
+        return header, read, 'numpy'
+    return table.column_names, lambda name: table.column(name).to_numpy(), 'pyarrow'
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def convert(source, directory=None):
+    # Source -> one (years, hours) float64 .npy per series, index.json written last so an interrupted
+    # conversion is never used
+    directory = directory or source + SUFFIX
+    stamp = _stamp(source)
+    names, read, reader = _column_reader(source)
+    if 'year' not in names:
+        raise ValueError(f"{source} has no 'year' column")
+
+    year = np.asarray(read('year'), dtype=np.int64)
+    hour = np.asarray(read('hour'), dtype=np.int64) if 'hour' in names else None
+    order = np.lexsort((hour, year)) if hour is not None else np.argsort(year, kind='stable')
+    years, counts = np.unique(year, return_counts=True)
+    if np.any(counts != counts[0]):
+        raise ValueError(f"{source}: every year needs the same number of time slots, got {sorted(set(counts))}")
+
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for n, name in enumerate(name for name in names if name not in ('year', 'hour')):
+        files[name] = f"{n}.npy"
+        np.save(os.path.join(directory, files[name]),
+                np.asarray(read(name), dtype=float)[order].reshape(len(years), counts[0]))
+
+    index = {'source': os.path.abspath(source), **stamp, 'reader': reader, 'years': years.tolist(),
+             'hours': int(counts[0]), 'series': files}
+    with open(os.path.join(directory, INDEX + '.tmp'), 'w') as file:
+        json.dump(index, file)
+    os.replace(os.path.join(directory, INDEX + '.tmp'), os.path.join(directory, INDEX))
+    return directory
+
+
+def ingest(source, directory=None, force=False):
+    # TimeSeries of the source, converted on the first call and after the source changed
+    directory = directory or source + SUFFIX
+    try:
+        with open(os.path.join(directory, INDEX)) as file:
+            index = json.load(file)
+        fresh = {k: index[k] for k in ('size', 'mtime_ns')} == _stamp(source)
+    except (OSError, ValueError, KeyError):
+        fresh = False
+    if force or not fresh:
+        convert(source, directory)
+    return TimeSeries(directory)
+
+
+class TimeSeries:
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX)) as file:
+            index = json.load(file)
+        self.directory = directory
+        self.years = index['years']
+        self.hours = index['hours']
+        self.files = index['series']
+        self._arrays = {}
+
+    @property
+    def names(self):
+        return list(self.files)
+
+    def __getitem__(self, name):
+        # (years, hours) memory map of a series
+        if name not in self._arrays:
+            if name not in self.files:
+                raise KeyError(f"No series {name}, the source has {self.names}")
+            self._arrays[name] = np.load(os.path.join(self.directory, self.files[name]), mmap_mode='r')
+        return self._arrays[name]
+
+    def _row(self, year):
+        try:
+            return self.years.index(year)
+        except ValueError:
+            raise KeyError(f"No year {year} in the series, they cover {self.years[0]}-{self.years[-1]}") from None
+
+    def year(self, name, year):
+        return self[name][self._row(year)]
+
+    def window(self, name, years):
+        # Rows of the given (consecutive) years, a view as long as they are consecutive in the source
+        rows = [self._row(year) for year in years]
+        if rows == list(range(rows[0], rows[0] + len(rows))):
+            return self[name][rows[0]:rows[-1] + 1]
+        return self[name][rows]
+
+    def annual(self, name, years):
+        return np.array([float(self.year(name, year).sum()) for year in years])
+
+    def mean(self, name, years):
+        return float(np.mean([self.year(name, year).mean() for year in years]))
+
+    def profile(self, name, years):
+        return YearProfiles(self, name, years)
+
+
+class YearProfiles:
+    # (years, hours) hourly shares of a series, every year's row normalized to sum 1 when it is read.
+    # Passed as the profile of hourly.build_time_resolved_matrix, only one year is in memory at a time.
+
+    def __init__(self, series, name, years):
+        self.series, self.name, self.years = series, name, list(years)
+        self.ndim = 2
+        self.shape = (len(self.years), series.hours)
+
+    def __len__(self):
+        return len(self.years)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return YearProfiles(self.series, self.name, self.years[i])
+        row = np.asarray(self.series.year(self.name, self.years[i]), dtype=float)
+        return row / row.sum()
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array([self[i] for i in range(len(self))], dtype=dtype)
+
+
+def with_series(params, series, region=None, years=None):
+    # (params, profile) for the planning years: D[i] the yearly sum of the demand series (D or D.<region>),
+    # C_f and COP the mean of their series over the planning years where the source has one. The models
+    # have one price and one COP per fuel for the whole horizon, so the hourly variation of those series
+    # is averaged away on purpose; only the demand keeps its hourly shape (the profile).
+    years = params['years'] if years is None else years
+    demand = f"D.{region}" if region else 'D'
+    params = {**params, 'years': list(years), 'D': series.annual(demand, years).tolist()}
+    for name in ('C_f', 'COP'):
+        keys = {key: f"{name}.{key}" for key in params['fuels'] if f"{name}.{key}" in series.files}
+        if keys:
+            params[name] = {**params[name], **{key: series.mean(column, years) for key, column in keys.items()}}
+    return params, series.profile(demand, years)
+
+
+# ============================== Command line ======================================================
+def synthetic_source(path, years, regions=3, hours=8760, fuels=('electricity', 'green_hydrogen', 'synthetic_gas'),
+                     seed=0):
+    # A source in the ranges of the shipped data: hourly heat demand per region growing year by year,
+    # hourly fuel prices and flat COPs
+    from hourly import heat_profile
+
+    rng = np.random.default_rng(seed)
+    base = heat_profile(hours)
+    n = len(years) * hours
+    columns = {'year': np.repeat(years, hours), 'hour': np.tile(np.arange(hours), len(years))}
+    for r in range(regions):
+        annual = np.repeat(np.linspace(5e6, 1.2e7, len(years)) * rng.uniform(0.5, 1.5), hours)
+        columns[f"D.region_{r}"] = annual * np.tile(base, len(years)) * rng.uniform(0.9, 1.1, n)
+    for fuel, price, cop in zip(fuels, (98.44, 200.0, 190.0), (2.7, 0.85, 0.85)):
+        columns[f"C_f.{fuel}"] = price * rng.uniform(0.8, 1.2, n)
+        columns[f"COP.{fuel}"] = np.full(n, cop)
+
+    if path.lower().endswith('.parquet'):
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.parquet as parquet
+        parquet.write_table(pa.table(columns), path)
+    else:
+        np.savetxt(path, np.column_stack(list(columns.values())), delimiter=',', header=','.join(columns),
+                   comments='', fmt=['%d', '%d'] + ['%.6g'] * (len(columns) - 2))
+
+
+def main(argv=None):
+    from hourly import build_time_resolved_matrix
+    from matrix_builder import solve_matrix
+    from shipped_data import default_params
+
+    parser = argparse.ArgumentParser(description="Ingest demand and price time series, solve the hourly model on them")
+    parser.add_argument('source', help=".csv or .parquet time series")
+    parser.add_argument('--synthetic', type=int, default=None, metavar='REGIONS',
+                        help="first write a synthetic source with this many regions (2025-2045, 8760 h)")
+    parser.add_argument('--region', default=None, help="demand series D.<region>, D without")
+    parser.add_argument('--force', action='store_true', help="convert again even if the cache is fresh")
+    parser.add_argument('--solve', action='store_true', help="solve the hourly model of the shipped data on the series")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        synthetic_source(args.source, np.arange(2025, 2046), args.synthetic)
+
+    start = time.perf_counter()
+    series = ingest(args.source, force=args.force)
+    loaded = time.perf_counter()
+    region = args.region
+    if region is None and 'D' not in series.files:
+        region = next(name for name in series.names if name.startswith('D.')).partition('.')[2]
+    params, profile = with_series(default_params('q3_new'), series, region)
+    print(f"{len(series.names)} series x {len(series.years)} years x {series.hours} h loaded in "
+          f"{(loaded - start) * 1000:.1f} ms, planning years read in {(time.perf_counter() - loaded) * 1000:.1f} ms")
+    print(f"D: {[round(d) for d in params['D']]}")
+
+    if args.solve:
+        model = build_time_resolved_matrix(params, 'hour', profile)
+        result = solve_matrix(model)
+        print(f"{model.n_rows} rows x {model.n_cols} columns: {result.status}, objective {result.objective}")
+
+
+if __name__ == '__main__':
+    main()